@@ -6,39 +6,204 @@ Provides enhanced AI responses using intent extraction, question enhancement,
 decomposition, and validation with dual-layer memory management.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from app.models.message import Message
 from app.core.config import settings
 from .workflow import IntentExtractionWorkflow
 from .session_persistence import save_sessions_to_disk, load_sessions_from_disk, get_persistence_status
 from .circuit_breaker import circuit_manager, CircuitBreakerOpenError
-from .workflow_state import emit_thinking
+from .workflow_state import emit_thinking, emit_completed
+from .response_cache import TTLCache, make_cache_key
+from .background import submit_background
 
 
 import asyncio
+import os
+import re
 import threading
 from concurrent.futures import ThreadPoolExecutor
-from collections import defaultdict
+from collections import Counter, deque
 import time
+from types import MappingProxyType
+from dataclasses import dataclass, field
+from functools import cache, lru_cache
+
+
+class ShardedSessionMap:
+    """Session map split into independently locked shards (ConcurrentMap-style)"""
+    
+    def __init__(self, shard_count: int = 16):
+        # Shard count must be a power of two so the shard index is a mask
+        self._mask = shard_count - 1
+        self.shards = [(threading.Lock(), {}) for _ in range(shard_count)]
+        self._active_count = 0
+        self._count_lock = threading.Lock()
+    
+    def _shard(self, key: str):
+        return self.shards[hash(key) & self._mask]
+    
+    def __len__(self) -> int:
+        return self._active_count
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._shard(key)[1]
+    
+    def get(self, key: str, default=None):
+        return self._shard(key)[1].get(key, default)
+    
+    def touch(self, key: str, timestamp: float):
+        """Refresh last_activity without locking (a single dict store is atomic under the GIL)"""
+        session_data = self._shard(key)[1].get(key)
+        if session_data is not None:
+            session_data["last_activity"] = timestamp
+    
+    def try_insert(self, key: str, value: Dict[str, Any], limit: int) -> bool:
+        """Insert a session, returning False if a new key would exceed the limit"""
+        lock, sessions = self._shard(key)
+        with lock:
+            if key not in sessions:
+                with self._count_lock:
+                    if self._active_count >= limit:
+                        return False
+                    self._active_count += 1
+            sessions[key] = value
+            return True
+    
+    def pop(self, key: str, default=None):
+        """Remove a session and return its data"""
+        lock, sessions = self._shard(key)
+        with lock:
+            if key not in sessions:
+                return default
+            value = sessions.pop(key)
+            with self._count_lock:
+                self._active_count -= 1
+            return value
+    
+    def update(self, items: Dict[str, Dict[str, Any]]):
+        """Bulk insert sessions without capacity checks (used on restore)"""
+        # Group by shard so each shard lock and the counter lock are taken once per batch
+        batches = [[] for _ in self.shards]
+        for key, value in items.items():
+            batches[hash(key) & self._mask].append((key, value))
+        
+        added = 0
+        for (lock, sessions), batch in zip(self.shards, batches):
+            if not batch:
+                continue
+            with lock:
+                for key, value in batch:
+                    if key not in sessions:
+                        added += 1
+                    sessions[key] = value
+        if added:
+            with self._count_lock:
+                self._active_count += added
+    
+    def remove_where(self, predicate: Callable[[Dict[str, Any]], bool]) -> List[str]:
+        """Remove sessions matching predicate, holding one shard lock at a time"""
+        removed = []
+        for lock, sessions in self.shards:
+            # Filter a snapshot outside the lock; only the deletions hold it
+            candidates = [key for key, value in list(sessions.items()) if predicate(value)]
+            if not candidates:
+                continue
+            stale = []
+            # All of this shard's stale keys are freed in a single locked span
+            with lock:
+                for key in candidates:
+                    value = sessions.get(key)
+                    # Re-check in case the session was re-registered since the snapshot
+                    if value is not None and predicate(value):
+                        del sessions[key]
+                        stale.append(key)
+            removed.extend(stale)
+        
+        # One counter update for the whole batch
+        if removed:
+            with self._count_lock:
+                self._active_count -= len(removed)
+        return removed
+    
+    def keys(self) -> List[str]:
+        """Snapshot of session keys (per-shard, without locking)"""
+        return [key for _, sessions in self.shards for key in list(sessions)]
+
+
+# Session capacity, read once from settings at import
+_MAX_USERS: int = int(settings.max_concurrent_users)
+
 
 # Global workflow instance for singleton pattern
 _workflow_instance = None
 _workflow_lock = threading.Lock()
-_active_sessions = {}
-_session_lock = threading.Lock()
-_thread_pool = ThreadPoolExecutor(max_workers=settings.max_concurrent_users)
-
-# Session metrics tracking
-_session_metrics = {
-    "total_sessions_created": 0,
-    "total_sessions_completed": 0,
-    "capacity_limit_hits": 0,
-    "stale_sessions_cleaned": 0,
-    "response_times": [],
-    "error_counts": defaultdict(int),
-    "peak_concurrent_users": 0,
-    "startup_time": time.time()
-}
+_active_sessions = ShardedSessionMap()
+_metrics_lock = threading.Lock()
+# Blocking I/O offload only (e.g. session backups); request concurrency is handled by the event loop,
+# so the pool is sized by CPU count rather than max_concurrent_users
+_thread_pool = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 2),
+    thread_name_prefix="agentsvc"
+)
+
+# Debounced session persistence: cleanup requests a flush, a background task writes at most once per interval
+_PERSISTENCE_FLUSH_INTERVAL = 1.0
+_flush_requested = threading.Event()
+_persistence_task: Optional[asyncio.Task] = None
+
+# Keys changed since the last flush; the flusher applies only these to its mirror of the backup
+_dirty_session_keys: set = set()
+_dirty_lock = threading.Lock()
+_persisted_sessions: Dict[str, Dict[str, Any]] = {}
+_backup_lock = threading.Lock()
+
+# Number of most recent chat messages passed to the workflow as context
+_HISTORY_CONTEXT_MESSAGES = 10
+
+# Seconds between last_activity refreshes while a workflow runs (well inside the 300s stale window)
+_SESSION_HEARTBEAT_INTERVAL = 60.0
+
+# Exact-match response cache, scoped per thread and keyed on the message plus everything the
+# workflow reads as memory: the history it receives (which covers the STM window) and the LTM version
+_response_cache = TTLCache(maxsize=1000, ttl=3600)
+
+# Metric fields saved to and restored from the session backup
+_PERSISTED_METRIC_FIELDS = (
+    "total_sessions_created",
+    "total_sessions_completed",
+    "capacity_limit_hits",
+    "stale_sessions_cleaned",
+    "peak_concurrent_users",
+    "startup_time",
+    "error_counts"
+)
+
+
+@dataclass(slots=True)
+class SessionMetrics:
+    """Session metrics tracking"""
+    total_sessions_created: int = 0
+    total_sessions_completed: int = 0
+    capacity_limit_hits: int = 0
+    stale_sessions_cleaned: int = 0
+    peak_concurrent_users: int = 0
+    startup_time: float = field(default_factory=time.time)
+    error_counts: Counter = field(default_factory=Counter)
+    response_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    
+    # Running aggregates over the response_times window (min/max are None when they must be rescanned)
+    response_time_sum: float = 0.0
+    response_time_min: Optional[float] = None
+    response_time_max: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Persistable metrics (the response time window is not saved)"""
+        data = {name: getattr(self, name) for name in _PERSISTED_METRIC_FIELDS}
+        data["error_counts"] = dict(self.error_counts)
+        return data
+
+
+_session_metrics = SessionMetrics()
 
 # Initialize session persistence
 def _initialize_session_persistence():
@@ -50,33 +215,42 @@ def _initialize_session_persistence():
     
     if loaded_sessions:
         _active_sessions.update(loaded_sessions)
+        _persisted_sessions.update(loaded_sessions)
         pass  # Restored sessions from backup
     
     if loaded_metrics:
         # Merge loaded metrics with defaults
-        for key, value in loaded_metrics.items():
-            if key in _session_metrics and key != "response_times":
-                if key == "error_counts":
-                    _session_metrics[key].update(value)
-                else:
-                    _session_metrics[key] = value
+        for name in _PERSISTED_METRIC_FIELDS:
+            if name not in loaded_metrics:
+                continue
+            if name == "error_counts":
+                _session_metrics.error_counts.update(loaded_metrics[name])
+            else:
+                setattr(_session_metrics, name, loaded_metrics[name])
         pass  # Restored metrics from backup
 
 # Initialize persistence on module load
 _initialize_session_persistence()
 
 
+@cache
 def get_workflow_instance() -> IntentExtractionWorkflow:
     """Get or create the global workflow instance (thread-safe)"""
+    # functools.cache serves every call after the first; the lock only guards concurrent first calls
     global _workflow_instance
-    if _workflow_instance is None:
-        with _workflow_lock:
-            if _workflow_instance is None:  # Double-check locking
-                pass  # Creating workflow instance
-                _workflow_instance = IntentExtractionWorkflow()
+    with _workflow_lock:
+        if _workflow_instance is None:
+            pass  # Creating workflow instance
+            _workflow_instance = IntentExtractionWorkflow()
     return _workflow_instance
 
 
+def _mark_sessions_dirty(*session_keys: str):
+    """Record session keys that must be re-synced on the next flush"""
+    with _dirty_lock:
+        _dirty_session_keys.update(session_keys)
+
+
 def _get_session_key(user_id: str, thread_id: str) -> str:
     """Generate session key for user/thread combination"""
     return f"{user_id}-{thread_id}"
@@ -86,86 +260,240 @@ def _register_session(user_id: str, thread_id: str) -> bool:
     """Register a new session (returns False if max sessions reached)"""
     session_key = _get_session_key(user_id, thread_id)
     
-    with _session_lock:
-        # Check if we're at max capacity
-        if len(_active_sessions) >= settings.max_concurrent_users and session_key not in _active_sessions:
-            pass  # Max concurrent users reached
-            _session_metrics["capacity_limit_hits"] += 1
-            return False
-        
-        current_time = asyncio.get_event_loop().time()
-        _active_sessions[session_key] = {
-            "user_id": user_id,
-            "thread_id": thread_id,
-            "last_activity": current_time,
-            "start_time": current_time,
-            "request_count": 0
-        }
+    current_time = time.monotonic()
+    session_data = {
+        "user_id": user_id,
+        "thread_id": thread_id,
+        "last_activity": current_time,
+        "start_time": current_time,
+        "request_count": 0
+    }
+    
+    # Only the target shard is locked; capacity is checked against the shared counter
+    if not _active_sessions.try_insert(session_key, session_data, _MAX_USERS):
+        pass  # Max concurrent users reached
+        with _metrics_lock:
+            _session_metrics.capacity_limit_hits += 1
+        return False
+    _mark_sessions_dirty(session_key)
+    
+    # Update metrics
+    current_active = len(_active_sessions)
+    with _metrics_lock:
+        _session_metrics.total_sessions_created += 1
+        if current_active > _session_metrics.peak_concurrent_users:
+            _session_metrics.peak_concurrent_users = current_active
         
-        # Update metrics
-        _session_metrics["total_sessions_created"] += 1
-        current_active = len(_active_sessions)
-        if current_active > _session_metrics["peak_concurrent_users"]:
-            _session_metrics["peak_concurrent_users"] = current_active
-            
-        pass  # Session registered
-        return True
+    pass  # Session registered
+    return True
+
+
+def _touch_session(user_id: str, thread_id: str):
+    """Mark a session as active so long-running requests are not swept as stale"""
+    _active_sessions.touch(_get_session_key(user_id, thread_id), time.monotonic())
+
+
+async def _keep_session_alive(user_id: str, thread_id: str):
+    """Touch the session periodically until cancelled, so a workflow running past the stale window keeps its slot"""
+    while True:
+        await asyncio.sleep(_SESSION_HEARTBEAT_INTERVAL)
+        _touch_session(user_id, thread_id)
 
 
 def _unregister_session(user_id: str, thread_id: str):
     """Unregister a session when complete"""
     session_key = _get_session_key(user_id, thread_id)
     
-    with _session_lock:
-        if session_key in _active_sessions:
-            session_data = _active_sessions[session_key]
-            
-            # Calculate session duration for metrics
-            if "start_time" in session_data:
-                session_duration = asyncio.get_event_loop().time() - session_data["start_time"]
-                _session_metrics["response_times"].append(session_duration)
-                
-                # Keep only last 100 response times to prevent memory growth
-                if len(_session_metrics["response_times"]) > 100:
-                    _session_metrics["response_times"] = _session_metrics["response_times"][-100:]
-            
-            del _active_sessions[session_key]
-            _session_metrics["total_sessions_completed"] += 1
-            pass  # Session unregistered
+    session_data = _active_sessions.pop(session_key)
+    if session_data is None:
+        return
+    _mark_sessions_dirty(session_key)
+    
+    with _metrics_lock:
+        # Calculate session duration for metrics
+        if "start_time" in session_data:
+            session_duration = time.monotonic() - session_data["start_time"]
+            _record_response_time(session_duration)
+        
+        _session_metrics.total_sessions_completed += 1
+    pass  # Session unregistered
+
+
+def _record_response_time(duration: float):
+    """Append to the bounded response time window and update running stats (caller holds _metrics_lock)"""
+    metrics = _session_metrics
+    response_times = metrics.response_times
+    
+    # deque(maxlen=100) drops the oldest sample on append; retire it from the aggregates first
+    if len(response_times) == response_times.maxlen:
+        evicted = response_times[0]
+        metrics.response_time_sum -= evicted
+        if evicted == metrics.response_time_min:
+            metrics.response_time_min = None
+        if evicted == metrics.response_time_max:
+            metrics.response_time_max = None
+    
+    response_times.append(duration)
+    metrics.response_time_sum += duration
+    if metrics.response_time_min is not None and duration < metrics.response_time_min:
+        metrics.response_time_min = duration
+    if metrics.response_time_max is not None and duration > metrics.response_time_max:
+        metrics.response_time_max = duration
+    if len(response_times) == 1:
+        metrics.response_time_min = metrics.response_time_max = duration
+
+
+def _get_response_time_stats() -> tuple[float, float, float, int]:
+    """Return (average, min, max, count) for the response time window"""
+    metrics = _session_metrics
+    response_times = metrics.response_times
+    
+    # Plain reads are atomic under the GIL; the status endpoint tolerates a sample of skew
+    count = len(response_times)
+    if not count:
+        return 0, 0, 0, 0
+    min_response_time, max_response_time = metrics.response_time_min, metrics.response_time_max
+    
+    if min_response_time is None or max_response_time is None:
+        # Only rescan (under the lock) when an evicted sample was the cached extreme
+        with _metrics_lock:
+            if metrics.response_time_min is None:
+                metrics.response_time_min = min(response_times)
+            if metrics.response_time_max is None:
+                metrics.response_time_max = max(response_times)
+            min_response_time, max_response_time = metrics.response_time_min, metrics.response_time_max
+    
+    return metrics.response_time_sum / count, min_response_time, max_response_time, count
 
 
 def _cleanup_stale_sessions(max_age_seconds=300):  # 5 minutes
     """Clean up sessions that haven't been active recently"""
-    current_time = asyncio.get_event_loop().time()
-    stale_sessions = []
+    current_time = time.monotonic()
     
-    with _session_lock:
-        for session_key, session_data in _active_sessions.items():
-            if current_time - session_data["last_activity"] > max_age_seconds:
-                stale_sessions.append(session_key)
-        
-        for session_key in stale_sessions:
-            del _active_sessions[session_key]
-            pass  # Cleaned up stale session
+    # Walks the map one shard at a time so registrations on other shards proceed
+    stale_sessions = _active_sessions.remove_where(
+        lambda session_data: current_time - session_data["last_activity"] > max_age_seconds
+    )
     
     if stale_sessions:
-        _session_metrics["stale_sessions_cleaned"] += len(stale_sessions)
+        _mark_sessions_dirty(*stale_sessions)
+        with _metrics_lock:
+            _session_metrics.stale_sessions_cleaned += len(stale_sessions)
         pass  # Cleaned up stale sessions
     
-    # Backup sessions to disk periodically
-    _backup_sessions_to_disk()
+    # Backup sessions to disk periodically (debounced, off the request path)
+    _request_session_flush()
+
+
+def _request_session_flush():
+    """Mark sessions dirty; the persistence worker groups pending requests into one write"""
+    global _persistence_task
+    _flush_requested.set()
+    
+    if _persistence_task is None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop to host the worker - write synchronously
+            _flush_requested.clear()
+            _backup_sessions_to_disk()
+            return
+        _persistence_task = loop.create_task(_persistence_worker())
+
+
+async def _persistence_worker():
+    """Flush sessions to disk at most once per interval, on the blocking I/O pool"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(_PERSISTENCE_FLUSH_INTERVAL)
+        if _flush_requested.is_set():
+            _flush_requested.clear()
+            await loop.run_in_executor(_thread_pool, _backup_sessions_to_disk)
 
 def _backup_sessions_to_disk():
     """Backup current sessions to disk for persistence"""
+    global _dirty_session_keys
     try:
-        with _session_lock:
+        with _backup_lock:
+            # Swap out the dirty set so flush work scales with changes, not total sessions
+            with _dirty_lock:
+                dirty_keys, _dirty_session_keys = _dirty_session_keys, set()
+            
+            for session_key in dirty_keys:
+                session_data = _active_sessions.get(session_key)
+                if session_data is None:
+                    _persisted_sessions.pop(session_key, None)
+                else:
+                    _persisted_sessions[session_key] = session_data
+            
             # Only backup if we have active sessions or metrics to save
-            if _active_sessions or _session_metrics["total_sessions_created"] > 0:
-                save_sessions_to_disk(_active_sessions.copy(), dict(_session_metrics))
+            if _persisted_sessions or _session_metrics.total_sessions_created > 0:
+                with _metrics_lock:
+                    metrics_snapshot = _session_metrics.to_dict()
+                save_sessions_to_disk(_persisted_sessions, metrics_snapshot)
     except Exception as e:
         pass  # Error backing up sessions
 
 
+def _build_response(workflow_result: Dict[str, Any]) -> tuple[str, Dict[str, Any]]:
+    """Map a workflow result onto (response_content, response_metadata)"""
+    # Handle workflow result - now all types are unified as "response"
+    if workflow_result["type"] == "response":
+        # Workflow generated complete response
+        response_content = workflow_result["response"]
+        response_metadata = {
+            "type": workflow_result.get("response_type", "unknown"),  # clarification, domain_response, not_allowed
+            "confidence": workflow_result.get("confidence", 0.5),
+            "intent": workflow_result.get("intent"),
+            "domain_relevance": workflow_result.get("domain_relevance"),
+            "enhanced_question": workflow_result.get("enhanced_question"),
+            "sub_questions_count": len(workflow_result.get("sub_questions", [])),
+            "web_queries_count": len(workflow_result.get("web_queries", [])),
+            "web_search_performed": workflow_result.get("web_search_needed", False),
+            "web_results_count": len(workflow_result.get("web_search_results", [])),
+            "scraped_sources_count": len(workflow_result.get("scraped_content", {})),
+            "sources_used": workflow_result.get("sources_used", []),
+            "iterations": workflow_result.get("iterations", 0),
+            "re_evaluator_iterations": workflow_result.get("re_evaluator_iterations", 0),
+            "agent_processing": True
+        }
+        
+    elif workflow_result["type"] == "error":
+        # Error occurred in workflow
+        response_content = workflow_result["message"]
+        response_metadata = {
+            "type": "error",
+            "error_details": workflow_result.get("error_details"),
+            "agent_processing": True
+        }
+        
+    else:
+        # Unknown result type - fallback
+        response_content = "I'm having trouble processing your request. Could you please rephrase your question?"
+        response_metadata = {
+            "type": "fallback",
+            "agent_processing": True
+        }
+    
+    return response_content, response_metadata
+
+
+def _response_cache_key(user_id: str, thread_id: str, message: str, history: List[Dict[str, Any]],
+                        translated_history: Optional[str], memory_version: str,
+                        language: str, use_web_search: bool) -> str:
+    """Content-address a request by thread, message, memory state and options"""
+    return make_cache_key(
+        user_id,
+        thread_id,
+        memory_version,
+        language,
+        "web" if use_web_search else "no-web",
+        message,
+        translated_history,
+        *(part for entry in history for part in (entry["role"], entry["content"]))
+    )
+
+
 async def generate_agent_response(
     message: str,
     chat_history: List[Message],
@@ -194,7 +522,7 @@ async def generate_agent_response(
             "metadata": {
                 "type": "capacity_limit",
                 "agent_processing": False,
-                "max_concurrent_users": settings.max_concurrent_users
+                "max_concurrent_users": _MAX_USERS
             }
         }
     
@@ -205,9 +533,12 @@ async def generate_agent_response(
         # Get workflow instance
         workflow = get_workflow_instance()
         
-        # Convert chat history to simple format
+        # Convert chat history to simple format (plain dicts, never pooled: background jobs
+        # may still read them after the request returns)
         history = []
-        for msg in chat_history[-10:]:  # Last 10 messages for context
+        # Index the tail in place instead of copying a slice (islice would walk the whole list)
+        for index in range(max(0, len(chat_history) - _HISTORY_CONTEXT_MESSAGES), len(chat_history)):
+            msg = chat_history[index]
             history.append({
                 "role": "user" if msg.author.value == "user" else "assistant",
                 "content": msg.content,
@@ -216,76 +547,55 @@ async def generate_agent_response(
         
         pass  # Using chat history
         
-        # Process query through workflow with language awareness
-        try:
-            workflow_result = await workflow.process_query(
-                user_query=message,
-                user_id=user_id,
-                thread_id=thread_id,
-                history=history,
-                language=language,
-                translated_history=translated_history
-            )
+        # Repeated questions with the same recent context skip the workflow entirely
+        cache_key = _response_cache_key(
+            user_id, thread_id, message, history, translated_history,
+            workflow.memory_manager.memory_version(user_id), language, use_web_search
+        )
+        cached_response = _response_cache.get(cache_key)
+        if cached_response is not None:
+            response_content, cached_metadata = cached_response
+            response_metadata = {**cached_metadata, "cached": True}
+            await emit_completed(thread_id)
+        else:
+            # Process query through workflow with language awareness
+            heartbeat = asyncio.create_task(_keep_session_alive(user_id, thread_id))
+            try:
+                workflow_result = await workflow.process_query(
+                    user_query=message,
+                    user_id=user_id,
+                    thread_id=thread_id,
+                    history=history,
+                    language=language,
+                    translated_history=translated_history,
+                    total_messages=len(chat_history)
+                )
             
-        except Exception as e:
-            pass  # Workflow processing error
-            # Let the error fall through to the main exception handler
-            raise e
-        
-        pass  # Workflow result processed
-        
-        # Handle workflow result - now all types are unified as "response"
-        if workflow_result["type"] == "response":
-            # Workflow generated complete response
-            response_content = workflow_result["response"]
-            response_metadata = {
-                "type": workflow_result.get("response_type", "unknown"),  # clarification, domain_response, not_allowed
-                "confidence": workflow_result.get("confidence", 0.5),
-                "intent": workflow_result.get("intent"),
-                "domain_relevance": workflow_result.get("domain_relevance"),
-                "enhanced_question": workflow_result.get("enhanced_question"),
-                "sub_questions_count": len(workflow_result.get("sub_questions", [])),
-                "web_queries_count": len(workflow_result.get("web_queries", [])),
-                "web_search_performed": workflow_result.get("web_search_needed", False),
-                "web_results_count": len(workflow_result.get("web_search_results", [])),
-                "scraped_sources_count": len(workflow_result.get("scraped_content", {})),
-                "sources_used": workflow_result.get("sources_used", []),
-                "iterations": workflow_result.get("iterations", 0),
-                "re_evaluator_iterations": workflow_result.get("re_evaluator_iterations", 0),
-                "agent_processing": True
-            }
+            except Exception as e:
+                pass  # Workflow processing error
+                # Let the error fall through to the main exception handler
+                raise e
+            finally:
+                heartbeat.cancel()
             
-        elif workflow_result["type"] == "error":
-            # Error occurred in workflow
-            response_content = workflow_result["message"]
-            response_metadata = {
-                "type": "error",
-                "error_details": workflow_result.get("error_details"),
-                "agent_processing": True
-            }
+            pass  # Workflow result processed
             
-        else:
-            # Unknown result type - fallback
-            response_content = "I'm having trouble processing your request. Could you please rephrase your question?"
-            response_metadata = {
-                "type": "fallback",
-                "agent_processing": True
-            }
+            response_content, response_metadata = _build_response(workflow_result)
+            if workflow_result["type"] == "response":
+                _response_cache.set(cache_key, (response_content, response_metadata.copy()))
         
         # Trigger educational content agent independently with LTM processing (fire-and-forget)
         from .educational_agent import get_educational_agent
         educational_agent = get_educational_agent()
-        asyncio.create_task(
-            educational_agent.process_educational_trigger(
-                user_id=user_id,
-                user_query=message,
-                response_type=response_metadata.get("type", "unknown"),
-                conversation_history=history
-            )
-        )
+        submit_background(educational_agent.process_educational_trigger(
+            user_id=user_id,
+            user_query=message,
+            response_type=response_metadata.get("type", "unknown"),
+            conversation_history=history
+        ))
         
         # Update memory with assistant response for educational agent only (run in background - non-blocking)
-        asyncio.create_task(workflow.memory_manager.process_message(
+        submit_background(workflow.memory_manager.process_message(
             user_id, thread_id, "assistant", response_content, chat_history, for_educational_agent=True
         ))
         
@@ -304,7 +614,8 @@ async def generate_agent_response(
         
         # Track error in metrics
         error_type = type(e).__name__
-        _session_metrics["error_counts"][error_type] += 1
+        with _metrics_lock:
+            _session_metrics.error_counts[error_type] += 1
         
         # Unregister session on error
         _unregister_session(user_id, thread_id)
@@ -324,37 +635,58 @@ async def generate_agent_response(
 
 
 
+# Fallback categories in match priority order (first category with a matching term wins)
+_FALLBACK_CATEGORY_TERMS = (
+    ("aws", ("aws", "amazon", "ec2", "s3", "lambda")),
+    ("azure", ("azure", "microsoft", "virtual machine")),
+    ("gcp", ("gcp", "google cloud", "compute engine")),
+    ("security", ("security", "firewall", "vpn", "ssl")),
+)
+
+# All terms in one alternation with a named group per category, so a message is scanned once
+_FALLBACK_CATEGORY_RE = re.compile(
+    "|".join(
+        f"(?P<{category}>{'|'.join(re.escape(term) for term in terms)})"
+        for category, terms in _FALLBACK_CATEGORY_TERMS
+    ),
+    re.IGNORECASE
+)
+_FALLBACK_CATEGORY_PRIORITY = {category: index for index, (category, _) in enumerate(_FALLBACK_CATEGORY_TERMS)}
+
+
+@lru_cache(maxsize=256)
+def _fallback_category(message: str) -> str:
+    """Classify a message into a fallback category (memoized for repeated failures)"""
+    best_category = "general"
+    best_priority = len(_FALLBACK_CATEGORY_PRIORITY)
+    for match in _FALLBACK_CATEGORY_RE.finditer(message):
+        priority = _FALLBACK_CATEGORY_PRIORITY[match.lastgroup]
+        if priority < best_priority:
+            best_category, best_priority = match.lastgroup, priority
+            if priority == 0:
+                break
+    return best_category
+
+
+# Static fallback texts keyed by (category, language); non-SIN languages use the ENG text
+_FALLBACK_RESPONSES = MappingProxyType({
+    ("aws", "SIN"): "AWS සේවා පිළිබඳ ඔබගේ ප්‍රශ්නය සඳහා, AWS documentation හෝ AWS Support Center වෙතින් සහාය ගන්න.",
+    ("aws", "ENG"): "For AWS-related questions, I recommend checking the AWS Documentation or contacting AWS Support for detailed guidance on EC2, S3, Lambda, and other services.",
+    ("azure", "SIN"): "Microsoft Azure සේවා පිළිබඳ, Azure Portal හෝ Microsoft Learn හරහා වැඩිදුර තොරතුරු ලබා ගන්න.",
+    ("azure", "ENG"): "For Microsoft Azure questions, please refer to the Azure Portal documentation or Microsoft Learn for comprehensive guides on virtual machines, storage, and other services.",
+    ("gcp", "SIN"): "Google Cloud Platform පිළිබඳ ඔබගේ ප්‍රශ්නය සඳහා, GCP Console හෝ Google Cloud Documentation බලන්න.",
+    ("gcp", "ENG"): "For Google Cloud Platform questions, I suggest consulting the GCP Console documentation or Google Cloud guides for information about Compute Engine, Cloud Storage, and other services.",
+    ("security", "SIN"): "ජාල ආරක්ෂාව පිළිබඳ, කරුණාකර ඔබගේ cloud provider ගේ security best practices ගණන් ගන්න.",
+    ("security", "ENG"): "For security and network configuration questions, please follow your cloud provider's security best practices and consider consulting with your organization's security team.",
+    ("general", "SIN"): "මම වලාකුළු සේවා (AWS, Azure, GCP), ආරක්ෂාව, සහ ජාල වින්‍යාසය පිළිබඳ ප්‍රශ්න වලට උපකාර කරමි. කරුණාකර ඔබගේ ප්‍රශ්නය වඩාත් නිශ්චිතව නැවත ප්‍රකාශ කරන්න.",
+    ("general", "ENG"): "I'm here to help with cloud services (AWS, Azure, GCP), security, and network configuration questions. Could you please provide more specific details about what you'd like assistance with?"
+})
+
+
 def _generate_fallback_response(message: str, language: str = "ENG") -> str:
     """Generate fallback responses when agent service is unavailable"""
-    
-    message_lower = message.lower()
-    
-    # Cloud provider specific responses
-    if any(term in message_lower for term in ["aws", "amazon", "ec2", "s3", "lambda"]):
-        if language == "SIN":
-            return "AWS සේවා පිළිබඳ ඔබගේ ප්‍රශ්නය සඳහා, AWS documentation හෝ AWS Support Center වෙතින් සහාය ගන්න."
-        return "For AWS-related questions, I recommend checking the AWS Documentation or contacting AWS Support for detailed guidance on EC2, S3, Lambda, and other services."
-    
-    elif any(term in message_lower for term in ["azure", "microsoft", "virtual machine"]):
-        if language == "SIN":
-            return "Microsoft Azure සේවා පිළිබඳ, Azure Portal හෝ Microsoft Learn හරහා වැඩිදුර තොරතුරු ලබා ගන්න."
-        return "For Microsoft Azure questions, please refer to the Azure Portal documentation or Microsoft Learn for comprehensive guides on virtual machines, storage, and other services."
-    
-    elif any(term in message_lower for term in ["gcp", "google cloud", "compute engine"]):
-        if language == "SIN":
-            return "Google Cloud Platform පිළිබඳ ඔබගේ ප්‍රශ්නය සඳහා, GCP Console හෝ Google Cloud Documentation බලන්න."
-        return "For Google Cloud Platform questions, I suggest consulting the GCP Console documentation or Google Cloud guides for information about Compute Engine, Cloud Storage, and other services."
-    
-    elif any(term in message_lower for term in ["security", "firewall", "vpn", "ssl"]):
-        if language == "SIN":
-            return "ජාල ආරක්ෂාව පිළිබඳ, කරුණාකර ඔබගේ cloud provider ගේ security best practices ගණන් ගන්න."
-        return "For security and network configuration questions, please follow your cloud provider's security best practices and consider consulting with your organization's security team."
-    
-    # General fallback
-    if language == "SIN":
-        return "මම වලාකුළු සේවා (AWS, Azure, GCP), ආරක්ෂාව, සහ ජාල වින්‍යාසය පිළිබඳ ප්‍රශ්න වලට උපකාර කරමි. කරුණාකර ඔබගේ ප්‍රශ්නය වඩාත් නිශ්චිතව නැවත ප්‍රකාශ කරන්න."
-    
-    return "I'm here to help with cloud services (AWS, Azure, GCP), security, and network configuration questions. Could you please provide more specific details about what you'd like assistance with?"
+    category = _fallback_category(message)
+    return _FALLBACK_RESPONSES.get((category, language)) or _FALLBACK_RESPONSES[(category, "ENG")]
 
 
 def get_agent_status() -> Dict[str, Any]:
@@ -364,58 +696,57 @@ def get_agent_status() -> Dict[str, Any]:
         workflow_status = workflow.get_workflow_status()
         
         # Calculate response time statistics
-        response_times = _session_metrics["response_times"]
-        if response_times:
-            avg_response_time = sum(response_times) / len(response_times)
-            min_response_time = min(response_times)
-            max_response_time = max(response_times)
-        else:
-            avg_response_time = min_response_time = max_response_time = 0
+        avg_response_time, min_response_time, max_response_time, response_count = _get_response_time_stats()
+        
+        # Lock-free snapshot of counters; slight skew between fields is acceptable for status
+        current_active = len(_active_sessions)
+        metrics = _session_metrics
+        error_counts = metrics.error_counts.copy()
+        total_errors = error_counts.total()
+        total_sessions_created = metrics.total_sessions_created
         
-        # Add detailed session management info
-        with _session_lock:
-            current_active = len(_active_sessions)
-            session_info = {
-                "active_sessions": current_active,
-                "max_concurrent_users": settings.max_concurrent_users,
-                "capacity_utilization": current_active / settings.max_concurrent_users,
-                "session_details": list(_active_sessions.keys()),
+        # Add detailed session management info (per-shard snapshot, no global lock)
+        session_info = {
+            "active_sessions": current_active,
+            "max_concurrent_users": _MAX_USERS,
+            "capacity_utilization": current_active / _MAX_USERS,
+            "session_details": list(_active_sessions.keys()),
+            
+            # Performance metrics
+            "metrics": {
+                "total_sessions_created": total_sessions_created,
+                "total_sessions_completed": metrics.total_sessions_completed,
+                "capacity_limit_hits": metrics.capacity_limit_hits,
+                "stale_sessions_cleaned": metrics.stale_sessions_cleaned,
+                "peak_concurrent_users": metrics.peak_concurrent_users,
+                "uptime_seconds": time.time() - metrics.startup_time,
                 
-                # Performance metrics
-                "metrics": {
-                    "total_sessions_created": _session_metrics["total_sessions_created"],
-                    "total_sessions_completed": _session_metrics["total_sessions_completed"],
-                    "capacity_limit_hits": _session_metrics["capacity_limit_hits"],
-                    "stale_sessions_cleaned": _session_metrics["stale_sessions_cleaned"],
-                    "peak_concurrent_users": _session_metrics["peak_concurrent_users"],
-                    "uptime_seconds": time.time() - _session_metrics["startup_time"],
-                    
-                    # Response time statistics
-                    "response_times": {
-                        "average_seconds": round(avg_response_time, 2),
-                        "min_seconds": round(min_response_time, 2),
-                        "max_seconds": round(max_response_time, 2),
-                        "sample_count": len(response_times)
-                    },
-                    
-                    # Error statistics
-                    "error_counts": dict(_session_metrics["error_counts"]),
-                    "total_errors": sum(_session_metrics["error_counts"].values()),
-                    
-                    # System health indicators
-                    "health_indicators": {
-                        "capacity_pressure": "HIGH" if current_active >= settings.max_concurrent_users * 0.8 else "NORMAL",
-                        "error_rate": sum(_session_metrics["error_counts"].values()) / max(_session_metrics["total_sessions_created"], 1),
-                        "avg_session_duration": round(avg_response_time, 2) if avg_response_time else 0
-                    }
+                # Response time statistics
+                "response_times": {
+                    "average_seconds": round(avg_response_time, 2),
+                    "min_seconds": round(min_response_time, 2),
+                    "max_seconds": round(max_response_time, 2),
+                    "sample_count": response_count
                 },
                 
-                # Session persistence info
-                "persistence": get_persistence_status(),
+                # Error statistics
+                "error_counts": dict(error_counts),
+                "total_errors": total_errors,
                 
-                # Circuit breaker status
-                "circuit_breakers": circuit_manager.get_all_stats()
-            }
+                # System health indicators
+                "health_indicators": {
+                    "capacity_pressure": "HIGH" if current_active >= _MAX_USERS * 0.8 else "NORMAL",
+                    "error_rate": total_errors / max(total_sessions_created, 1),
+                    "avg_session_duration": round(avg_response_time, 2) if avg_response_time else 0
+                }
+            },
+            
+            # Session persistence info
+            "persistence": get_persistence_status(),
+            
+            # Circuit breaker status
+            "circuit_breakers": circuit_manager.get_all_stats()
+        }
         
         workflow_status["session_management"] = session_info
         return workflow_status
@@ -426,11 +757,11 @@ def get_agent_status() -> Dict[str, Any]:
             "workflow_initialized": False,
             "session_management": {
                 "active_sessions": 0,
-                "max_concurrent_users": settings.max_concurrent_users,
+                "max_concurrent_users": _MAX_USERS,
                 "error": str(e),
                 "metrics": {
-                    "total_sessions_created": _session_metrics.get("total_sessions_created", 0),
-                    "error_counts": dict(_session_metrics.get("error_counts", {}))
+                    "total_sessions_created": _session_metrics.total_sessions_created,
+                    "error_counts": dict(_session_metrics.error_counts)
                 }
             }
         }
\ No newline at end of file
@@ -9,39 +9,161 @@ Four core agents:
 """
 
 import asyncio
-from typing import Dict, Any, List
-from langchain_openai import ChatOpenAI
+import json
+import logging
+import math
+import re
+import tiktoken
+from typing import Dict, Any, List, Type, Callable, Optional
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
-from openai import OpenAI
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
 
 from app.core.config import settings
-from .models import IntentExtractionResult, QuestionEnhancement, QuestionDecomposition, ValidationResult, WebSearchResultEvaluation, ResponseGeneration, URLRelevanceEvaluation
+from .models import IntentExtractionResult, CombinedIntentEnhancement, QuestionEnhancement, QuestionDecomposition, SubQuestionRefinement, WebQueryRefinement, ValidationResult, WebSearchResultEvaluation, URLRelevanceEvaluation, Source
 from .web_search import WebSearchService
 from .knowledge_base_retrieval import get_knowledge_base_retriever
+from .semantic_cache import semantic_cache, best_match
+from .response_cache import make_cache_key
+from .background import submit_background
+from .clients import deepseek_client, openai_chat
+from .workflow_state import emit_response_progress
+
+logger = logging.getLogger(__name__)
+
+
+_INTENT_EXTRACTION_INSTRUCTIONS = """
+You are an expert intent analyzer for user queries in a conversational AI system focused on cloud services and related technical topics. Your task is to deeply understand the user's true intention behind their query by analyzing the thinking process implied in their words and the conversation history, rather than just keywords. Do not perform superficial keyword matching; instead, reason step by step about the user's likely goals, context from prior exchanges, any implied needs, and how the query fits into ongoing dialogue.
+Step-by-Step Reasoning Process:
+
+Review the Conversation History: Examine the last 6 exchanges to understand the context, flow, and any evolving topics. Consider how previous responses or questions might influence the current query's meaning.
+Infer True Intention: Think critically about what the user is really seeking. Break down the query's structure, tone, and implications. Ask yourself: What problem are they trying to solve? What outcome do they expect? How does this build on history? Avoid assumptions based on isolated words; focus on holistic reasoning.
+Classify Relevance Type: Based on the inferred intention, classify into one of these categories:
+
+domain: If the intention involves cloud service-related topics (e.g., AWS, Azure, GCP services), simple network topics (e.g., basic networking concepts like IP, subnets), data security (e.g., encryption, access controls), cloud security (e.g., IAM, firewalls in cloud), troubleshooting cloud service issues (e.g., deployment failures, connectivity problems), or identifying errors specifically in these areas.
+general: If the intention is outside the domain topics, such as general knowledge questions, greetings (e.g., "Hi", "How are you?", "Thanks"), misuse of system prompts/commands, paraphrasing, grammar checking, writing requests unrelated to domain, or generating/solving/debugging code in any programming language (except Linux/Windows CLI, AWS/Azure CLI commands).
+
+
+Assess Confidence Level: Evaluate your confidence in the intention extraction and classification:
+
+HIGH: Clear, unambiguous intention with strong alignment to history.
+MEDIUM: Reasonable inference but some ambiguity.
+LOW: Unclear, vague, or conflicting signals (e.g., misspellings, unidentified content).
+
+
+Determine Clarification Need: If confidence is LOW or the query has misspelled/unidentified content making intention hard to discern, set clarification_needed=true. Otherwise, set to false.
+Generate Clarification Question (if needed): If clarification_needed=true, create one concise, helpful question to guide the user toward clarifying their intent. This question must encourage them to rephrase in terms of domain topics (e.g., cloud services, security, troubleshooting) if possible, helping them express a clearer idea without leading too much.
+"""
+
+
+# JSON mode makes the provider return a bare JSON object, so replies load directly
+# into the result model without the output parser's regex extraction
+_JSON_RESPONSE_FORMAT = {"type": "json_object"}
+
+
+def _fast_parser(model: Type[BaseModel]) -> Callable[[str], BaseModel]:
+    """Build a parser that validates a JSON reply straight into the model in pydantic-core"""
+    # JSON mode guarantees well-formed JSON but not the schema, so the reply is still fully validated;
+    # a ValidationError falls through to each agent's fallback
+    return model.model_validate_json
+
+
+def _structured_output(model: Type[BaseModel]) -> Runnable:
+    """Load a JSON-mode chat message straight into the given result model"""
+    parse = _fast_parser(model)
+    return RunnableLambda(lambda message: parse(message.content))
+
+
+# Matches the intent field once its closing quote has streamed in
+_STREAMED_INTENT_RE = re.compile(r'"intent"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _format_history(history: List[Dict[str, Any]], n: int = 6, max_chars: int = 400) -> str:
+    """Render the last n messages as compact "U: ..." / "A: ..." lines with truncated bodies"""
+    lines = []
+    for msg in history[-n:]:
+        prefix = "U" if msg.get("role") == "user" else "A"
+        lines.append(f"{prefix}: {str(msg.get('content', ''))[:max_chars]}")
+    return "\n".join(lines)
+
+
+def _history_text(state: Dict[str, Any]) -> str:
+    """Formatted history for prompts, computed once per request and kept on the state"""
+    if state.get("formatted_history") is None:
+        state["formatted_history"] = _format_history(state["history"])
+    return state["formatted_history"]
+
+
+def _normalized_query(query: str) -> str:
+    """Query with whitespace collapsed and case folded, as embedded for the semantic cache"""
+    return " ".join(query.split()).lower()
+
+
+def start_query_embedding(user_query: str) -> asyncio.Task:
+    """Start embedding the query for semantic cache lookups, so the round trip overlaps other setup work"""
+    return asyncio.create_task(semantic_cache.embed(_normalized_query(user_query)))
+
+
+async def _query_vector(state: Dict[str, Any]):
+    """Semantic cache embedding of the user query, started by the workflow alongside memory retrieval and shared by every agent"""
+    task = state.get("query_embedding")
+    if task is None:
+        return await semantic_cache.embed(_normalized_query(state["user_query"]))
+    return await task
+
+
+def _cache_scope(state: Dict[str, Any], namespace: str) -> str:
+    """Agent namespace restricted to the request's user and thread"""
+    return semantic_cache.scoped(namespace, state["user_id"], state["thread_id"])
+
+
+_QUESTION_ENHANCEMENT_RULES = """
+Instructions:
+1. Rewrite the intent as a focused, unambiguous question about cloud services, network configuration, Data Security and compliance security, or troubleshooting
+2. Make it specific and actionable for related topic contexts
+3. Consider the user's expertise level and preferences from memory
+4. Keep it concise but complete
+5. Remove any ambiguity or vagueness
+6. Avoid halucination an keep the question simple align with user actual intention
+
+Examples:
+- Intent: "having issues with cloud setup" → Enhanced: "How do I troubleshoot cloud infrastructure deployment issues in AWS/Azure ?"
+- Intent: "need help with database performance" → Enhanced: "What are the steps to optimize database query performance in cloud environments?"
+- Intent: "security concerns" → Enhanced: "What are the best practices for securing cloud infrastructure and network configurations?"
+"""
+
+_COMBINED_ENHANCEMENT_INSTRUCTIONS = """
+Enhance the Question: If domain_relevance is not "general" and clarification_needed=false, also transform the extracted intent into a clear, actionable enhanced_question. Otherwise set enhanced_question to null.
+""" + _QUESTION_ENHANCEMENT_RULES
+
+_CONFIDENCE_SCORES = {"high": 0.9, "medium": 0.6}
 
 
 class IntentionExtractor:
     """Extracts and clarifies user intentions"""
     
     def __init__(self):
-        print("[IntentionExtractor] Initializing intention extraction agent")
+        logger.info("[IntentionExtractor] Initializing intention extraction agent")
         if settings.deepseek_api_key:
-            self.client = OpenAI(
-                api_key=settings.deepseek_api_key,
-                base_url="https://api.deepseek.com"
-            )
+            self.client = deepseek_client
             self.parser = PydanticOutputParser(pydantic_object=IntentExtractionResult)
+            self.system_prompt = _INTENT_EXTRACTION_INSTRUCTIONS + "\n" + self.parser.get_format_instructions()
+            self.parse_result = _fast_parser(IntentExtractionResult)
         else:
-            print("[IntentionExtractor] Warning: No DeepSeek API key available")
+            logger.warning("[IntentionExtractor] Warning: No DeepSeek API key available")
             self.client = None
             self.parser = None
+            self.system_prompt = None
+        self.cache_namespace = semantic_cache.namespace("intention_extractor", 0.5)
     
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        print(f"[IntentionExtractor] Processing query: {state['user_query'][:50]}...")
+    async def __call__(self, state: Dict[str, Any],
+                       on_intent: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Extract the intent, calling on_intent as soon as the intent field has streamed in"""
+        logger.info("[IntentionExtractor] Processing query: %s...", state['user_query'][:50])
         
         if not self.client:
-            print("[IntentionExtractor] Falling back to simple intent extraction")
+            logger.info("[IntentionExtractor] Falling back to simple intent extraction")
             # Fallback behavior
             state["current_intent"] = state["user_query"]
             state["needs_clarification"] = False
@@ -49,83 +171,85 @@ class IntentionExtractor:
             state["confidence_score"] = 0.5
             return state
         
+        history_text = _history_text(state)
+        
+        # A near-duplicate query in this thread with the same history reuses an earlier extraction
+        cache_namespace = _cache_scope(state, self.cache_namespace)
+        cache_context = make_cache_key(history_text)
+        cache_vector = await _query_vector(state)
+        cached = semantic_cache.lookup(cache_namespace, cache_vector, cache_context)
+        if cached is not None:
+            logger.info("[IntentionExtractor] Semantic cache hit")
+            state.update(cached)
+            return state
         
         try:
-            # Format the prompt with the data
-            prompt_text = f"""
-            You are an expert intent analyzer for user queries in a conversational AI system focused on cloud services and related technical topics. Your task is to deeply understand the user's true intention behind their query by analyzing the thinking process implied in their words and the conversation history, rather than just keywords. Do not perform superficial keyword matching; instead, reason step by step about the user's likely goals, context from prior exchanges, any implied needs, and how the query fits into ongoing dialogue.
-            Input:
-
-            User Query: {state["user_query"]}
-            Conversation History: {str(state["history"][-6:])}
-
-            Step-by-Step Reasoning Process:
-
-            Review the Conversation History: Examine the last 6 exchanges to understand the context, flow, and any evolving topics. Consider how previous responses or questions might influence the current query's meaning.
-            Infer True Intention: Think critically about what the user is really seeking. Break down the query's structure, tone, and implications. Ask yourself: What problem are they trying to solve? What outcome do they expect? How does this build on history? Avoid assumptions based on isolated words; focus on holistic reasoning.
-            Classify Relevance Type: Based on the inferred intention, classify into one of these categories:
-
-            domain: If the intention involves cloud service-related topics (e.g., AWS, Azure, GCP services), simple network topics (e.g., basic networking concepts like IP, subnets), data security (e.g., encryption, access controls), cloud security (e.g., IAM, firewalls in cloud), troubleshooting cloud service issues (e.g., deployment failures, connectivity problems), or identifying errors specifically in these areas.
-            general: If the intention is outside the domain topics, such as general knowledge questions, greetings (e.g., "Hi", "How are you?", "Thanks"), misuse of system prompts/commands, paraphrasing, grammar checking, writing requests unrelated to domain, or generating/solving/debugging code in any programming language (except Linux/Windows CLI, AWS/Azure CLI commands).
-
-
-            Assess Confidence Level: Evaluate your confidence in the intention extraction and classification:
-
-            HIGH: Clear, unambiguous intention with strong alignment to history.
-            MEDIUM: Reasonable inference but some ambiguity.
-            LOW: Unclear, vague, or conflicting signals (e.g., misspellings, unidentified content).
-
-
-            Determine Clarification Need: If confidence is LOW or the query has misspelled/unidentified content making intention hard to discern, set clarification_needed=true. Otherwise, set to false.
-            Generate Clarification Question (if needed): If clarification_needed=true, create one concise, helpful question to guide the user toward clarifying their intent. This question must encourage them to rephrase in terms of domain topics (e.g., cloud services, security, troubleshooting) if possible, helping them express a clearer idea without leading too much.
-                        
-            {self.parser.get_format_instructions()}
-            """
-            
-            # Call DeepSeek API
-            response = self.client.chat.completions.create(
+            # Static instructions go first as the system message so the provider can cache the prefix
+            stream = await self.client.chat.completions.create(
                 model="deepseek-chat",
                 messages=[
-                    {"role": "user", "content": prompt_text}
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": f"User Query: {state['user_query']}\nConversation History:\n{history_text}"}
                 ],
-                temperature=0.5
+                temperature=0.5,
+                response_format=_JSON_RESPONSE_FORMAT,
+                stream=True
             )
             
+            # Intent is the first schema field, so it usually completes well before the rest of the JSON
+            chunks = []
+            usage = None
+            intent_pending = on_intent is not None
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.append(chunk.choices[0].delta.content)
+                    if intent_pending:
+                        match = _STREAMED_INTENT_RE.search("".join(chunks))
+                        if match:
+                            intent_pending = False
+                            streamed_intent = json.loads(f'"{match.group(1)}"')
+                            if streamed_intent:
+                                on_intent(streamed_intent)
+                usage = getattr(chunk, "usage", None) or usage
+
+            # DeepSeek reports how much of the prompt was served from its prefix cache
+            if usage is not None:
+                logger.info("[IntentionExtractor] Prompt cache hit tokens: %s/%s", getattr(usage, 'prompt_cache_hit_tokens', 0), usage.prompt_tokens)
+
             # Parse the response
-            response_text = response.choices[0].message.content
-            result = self.parser.parse(response_text)
+            response_text = "".join(chunks)
+            result = self.parse_result(response_text)
             
-            # Handle both dict and object responses defensively
-            if isinstance(result, dict):
-                print("[IntentionExtractor] Warning: Received dict instead of Pydantic object, handling gracefully")
-                intent = result.get("intent", state["user_query"])
-                confidence = result.get("confidence", "low") 
-                domain_relevance = result.get("domain_relevance", "followup")
-                clarification_needed = result.get("clarification_needed", True)
-                clarification_question = result.get("clarification_question", "Could you please provide more details about what you're trying to accomplish ?")
-            else:
-                intent = result.intent
-                confidence = result.confidence
-                domain_relevance = result.domain_relevance
-                clarification_needed = result.clarification_needed
-                clarification_question = result.clarification_question
+            intent = result.intent
+            confidence = result.confidence
+            domain_relevance = result.domain_relevance
+            clarification_needed = result.clarification_needed
+            clarification_question = result.clarification_question
             
-            print(f"[IntentionExtractor] Extracted intent: {intent}")
-            print(f"[IntentionExtractor] Confidence: {confidence}")
-            print(f"[IntentionExtractor] Domain relevance: {domain_relevance}")
-            print(f"[IntentionExtractor] Needs clarification: {clarification_needed}")
+            logger.info("[IntentionExtractor] Extracted intent: %s", intent)
+            logger.info("[IntentionExtractor] Confidence: %s", confidence)
+            logger.info("[IntentionExtractor] Domain relevance: %s", domain_relevance)
+            logger.info("[IntentionExtractor] Needs clarification: %s", clarification_needed)
             
             # Update state
             state["current_intent"] = intent
             state["domain_relevance"] = domain_relevance
             state["needs_clarification"] = clarification_needed
             state["clarification_question"] = clarification_question
-            state["confidence_score"] = 0.9 if confidence == "high" else 0.6 if confidence == "medium" else 0.3
+            state["confidence_score"] = _CONFIDENCE_SCORES.get(confidence, 0.3)
+            
+            semantic_cache.store(cache_namespace, cache_vector, {
+                "current_intent": state["current_intent"],
+                "domain_relevance": state["domain_relevance"],
+                "needs_clarification": state["needs_clarification"],
+                "clarification_question": state["clarification_question"],
+                "confidence_score": state["confidence_score"]
+            }, cache_context)
             
             return state
             
         except Exception as e:
-            print(f"[IntentionExtractor] Error during intent extraction: {e}")
+            logger.error("[IntentionExtractor] Error during intent extraction: %s", e)
             # Fallback
             state["current_intent"] = state["user_query"]
             state["domain_relevance"] = "followup"  # Default to followup on error
@@ -135,29 +259,123 @@ class IntentionExtractor:
             return state
 
 
+class IntentAndEnhance:
+    """Extracts the intent and enhances it into a question in a single DeepSeek call"""
+    
+    def __init__(self, intention_extractor: IntentionExtractor):
+        logger.info("[IntentAndEnhance] Initializing combined intent extraction and enhancement agent")
+        # Used as the fallback whenever the combined call is unavailable or fails
+        self.intention_extractor = intention_extractor
+        self.client = deepseek_client
+        if self.client:
+            self.parser = PydanticOutputParser(pydantic_object=CombinedIntentEnhancement)
+            self.system_prompt = (
+                _INTENT_EXTRACTION_INSTRUCTIONS + "\n" + _COMBINED_ENHANCEMENT_INSTRUCTIONS
+                + "\n" + self.parser.get_format_instructions()
+            )
+            self.parse_result = _fast_parser(CombinedIntentEnhancement)
+        else:
+            self.parser = None
+            self.system_prompt = None
+        self.cache_namespace = semantic_cache.namespace("intent_and_enhance", 0.5)
+    
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if not self.client:
+            return await self.intention_extractor(state)
+        
+        logger.info("[IntentAndEnhance] Processing query: %s...", state['user_query'][:50])
+        history_text = _history_text(state)
+        ltm_summary = state["memory_context"].get("ltm_summary", "")
+        
+        cache_namespace = _cache_scope(state, self.cache_namespace)
+        cache_context = make_cache_key(history_text, ltm_summary)
+        cache_vector = await _query_vector(state)
+        cached = semantic_cache.lookup(cache_namespace, cache_vector, cache_context)
+        if cached is not None:
+            logger.info("[IntentAndEnhance] Semantic cache hit")
+            state.update(cached)
+            return state
+        
+        try:
+            response = await self.client.chat.completions.create(
+                model="deepseek-chat",
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": f"User Query: {state['user_query']}\nConversation History:\n{history_text}\nMemory Context: {ltm_summary}"}
+                ],
+                temperature=0.5,
+                response_format=_JSON_RESPONSE_FORMAT
+            )
+            result = self.parse_result(response.choices[0].message.content)
+        except Exception as e:
+            logger.error("[IntentAndEnhance] Combined call failed, falling back to separate agents: %s", e)
+            return await self.intention_extractor(state)
+        
+        logger.info("[IntentAndEnhance] Extracted intent: %s", result.intent)
+        logger.info("[IntentAndEnhance] Domain relevance: %s", result.domain_relevance)
+        logger.info("[IntentAndEnhance] Needs clarification: %s", result.clarification_needed)
+        
+        state["current_intent"] = result.intent
+        state["domain_relevance"] = result.domain_relevance
+        state["needs_clarification"] = result.clarification_needed
+        state["clarification_question"] = result.clarification_question
+        state["confidence_score"] = _CONFIDENCE_SCORES.get(result.confidence, 0.3)
+        # Only keep the enhancement when the router will actually continue to retrieval
+        if result.clarification_needed or result.domain_relevance == "general":
+            state["enhanced_question"] = None
+        else:
+            state["enhanced_question"] = result.enhanced_question or result.intent
+            logger.info("[IntentAndEnhance] Enhanced question: %s", state["enhanced_question"])
+        
+        semantic_cache.store(cache_namespace, cache_vector, {
+            "current_intent": state["current_intent"],
+            "domain_relevance": state["domain_relevance"],
+            "needs_clarification": state["needs_clarification"],
+            "clarification_question": state["clarification_question"],
+            "confidence_score": state["confidence_score"],
+            "enhanced_question": state["enhanced_question"]
+        }, cache_context)
+        
+        return state
+
+
 class QuestionEnhancer:
     """Enhances and simplifies extracted intents into clear questions"""
     
     def __init__(self):
-        print("[QuestionEnhancer] Initializing question enhancement agent")
+        logger.info("[QuestionEnhancer] Initializing question enhancement agent")
         if settings.openai_api_key:
-            self.llm = ChatOpenAI(
-                model=settings.openai_model, 
-                temperature=0,
-                api_key=settings.openai_api_key
-            )
+            self.llm = openai_chat.bind(temperature=0)
             self.parser = PydanticOutputParser(pydantic_object=QuestionEnhancement)
+            # Static instructions lead in the system message so the provider can cache the prompt prefix
+            self.prompt = ChatPromptTemplate.from_messages([
+                ("system", """
+            You are a question enhancement specialist for cloud services (AWS, Azure), network configuration, Data Security and compliance security, or troubleshooting. Transform the extracted intent into a clear, actionable question.
+            """ + _QUESTION_ENHANCEMENT_RULES + """
+            If feedback is provided below, carefully incorporate those improvements.
+        
+            {format_instructions}
+            """),
+                ("human", """
+            Extracted Intent: {intent}
+            Memory Context: {memory_context}
+            {feedback_context}
+            """)
+            ])
+            self.format_instructions = self.parser.get_format_instructions()
+            self.chain = self.prompt | self.llm.bind(response_format=_JSON_RESPONSE_FORMAT) | _structured_output(QuestionEnhancement)
         else:
-            print("[QuestionEnhancer] Warning: No OpenAI API key available")
+            logger.warning("[QuestionEnhancer] Warning: No OpenAI API key available")
             self.llm = None
             self.parser = None
+        self.cache_namespace = semantic_cache.namespace("question_enhancer", 0)
     
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         if not state["current_intent"]:
-            print("[QuestionEnhancer] No intent to enhance, skipping")
+            logger.info("[QuestionEnhancer] No intent to enhance, skipping")
             return state
             
-        print(f"[QuestionEnhancer] Enhancing intent: {state['current_intent'][:50]}...")
+        logger.info("[QuestionEnhancer] Enhancing intent: %s...", state['current_intent'][:50])
         
         # Check if we have feedback to incorporate
         feedback_context = ""
@@ -173,260 +391,324 @@ class QuestionEnhancer:
         Please incorporate this feedback to improve your enhancement approach.
         """
         
-        prompt = ChatPromptTemplate.from_template("""
-        You are a question enhancement specialist for cloud services (AWS, Azure), network configuration, Data Security and compliance security, or troubleshooting. Transform the extracted intent into a clear, actionable question.
-        
-        Extracted Intent: {intent}
-        Memory Context: {memory_context}
-        {feedback_context}
-        
-        Instructions:
-        1. Rewrite the intent as a focused, unambiguous question about cloud services, network configuration, Data Security and compliance security, or troubleshooting
-        2. Make it specific and actionable for related topic contexts
-        3. Consider the user's expertise level and preferences from memory
-        4. Keep it concise but complete
-        5. Remove any ambiguity or vagueness
-        6. If feedback is provided above, carefully incorporate those improvements
-        7. Avoid halucination an keep the question simple align with user actual intention
-        
-                                                  
-        Examples:
-        - Intent: "having issues with cloud setup" → Enhanced: "How do I troubleshoot cloud infrastructure deployment issues in AWS/Azure ?"
-        - Intent: "need help with database performance" → Enhanced: "What are the steps to optimize database query performance in cloud environments?"
-        - Intent: "security concerns" → Enhanced: "What are the best practices for securing cloud infrastructure and network configurations?"
+        state["enhanced_question"] = await self.enhance(
+            state["current_intent"],
+            state["memory_context"].get("ltm_summary", ""),
+            _cache_scope(state, self.cache_namespace),
+            feedback_context
+        )
+        return state
+    
+    async def enhance(self, intent: str, ltm_summary: str, cache_namespace: str, feedback_context: str = "") -> str:
+        """Turn an intent into an enhanced question, falling back to the intent itself on error
         
-        {format_instructions}
-        """)
+        cache_namespace is this agent's namespace scoped to the request's thread (see _cache_scope).
+        """
+        # Evaluator feedback makes the output depend on more than the intent, so only cache the plain path
+        cache_vector = None
+        cache_context = make_cache_key(ltm_summary)
+        if not feedback_context:
+            cache_vector = await semantic_cache.embed(intent)
+            cached = semantic_cache.lookup(cache_namespace, cache_vector, cache_context)
+            if cached is not None:
+                logger.info("[QuestionEnhancer] Semantic cache hit")
+                return cached["enhanced_question"]
         
         try:
-            chain = prompt | self.llm | self.parser
-            result = chain.invoke({
-                "intent": state["current_intent"],
-                "memory_context": state["memory_context"].get("ltm_summary", ""),
+            result = await self.chain.ainvoke({
+                "intent": intent,
+                "memory_context": ltm_summary,
                 "feedback_context": feedback_context,
-                "format_instructions": self.parser.get_format_instructions()
+                "format_instructions": self.format_instructions
             })
             
-            # Handle both dict and object responses defensively
-            if isinstance(result, dict):
-                print("[QuestionEnhancer] Warning: Received dict instead of Pydantic object, handling gracefully")
-                enhanced_question = result.get("enhanced_question", state["current_intent"])
-            else:
-                enhanced_question = result.enhanced_question
-                
-            print(f"[QuestionEnhancer] Enhanced question: {enhanced_question}")
-            state["enhanced_question"] = enhanced_question
-            return state
+            enhanced_question = result.enhanced_question
+            
+            logger.info("[QuestionEnhancer] Enhanced question: %s", enhanced_question)
+            semantic_cache.store(cache_namespace, cache_vector, {"enhanced_question": enhanced_question}, cache_context)
+            return enhanced_question
             
         except Exception as e:
-            print(f"[QuestionEnhancer] Error during question enhancement: {e}")
+            logger.error("[QuestionEnhancer] Error during question enhancement: %s", e)
             # Fallback
-            state["enhanced_question"] = state["current_intent"]
-            return state
+            return intent
 
 
 class QuestionDecomposer:
     """Decomposes enhanced questions into sub-questions and web queries"""
     
     def __init__(self):
-        print("[QuestionDecomposer] Initializing question decomposition agent")
+        logger.info("[QuestionDecomposer] Initializing question decomposition agent")
         if settings.openai_api_key:
-            self.llm = ChatOpenAI(
-                model=settings.openai_model, 
-                temperature=0.1,
-                api_key=settings.openai_api_key
-            )
+            self.llm = openai_chat.bind(temperature=0.1)
             self.parser = PydanticOutputParser(pydantic_object=QuestionDecomposition)
+            # Static instructions lead in the system message so the provider can cache the prompt prefix
+            self.prompt = ChatPromptTemplate.from_messages([
+                ("system", """
+            You are a question decomposition specialist. Break down the enhanced question into comprehensive sub-questions and web queries for optimal context retrieval.
+        
+            INSTRUCTIONS:
+            1. Use the Enhanced Question and User Intent as your primary inputs
+            2. Create sub-questions that cover broader areas related to the question for comprehensive context retrieval
+            3. Sub-questions should describe more areas related to the topic to help retrieve relevant information
+            4. Web queries must cover sub-question details and user question needs for better content retrieval
+            5. Focus on being helpful for retrieving more relevant content to answer the enhanced question
+        
+            SUB-QUESTION CREATION:
+            - Derive from enhanced question and user intent
+            - Cover broader related areas to capture comprehensive context
+            - Consider user's expertise level and platform preferences
+            - Make them descriptive to help with information retrieval
+            - Generate 2-4 sub-questions that expand coverage of the topic
+        
+            WEB QUERY CREATION:
+            - Must cover sub-question details comprehensively
+            - Target user question needs specifically
+            - Help retrieve more relevant content for the enhanced question
+            - Use specific technical terms and context from enhanced question
+            - Generate 2-3 focused web queries for optimal content retrieval
+        
+            {format_instructions}
+            """),
+                ("human", """
+            ENHANCED QUESTION: {question}
+            USER INTENT: {intent}
+            USER PREFERENCES & EXPERTISE: {memory_context}
+            """)
+            ])
+            self.format_instructions = self.parser.get_format_instructions()
+            self.chain = self.prompt | self.llm.bind(response_format=_JSON_RESPONSE_FORMAT) | _structured_output(QuestionDecomposition)
         else:
-            print("[QuestionDecomposer] Warning: No OpenAI API key available")
+            logger.warning("[QuestionDecomposer] Warning: No OpenAI API key available")
             self.llm = None
             self.parser = None
+        self.cache_namespace = semantic_cache.namespace("question_decomposer", 0.1)
     
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         if not state["enhanced_question"]:
-            print("[QuestionDecomposer] No enhanced question to decompose, skipping")
+            logger.info("[QuestionDecomposer] No enhanced question to decompose, skipping")
             return state
             
-        print(f"[QuestionDecomposer] Decomposing question: {state['enhanced_question'][:50]}...")
-        
-        prompt = ChatPromptTemplate.from_template("""
-        You are a question decomposition specialist. Break down the enhanced question into comprehensive sub-questions and web queries for optimal context retrieval.
-        
-        ENHANCED QUESTION: {question}
-        USER INTENT: {intent}
-        USER PREFERENCES & EXPERTISE: {memory_context}
-        
-        INSTRUCTIONS:
-        1. Use the Enhanced Question and User Intent as your primary inputs
-        2. Create sub-questions that cover broader areas related to the question for comprehensive context retrieval
-        3. Sub-questions should describe more areas related to the topic to help retrieve relevant information
-        4. Web queries must cover sub-question details and user question needs for better content retrieval
-        5. Focus on being helpful for retrieving more relevant content to answer the enhanced question
-        
-        SUB-QUESTION CREATION:
-        - Derive from enhanced question and user intent
-        - Cover broader related areas to capture comprehensive context
-        - Consider user's expertise level and platform preferences
-        - Make them descriptive to help with information retrieval
-        - Generate 2-4 sub-questions that expand coverage of the topic
-        
-        WEB QUERY CREATION:
-        - Must cover sub-question details comprehensively
-        - Target user question needs specifically
-        - Help retrieve more relevant content for the enhanced question
-        - Use specific technical terms and context from enhanced question
-        - Generate 2-3 focused web queries for optimal content retrieval
-        
-        {format_instructions}
-        """)
+        enhanced_question = state["enhanced_question"]
+        ltm_summary = state["memory_context"].get("ltm_summary", "")
+        logger.info("[QuestionDecomposer] Decomposing question: %s...", enhanced_question[:50])
+        
+        cache_namespace = _cache_scope(state, self.cache_namespace)
+        cache_context = make_cache_key(state["current_intent"], ltm_summary)
+        cache_vector = await semantic_cache.embed(enhanced_question)
+        cached = semantic_cache.lookup(cache_namespace, cache_vector, cache_context)
+        if cached is not None:
+            logger.info("[QuestionDecomposer] Semantic cache hit")
+            state["sub_questions"] = list(cached["sub_questions"])
+            state["web_queries"] = list(cached["web_queries"])
+            return state
         
         try:
-            chain = prompt | self.llm | self.parser
-            result = chain.invoke({
-                "question": state["enhanced_question"],
+            result = await self.chain.ainvoke({
+                "question": enhanced_question,
                 "intent": state["current_intent"],
-                "memory_context": state["memory_context"].get("ltm_summary", ""),
-                "format_instructions": self.parser.get_format_instructions()
+                "memory_context": ltm_summary,
+                "format_instructions": self.format_instructions
             })
             
-            # Handle both dict and object responses defensively
-            if isinstance(result, dict):
-                print("[QuestionDecomposer] Warning: Received dict instead of Pydantic object, handling gracefully")
-                sub_questions = result.get("sub_questions", [state["enhanced_question"]])
-                sub_question_reasoning = result.get("sub_question_reasoning", ["Default reasoning"])
-                web_queries = result.get("web_queries", [state["enhanced_question"]])
-                reasoning = result.get("reasoning", "Default decomposition")
-            else:
-                sub_questions = result.sub_questions
-                sub_question_reasoning = result.sub_question_reasoning
-                web_queries = result.web_queries
-                reasoning = result.reasoning
+            sub_questions = result.sub_questions
+            sub_question_reasoning = result.sub_question_reasoning
+            web_queries = result.web_queries
+            reasoning = result.reasoning
             
-            print(f"[QuestionDecomposer] Generated {len(sub_questions)} sub-questions:")
+            logger.info("[QuestionDecomposer] Generated %s sub-questions:", len(sub_questions))
             for i, (sq, reasoning_text) in enumerate(zip(sub_questions, sub_question_reasoning), 1):
-                print(f"  {i}. {sq}")
-                print(f"     → Reasoning: {reasoning_text}")
+                logger.debug("  %s. %s", i, sq)
+                logger.debug("     → Reasoning: %s", reasoning_text)
             
-            print(f"[QuestionDecomposer] Generated {len(web_queries)} web queries:")
+            logger.info("[QuestionDecomposer] Generated %s web queries:", len(web_queries))
             for i, wq in enumerate(web_queries, 1):
-                print(f"  {i}. {wq}")
+                logger.debug("  %s. %s", i, wq)
             
-            print(f"[QuestionDecomposer] Overall reasoning: {reasoning}")
+            logger.info("[QuestionDecomposer] Overall reasoning: %s", reasoning)
             
             state["sub_questions"] = sub_questions
             state["web_queries"] = web_queries
+            semantic_cache.store(cache_namespace, cache_vector, {
+                "sub_questions": list(sub_questions),
+                "web_queries": list(web_queries)
+            }, cache_context)
             return state
             
         except Exception as e:
-            print(f"[QuestionDecomposer] Error during question decomposition: {e}")
+            logger.error("[QuestionDecomposer] Error during question decomposition: %s", e)
             # Fallback
-            state["sub_questions"] = [state["enhanced_question"]]
-            state["web_queries"] = [state["enhanced_question"]]
+            state["sub_questions"] = [enhanced_question]
+            state["web_queries"] = [enhanced_question]
             return state
 
 
+# Terms whose presence marks a query set as already grounded in the assistant's domain
+_CLOUD_KEYWORDS = frozenset({
+    "aws", "azure", "gcp", "cloud", "ec2", "s3", "lambda", "iam", "vpc", "subnet", "vnet",
+    "kubernetes", "aks", "eks", "docker", "container", "serverless", "firewall", "network",
+    "security", "encryption", "compliance", "gdpr", "pdpa", "storage", "database", "rds",
+    "deployment", "load", "balancer", "dns", "cli", "policy", "identity", "backup"
+})
+_QUERY_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _needs_reevaluation(sub_questions: List[str], web_queries: List[str]) -> bool:
+    """Cheap local check for whether a decomposition is worth an LLM refinement pass"""
+    if not (2 <= len(sub_questions) <= 4 and 2 <= len(web_queries) <= 3):
+        return True
+    
+    queries = sub_questions + web_queries
+    if any(not 20 <= len(query) <= 200 for query in queries):
+        return True
+    
+    for group in (sub_questions, web_queries):
+        if len({" ".join(query.split()).lower() for query in group}) < len(group):
+            return True
+    
+    words = set(_QUERY_WORD_RE.findall(" ".join(queries).lower()))
+    return words.isdisjoint(_CLOUD_KEYWORDS)
+
+
 class ReEvaluator:
     """Enhances and improves sub-questions and web queries for better retrieval"""
     
     def __init__(self):
-        print("[ReEvaluator] Initializing re-evaluation enhancement agent")
+        logger.info("[ReEvaluator] Initializing re-evaluation enhancement agent")
         if settings.openai_api_key:
-            self.llm = ChatOpenAI(
-                model=settings.openai_model, 
-                temperature=0.1,
-                api_key=settings.openai_api_key
-            )
-            self.parser = PydanticOutputParser(pydantic_object=QuestionDecomposition)
+            self.llm = openai_chat.bind(temperature=0.1)
+            # Sub-questions and web queries are refined by two independent calls run concurrently
+            self.sub_question_parser = PydanticOutputParser(pydantic_object=SubQuestionRefinement)
+            self.web_query_parser = PydanticOutputParser(pydantic_object=WebQueryRefinement)
+            json_llm = self.llm.bind(response_format=_JSON_RESPONSE_FORMAT)
+            self.sub_question_prompt = ChatPromptTemplate.from_messages([
+                ("system", """
+            You are an expert question enhancement specialist. Analyze the current sub-questions, ONLY IF they need to be enhanced then, generate enhanced versions for optimal content retrieval.
+        
+            SUB-QUESTION ENHANCEMENT CRITERIA:
+               - Make sub-questions more comprehensive to capture broader context
+               - Ensure they cover different aspects needed to fully answer the enhanced question
+               - Focus on areas that will help retrieve the most relevant information
+               - Expand coverage while maintaining focus on the enhanced question
+        
+            INSTRUCTIONS:
+            1. Analyze the current sub-questions
+            2. Identify areas for improvement in terms of coverage and specificity
+            3. Generate enhanced sub-questions (2-4) that provide better context retrieval
+            4. Focus on practical improvements without hallucination
+        
+            OUTPUT:
+            - ONLY Enhanced sub-questions that improve information retrieval scope
+        
+            {format_instructions}
+            """),
+                ("human", """
+            ORIGINAL USER QUERY: {query}
+            EXTRACTED INTENT: {intent}
+            ENHANCED QUESTION: {enhanced_question}
+            CURRENT SUB-QUESTIONS: {sub_questions}
+            """)
+            ])
+            self.sub_question_format_instructions = self.sub_question_parser.get_format_instructions()
+            self.sub_question_chain = self.sub_question_prompt | json_llm | _structured_output(SubQuestionRefinement)
+            self.web_query_prompt = ChatPromptTemplate.from_messages([
+                ("system", """
+            You are an expert search query specialist. Analyze the current web search queries, ONLY IF they need to be enhanced then, generate enhanced versions for optimal content retrieval.
+        
+            WEB QUERY ENHANCEMENT CRITERIA:
+               - Create more specific and targeted web search queries
+               - Use technical terminology that will find high-quality sources
+               - Include variations and synonyms for better search coverage
+               - Focus on finding authoritative and current information
+               - Ensure queries will retrieve content that addresses user needs comprehensively
+        
+            INSTRUCTIONS:
+            1. Analyze the current web queries
+            2. Identify areas for improvement in terms of coverage and specificity
+            3. Generate enhanced web queries (2-3) that will find more relevant content
+            4. Focus on practical improvements without hallucination
+        
+            OUTPUT:
+            - ONLY Enhanced web search queries that target relevant content better
+        
+            {format_instructions}
+            """),
+                ("human", """
+            ORIGINAL USER QUERY: {query}
+            EXTRACTED INTENT: {intent}
+            ENHANCED QUESTION: {enhanced_question}
+            CURRENT WEB QUERIES: {web_queries}
+            """)
+            ])
+            self.web_query_format_instructions = self.web_query_parser.get_format_instructions()
+            self.web_query_chain = self.web_query_prompt | json_llm | _structured_output(WebQueryRefinement)
         else:
-            print("[ReEvaluator] Warning: No OpenAI API key available")
+            logger.warning("[ReEvaluator] Warning: No OpenAI API key available")
             self.llm = None
-            self.parser = None
+            self.sub_question_parser = None
+            self.web_query_parser = None
     
-    def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        print("[ReEvaluator] Enhancing sub-questions and web queries for better retrieval...")
-        
-        prompt = ChatPromptTemplate.from_template("""
-        You are an expert question enhancement specialist. Analyze the current outputs, ONLY IF its need to enhanced then, generate enhanced versions of both sub-questions and web search queries for optimal content retrieval.
-        
-        ORIGINAL USER QUERY: {query}
-        EXTRACTED INTENT: {intent}
-        ENHANCED QUESTION: {enhanced_question}
-        CURRENT SUB-QUESTIONS: {sub_questions}
-        CURRENT WEB QUERIES: {web_queries}
-        
-        YOUR TASK:
-        Evaluate the current outputs, ONLY If they need to enhanced then, create enhanced versions that will retrieve more comprehensive and relevant content.
-        
-        ENHANCEMENT CRITERIA:
-        
-        1. SUB-QUESTION ENHANCEMENT:
-           - Make sub-questions more comprehensive to capture broader context
-           - Ensure they cover different aspects needed to fully answer the enhanced question
-           - Focus on areas that will help retrieve the most relevant information
-           - Expand coverage while maintaining focus on the enhanced question
-        
-        2. WEB QUERY ENHANCEMENT:
-           - Create more specific and targeted web search queries
-           - Use technical terminology that will find high-quality sources
-           - Include variations and synonyms for better search coverage
-           - Focus on finding authoritative and current information
-           - Ensure queries will retrieve content that addresses user needs comprehensively
-        
-        INSTRUCTIONS:
-        1. Analyze the current sub-questions and web queries
-        2. Identify areas for improvement in terms of coverage and specificity
-        3. Generate enhanced sub-questions (2-4) that provide better context retrieval
-        4. Generate enhanced web queries (2-3) that will find more relevant content
-        5. Focus on practical improvements without hallucination
+    async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        if not _needs_reevaluation(state["sub_questions"], state["web_queries"]):
+            logger.info("[ReEvaluator] Decomposition passes local quality gate, skipping enhancement")
+            state["reevaluator_skipped"] = True
+            state["needs_revision"] = False
+            state["revision_target"] = None
+            return state
         
-        OUTPUTS:
-        - ONLY Enhanced sub-questions that improve information retrieval scope
-        - ONLY Enhanced web search queries that target relevant content better
-
+        logger.info("[ReEvaluator] Enhancing sub-questions and web queries for better retrieval...")
+        state["reevaluator_skipped"] = False
         
-        {format_instructions}
-        """)
+        inputs = {
+            "query": state["user_query"],
+            "intent": state["current_intent"],
+            "enhanced_question": state["enhanced_question"],
+            "sub_questions": "\n".join([f"- {sq}" for sq in state["sub_questions"]]),
+            "web_queries": "\n".join([f"- {wq}" for wq in state["web_queries"]])
+        }
         
         try:
-            chain = prompt | self.llm | self.parser
-            result = chain.invoke({
-                "query": state["user_query"],
-                "intent": state["current_intent"],
-                "enhanced_question": state["enhanced_question"],
-                "sub_questions": "\n".join([f"- {sq}" for sq in state["sub_questions"]]),
-                "web_queries": "\n".join([f"- {wq}" for wq in state["web_queries"]]),
-                "memory_context": state["memory_context"].get("ltm_summary", "No user context available"),
-                "format_instructions": self.parser.get_format_instructions()
-            })
+            sub_question_result, web_query_result = await asyncio.gather(
+                self._enhance_sub_questions(inputs),
+                self._enhance_web_queries(inputs),
+                return_exceptions=True
+            )
             
-            # Handle both dict and object responses defensively
-            if isinstance(result, dict):
-                print("[ReEvaluator] Warning: Received dict instead of Pydantic object, handling gracefully")
-                enhanced_sub_questions = result.get("sub_questions", state["sub_questions"])
-                enhanced_web_queries = result.get("web_queries", state["web_queries"])
-                reasoning = result.get("reasoning", "Enhanced outputs generated")
+            # Each half falls back to the current outputs independently
+            if isinstance(sub_question_result, Exception):
+                logger.error("[ReEvaluator] Error enhancing sub-questions: %s", sub_question_result)
+                enhanced_sub_questions = state["sub_questions"]
+                sub_question_reasoning = "Kept original sub-questions"
             else:
-                enhanced_sub_questions = result.sub_questions
-                enhanced_web_queries = result.web_queries
-                reasoning = result.reasoning
+                enhanced_sub_questions, sub_question_reasoning = sub_question_result
             
-            print(f"[ReEvaluator] ============ ENHANCEMENT RESULT ============")
-            print(f"[ReEvaluator] Original Sub-questions: {len(state['sub_questions'])}")
-            for i, sq in enumerate(state["sub_questions"], 1):
-                print(f"  {i}. {sq}")
-            print(f"[ReEvaluator] Enhanced Sub-questions: {len(enhanced_sub_questions)}")
-            for i, sq in enumerate(enhanced_sub_questions, 1):
-                print(f"  {i}. {sq}")
+            if isinstance(web_query_result, Exception):
+                logger.error("[ReEvaluator] Error enhancing web queries: %s", web_query_result)
+                enhanced_web_queries = state["web_queries"]
+                web_query_reasoning = "Kept original web queries"
+            else:
+                enhanced_web_queries, web_query_reasoning = web_query_result
             
-            print(f"[ReEvaluator] Original Web queries: {len(state['web_queries'])}")
-            for i, wq in enumerate(state["web_queries"], 1):
-                print(f"  {i}. {wq}")
-            print(f"[ReEvaluator] Enhanced Web queries: {len(enhanced_web_queries)}")
-            for i, wq in enumerate(enhanced_web_queries, 1):
-                print(f"  {i}. {wq}")
+            # Per-item before/after listing is only worth building when debug output is on
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[ReEvaluator] ============ ENHANCEMENT RESULT ============")
+                logger.debug("[ReEvaluator] Original Sub-questions: %s", len(state['sub_questions']))
+                for i, sq in enumerate(state["sub_questions"], 1):
+                    logger.debug("  %s. %s", i, sq)
+                logger.debug("[ReEvaluator] Enhanced Sub-questions: %s", len(enhanced_sub_questions))
+                for i, sq in enumerate(enhanced_sub_questions, 1):
+                    logger.debug("  %s. %s", i, sq)
             
-            print(f"[ReEvaluator] Enhancement reasoning: {reasoning}")
-            print(f"[ReEvaluator] ============================================")
+                logger.debug("[ReEvaluator] Original Web queries: %s", len(state['web_queries']))
+                for i, wq in enumerate(state["web_queries"], 1):
+                    logger.debug("  %s. %s", i, wq)
+                logger.debug("[ReEvaluator] Enhanced Web queries: %s", len(enhanced_web_queries))
+                for i, wq in enumerate(enhanced_web_queries, 1):
+                    logger.debug("  %s. %s", i, wq)
+            
+                logger.debug("[ReEvaluator] Sub-question reasoning: %s", sub_question_reasoning)
+                logger.debug("[ReEvaluator] Web query reasoning: %s", web_query_reasoning)
+                logger.debug("[ReEvaluator] ============================================")
             
             # Update state with enhanced outputs
             state["sub_questions"] = enhanced_sub_questions
@@ -439,147 +721,228 @@ class ReEvaluator:
             return state
             
         except Exception as e:
-            print(f"[ReEvaluator] Error during enhancement: {e}")
+            logger.error("[ReEvaluator] Error during enhancement: %s", e)
             # Fallback - proceed with original outputs
             state["needs_revision"] = False
             state["revision_target"] = None
             return state
+    
+    async def _enhance_sub_questions(self, inputs: Dict[str, Any]) -> tuple[List[str], str]:
+        """Refine sub-questions for knowledge base retrieval"""
+        result = await self.sub_question_chain.ainvoke({
+            "query": inputs["query"],
+            "intent": inputs["intent"],
+            "enhanced_question": inputs["enhanced_question"],
+            "sub_questions": inputs["sub_questions"],
+            "format_instructions": self.sub_question_format_instructions
+        })
+        return result.sub_questions, result.reasoning
+    
+    async def _enhance_web_queries(self, inputs: Dict[str, Any]) -> tuple[List[str], str]:
+        """Refine web search queries for web retrieval"""
+        result = await self.web_query_chain.ainvoke({
+            "query": inputs["query"],
+            "intent": inputs["intent"],
+            "enhanced_question": inputs["enhanced_question"],
+            "web_queries": inputs["web_queries"],
+            "format_instructions": self.web_query_format_instructions
+        })
+        return result.web_queries, result.reasoning
+
+
+
+
+# Cosine similarity above which two retrieval queries are treated as the same query
+_DUPLICATE_QUERY_SIMILARITY = 0.95
+
+
+async def _unique_semantic(items: List[str], threshold: float = _DUPLICATE_QUERY_SIMILARITY) -> List[str]:
+    """Drop exact (case/whitespace-insensitive) and near-duplicate queries, keeping first occurrences"""
+    unique: Dict[str, str] = {}
+    for item in items:
+        unique.setdefault(" ".join(item.split()).lower(), item)
+    unique.pop("", None)
+    candidates = list(unique.values())
+    if len(candidates) < 2:
+        return candidates
+    
+    vectors = await semantic_cache.embed_many(candidates)
+    if vectors is None:
+        return candidates
+    
+    # Greedy pass: keep a query only if it is not too close to any query already kept
+    kept = [0]
+    for index in range(1, len(candidates)):
+        if best_match(vectors[kept], vectors[index])[1] < threshold:
+            kept.append(index)
+    return [candidates[index] for index in kept]
+
+
+_DUPLICATE_PAGE_SIMILARITY = 0.85
+_PAGE_SHINGLE_WORDS = 5
+
+
+def _page_shingles(content: str) -> frozenset:
+    """Hashed overlapping word 5-grams of a page, for Jaccard near-duplicate checks"""
+    words = content.lower().split()
+    if len(words) <= _PAGE_SHINGLE_WORDS:
+        return frozenset((hash(" ".join(words)),))
+    return frozenset(hash(" ".join(words[i:i + _PAGE_SHINGLE_WORDS])) for i in range(len(words) - _PAGE_SHINGLE_WORDS + 1))
+
+
+def _unique_pages(scraped_content: Dict[str, str], url_scores: Dict[str, float],
+                  threshold: float = _DUPLICATE_PAGE_SIMILARITY) -> Dict[str, str]:
+    """Drop scraped pages that near-duplicate a page with a higher URL confidence"""
+    if len(scraped_content) < 2:
+        return scraped_content
+    
+    kept: List[tuple] = []
+    for url in sorted(scraped_content, key=lambda u: url_scores.get(u, 0.0), reverse=True):
+        shingles = _page_shingles(scraped_content[url])
+        if all(len(shingles & other) / len(shingles | other) < threshold for _, other in kept):
+            kept.append((url, shingles))
+        else:
+            logger.info("[ParallelRetriever] Dropping near-duplicate page: %s", url)
+    kept_urls = {url for url, _ in kept}
+    return {url: content for url, content in scraped_content.items() if url in kept_urls}
+
+
+_SCRAPED_METADATA = {"type": "scraped"}
+
+# URL confidence above which a scraped page counts as high confidence
+_HIGH_CONFIDENCE_URL_SCORE = 0.7
 
 
+async def _noop() -> None:
+    """Placeholder awaitable for a retrieval branch that was skipped"""
+    return None
 
 
 class ParallelRetriever:
     """Executes both knowledge base and web search retrieval in parallel"""
     
     def __init__(self):
-        print("[ParallelRetriever] Initializing parallel retrieval agent")
+        logger.info("[ParallelRetriever] Initializing parallel retrieval agent")
         self.web_service = WebSearchService()
         self.kb_retriever = None  # Will be initialized on first use
     
     async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Execute both knowledge base and web search retrieval in parallel"""
-        print("[ParallelRetriever] Starting parallel retrieval process")
+        logger.info("[ParallelRetriever] Starting parallel retrieval process")
         
         try:
-            # Get questions for both retrieval systems
-            sub_questions = state.get("sub_questions", [])
-            web_queries = state.get("web_queries", [])
-            
-            print(f"[ParallelRetriever] Sub-questions for KB: {len(sub_questions)}")
-            print(f"[ParallelRetriever] Web queries: {len(web_queries)}")
+            # Get questions for both retrieval systems, collapsing duplicates so each is fetched once
+            deduplication = asyncio.gather(
+                _unique_semantic(state.get("sub_questions", [])),
+                _unique_semantic(state.get("web_queries", []))
+            )
             
-            # Initialize knowledge base retriever if needed
+            # Initialize the knowledge base retriever on first use, overlapping the deduplication
             if self.kb_retriever is None:
-                self.kb_retriever = await get_knowledge_base_retriever()
+                (sub_questions, web_queries), self.kb_retriever = await asyncio.gather(
+                    deduplication, get_knowledge_base_retriever()
+                )
+            else:
+                sub_questions, web_queries = await deduplication
+            state["sub_questions"] = sub_questions
+            state["web_queries"] = web_queries
             
-            # Prepare tasks for parallel execution
-            tasks = []
-            task_names = []
+            logger.info("[ParallelRetriever] Sub-questions for KB: %s", len(sub_questions))
+            logger.info("[ParallelRetriever] Web queries: %s", len(web_queries))
             
-            # Add knowledge base retrieval task
+            status = state["retrieval_status"]
+            
+            # Start knowledge base retrieval
             if sub_questions and self.kb_retriever.initialized:
-                tasks.append(self._retrieve_knowledge_base(sub_questions))
-                task_names.append("knowledge_base")
-                state["retrieval_status"]["knowledge_base"] = "running"
+                kb_task = asyncio.create_task(self._retrieve_knowledge_base(sub_questions))
+                status["knowledge_base"] = "running"
             else:
-                print("[ParallelRetriever] Skipping KB retrieval - no questions or not initialized")
-                state["kb_results"] = []
-                state["retrieval_status"]["knowledge_base"] = "skipped"
+                logger.info("[ParallelRetriever] Skipping KB retrieval - no questions or not initialized")
+                kb_task = None
+                status["knowledge_base"] = "skipped"
             
-            # Always add web search task (no decision needed)
+            # Start web search (no decision needed)
             if web_queries:
-                tasks.append(self._retrieve_web_search(web_queries, state))
-                task_names.append("web_search")
-                state["retrieval_status"]["web_search"] = "running"
+                web_task = asyncio.create_task(self._retrieve_web_search(web_queries, state))
+                status["web_search"] = "running"
+            else:
+                logger.info("[ParallelRetriever] Skipping web search - no queries")
+                web_task = None
+                status["web_search"] = "skipped"
+            
+            # Execute both retrievals in parallel
+            kb_result, web_result = await asyncio.gather(
+                kb_task or _noop(), web_task or _noop(), return_exceptions=True
+            )
+            
+            # Process knowledge base results
+            if kb_task is None:
+                state["kb_results"] = []
+            elif isinstance(kb_result, BaseException):
+                logger.error("[ParallelRetriever] Error in knowledge_base: %s", kb_result)
+                status["knowledge_base"] = "error"
+                state["kb_results"] = []
             else:
-                print("[ParallelRetriever] Skipping web search - no queries")
+                status["knowledge_base"] = "completed"
+                state["kb_results"] = kb_result
+            
+            # Process web search results
+            if web_task is None or isinstance(web_result, BaseException):
+                if web_task is not None:
+                    logger.error("[ParallelRetriever] Error in web_search: %s", web_result)
+                    status["web_search"] = "error"
                 state["web_search_results"] = []
                 state["scraped_content"] = {}
                 state["url_confidence_scores"] = {}
-                state["retrieval_status"]["web_search"] = "skipped"
-            
-            # Execute tasks in parallel
-            if tasks:
-                print(f"[ParallelRetriever] Executing {len(tasks)} retrieval tasks in parallel")
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Process results
-                for i, result in enumerate(results):
-                    task_name = task_names[i]
-                    if isinstance(result, Exception):
-                        print(f"[ParallelRetriever] Error in {task_name}: {result}")
-                        state["retrieval_status"][task_name] = "error"
-                        if task_name == "knowledge_base":
-                            state["kb_results"] = []
-                        elif task_name == "web_search":
-                            state["web_search_results"] = []
-                            state["scraped_content"] = {}
-                            state["url_confidence_scores"] = {}
-                    else:
-                        print(f"[ParallelRetriever] {task_name} completed successfully")
-                        state["retrieval_status"][task_name] = "completed"
-                        
-                        # Update state with results
-                        if task_name == "knowledge_base":
-                            state["kb_results"] = result
-                        elif task_name == "web_search":
-                            # Update state with enhanced web search results
-                            state["web_search_results"] = result.get("search_results", [])
-                            state["scraped_content"] = result.get("scraped_content", {})
-                            state["url_confidence_scores"] = result.get("url_confidence_scores", {})
+                state["high_confidence_url_count"] = 0
+            else:
+                status["web_search"] = "completed"
+                state["web_search_results"] = web_result.get("search_results", [])
+                state["url_confidence_scores"] = web_result.get("url_confidence_scores", {})
+                state["high_confidence_url_count"] = sum(
+                    1 for score in state["url_confidence_scores"].values() if score > _HIGH_CONFIDENCE_URL_SCORE
+                )
+                state["scraped_content"] = _unique_pages(
+                    web_result.get("scraped_content", {}), state["url_confidence_scores"]
+                )
             
             # Combine all sources
-            all_sources = []
-            
-            # Add KB results
-            for kb_result in state.get("kb_results", []):
-                if kb_result.get("success") and kb_result.get("answer"):
-                    all_sources.append({
-                        "source_type": "knowledge_base",
-                        "content": kb_result["answer"],
-                        "question": kb_result["question"],
-                        "metadata": kb_result.get("metadata", {})
-                    })
-            
-            # Add web search results
-            for web_result in state.get("web_search_results", []):
-                all_sources.append({
-                    "source_type": "web_search",
-                    "content": web_result.get("description", ""),
-                    "title": web_result.get("title", ""),
-                    "url": web_result.get("url", ""),
-                    "metadata": {"score": web_result.get("score", 0)}
-                })
-            
-            # Add scraped content
-            for url, content in state.get("scraped_content", {}).items():
-                all_sources.append({
-                    "source_type": "scraped_content",
-                    "content": content,  # Use full content for comprehensive context
-                    "url": url,
-                    "metadata": {"type": "scraped"}
-                })
+            kb_sources = [
+                Source("knowledge_base", kb_result["answer"], question=kb_result["question"], metadata=kb_result.get("metadata", {}))
+                for kb_result in state["kb_results"]
+                if kb_result.get("success") and kb_result.get("answer")
+            ]
+            web_sources = [
+                Source("web_search", web_result.get("description", ""), title=web_result.get("title", ""),
+                       url=web_result.get("url", ""), metadata={"score": web_result.get("score", 0)})
+                for web_result in state["web_search_results"]
+            ]
+            # Use full scraped content for comprehensive context
+            scraped_sources = [
+                Source("scraped_content", content, url=url, metadata=_SCRAPED_METADATA)
+                for url, content in state["scraped_content"].items()
+            ]
+            all_sources = kb_sources + web_sources + scraped_sources
             
             state["all_sources"] = all_sources
             
-            print(f"[ParallelRetriever] Retrieval complete:")
-            print(f"  - KB results: {len(state.get('kb_results', []))}")
-            print(f"  - Web results: {len(state.get('web_search_results', []))}")
-            print(f"  - Scraped pages: {len(state.get('scraped_content', {}))}")
-            print(f"  - Combined sources: {len(all_sources)}")
+            logger.info("[ParallelRetriever] Retrieval complete:")
+            logger.debug("  - KB results: %s", len(state.get('kb_results', [])))
+            logger.debug("  - Web results: %s", len(state.get('web_search_results', [])))
+            logger.debug("  - Scraped pages: %s", len(state.get('scraped_content', {})))
+            logger.debug("  - Combined sources: %s", len(all_sources))
             
             return state
             
         except Exception as e:
-            print(f"[ParallelRetriever] Error in parallel retrieval: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[ParallelRetriever] Error in parallel retrieval: %s", e)
             
             # Fallback - ensure all fields are set
             state["kb_results"] = []
             state["web_search_results"] = []
             state["scraped_content"] = {}
             state["url_confidence_scores"] = {}
+            state["high_confidence_url_count"] = 0
             state["all_sources"] = []
             state["retrieval_status"] = {"knowledge_base": "error", "web_search": "error"}
             
@@ -587,31 +950,31 @@ class ParallelRetriever:
     
     async def _retrieve_knowledge_base(self, sub_questions: List[str]) -> List[Dict[str, Any]]:
         """Retrieve information from knowledge base"""
-        print(f"[ParallelRetriever] Querying knowledge base with {len(sub_questions)} questions")
+        logger.info("[ParallelRetriever] Querying knowledge base with %s questions", len(sub_questions))
         
         try:
             if self.kb_retriever and self.kb_retriever.initialized:
                 results = await self.kb_retriever.query_multiple(sub_questions)
                 successful_results = sum(1 for r in results if r.get("success"))
-                print(f"[ParallelRetriever] KB retrieval: {successful_results}/{len(results)} successful")
+                logger.info("[ParallelRetriever] KB retrieval: %s/%s successful", successful_results, len(results))
                 return results
             else:
-                print("[ParallelRetriever] KB retriever not available")
+                logger.info("[ParallelRetriever] KB retriever not available")
                 return []
         except Exception as e:
-            print(f"[ParallelRetriever] KB retrieval error: {e}")
+            logger.error("[ParallelRetriever] KB retrieval error: %s", e)
             return []
     
     async def _retrieve_web_search(self, web_queries: List[str], state: Dict[str, Any]) -> Dict[str, Any]:
         """Retrieve information from enhanced web search with fallback"""
-        print("[ParallelRetriever] Executing enhanced web search with enhanced question context")
+        logger.info("[ParallelRetriever] Executing enhanced web search with enhanced question context")
         
         original_query = state["user_query"]
         enhanced_question = state.get("enhanced_question", original_query)
         sub_questions = state.get("sub_questions", [])
         
-        print(f"[ParallelRetriever] Enhanced question: {enhanced_question}")
-        print(f"[ParallelRetriever] Sub-questions: {len(sub_questions)}")
+        logger.info("[ParallelRetriever] Enhanced question: %s", enhanced_question)
+        logger.info("[ParallelRetriever] Sub-questions: %s", len(sub_questions))
         
         try:
             # Use enhanced web search service with enhanced questions context
@@ -624,7 +987,7 @@ class ParallelRetriever:
             )
             return search_results
         except Exception as e:
-            print(f"[ParallelRetriever] Enhanced web search error: {e}")
+            logger.error("[ParallelRetriever] Enhanced web search error: %s", e)
             return {
                 "search_results": [],
                 "scraped_content": {},
@@ -634,30 +997,237 @@ class ParallelRetriever:
             }
 
 
+_GENERAL_RESPONSE_INSTRUCTIONS = """
+You are Cloud ERA, a specialized AI assistant for cloud services and network infrastructure. Analyze the user's query and provide an intelligent response using ONLY the prompt template approach.
+
+CRITICAL INSTRUCTIONS - Handle ALL logic through this prompt (no custom code logic):
+
+1. GREETING DETECTION & RESPONSE: 
+   - If user query is a greeting (hello, hi, good morning,thank you etc.), respond with a polite greeting
+   - For greetings, avoid other tasks and focus on welcoming the user
+
+2. DOMAIN EXPLANATION FOR NON-GREETINGS:
+   - Explain that you specialize in cloud services and networking
+   - List your expertise areas with examples
+   - Describe how the chat threads work with specific examples
+
+3. CHAT THREAD DESCRIPTIONS (very important):
+   - AWS Thread: Use this for Amazon Web Services questions 
+   - Azure Thread: Use this for Microsoft Azure questions 
+   - Smart Learner Thread: This thread provides personalized learning content and educational insights in Domain related topics
+
+RESPONSE FORMAT:
+- Start with appropriate greeting response OR domain explanation
+- Include thread usage examples with specific services
+- End with encouragement to ask domain-related questions
+- Keep response friendly, informative, and actionable
+- If User Question is in Sinhala Response must be in Sinhala
+- If user Question is in English Response must be in English
+
+Generate the response now:
+"""
+
+_GREETING_RE = re.compile(
+    r"^\s*(hi|hii+|hello|hey|hey there|thanks|thank you|thank you so much|thx|good (morning|afternoon|evening)|"
+    r"ආයුබෝවන්|හලෝ|ස්තූතියි|ස්තූති)[\s.!?,]*(there|cloud ?era)?[\s.!?]*$",
+    re.IGNORECASE
+)
+
+_CANNED_GREETING = {
+    "ENG": (
+        "Hello! I'm Cloud ERA, your assistant for cloud services and network infrastructure.\n\n"
+        "- **AWS Thread**: ask about Amazon Web Services, e.g. EC2, S3, IAM or VPC setup\n"
+        "- **Azure Thread**: ask about Microsoft Azure, e.g. virtual networks, AKS or Entra ID\n"
+        "- **Smart Learner Thread**: personalized learning content on cloud, networking and security topics\n\n"
+        "What would you like to work on today?"
+    ),
+    "SIN": (
+        "ආයුබෝවන්! මම Cloud ERA, cloud services සහ network infrastructure සඳහා ඔබේ සහායකයා.\n\n"
+        "- **AWS Thread**: Amazon Web Services ගැන ප්‍රශ්න අසන්න, උදා. EC2, S3, IAM, VPC\n"
+        "- **Azure Thread**: Microsoft Azure ගැන ප්‍රශ්න අසන්න, උදා. virtual networks, AKS\n"
+        "- **Smart Learner Thread**: cloud, networking සහ security පිළිබඳ ඔබට ගැලපෙන ඉගෙනුම් අන්තර්ගතය\n\n"
+        "අද ඔබට කුමක් ගැන උදව් අවශ්‍යද?"
+    )
+}
+
+_CANNED_THANKS = {
+    "ENG": "You're welcome! Feel free to ask anything else about cloud services, networking or security.",
+    "SIN": "ඔබව සාදරයෙන් පිළිගනිමු! cloud services, networking හෝ security ගැන වෙනත් ඕනෑම දෙයක් අසන්න."
+}
+
+# Same prompt for both thread languages; the model answers in the language of the question
+_GENERAL_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", _GENERAL_RESPONSE_INSTRUCTIONS),
+    ("human", 'User Query: "{user_query}"\nThread Language: {thread_language}')
+])
+
+_DOMAIN_RESPONSE_INSTRUCTIONS = """
+You are a specialized Cloud Services and Network Infrastructure assistant. Generate a comprehensive response using ONLY the sources and context provided in the user message.
+
+CRITICAL CONTEXT-ONLY RESTRICTIONS:
+1. **ONLY USE PROVIDED CONTEXT**: Base your response EXCLUSIVELY on the knowledge base results and web search results provided. Do NOT use general knowledge or information not present in the provided sources.
+
+2. **INSUFFICIENT CONTEXT HANDLING**: If the provided context does not contain enough information to answer the question comprehensively, explicitly state: "Based on the available information, I can provide the following..." and then note what additional information would be helpful.
+
+3. **SOURCE-BASED REASONING**: Every statement in your response must be traceable to the provided knowledge base results or web search content. If you cannot trace a fact to the provided sources, do not include it.
+
+4. **NO HALLUCINATION**: Do not add information about cloud platforms, services, or technical details that are not explicitly mentioned in the provided context sources.
+
+Response Instructions:
+1. Analyze the provided knowledge base and web search results carefully
+2. Use ONLY information found in these sources to construct your response
+3. Structure the response clearly with headings or bullet points where appropriate
+4. Cite which sources (knowledge base or specific URLs) provide each piece of information
+5. If the provided context lacks sufficient detail, acknowledge this limitation
+6. Address each sub-question area using only the available context
+7. If no relevant context is provided for a sub-question, state "The provided sources do not contain information about [specific topic]"
+
+Response format:
+- Start with a direct answer based on available context
+- Address each sub-question using only provided information
+- Include relevant examples or details ONLY if they appear in the sources
+- End with acknowledgment of any information gaps if context is insufficient
+- Always cite sources for major points (e.g., "According to the knowledge base..." or "Based on the web search results...")
+
+Remember: Your response quality depends on staying within the provided context boundaries rather than drawing from general knowledge.
+"""
+
+# Per-request part of the domain prompt, kept after the static instructions
+_DOMAIN_RESPONSE_CONTEXT = """User's Original Question: {original_query}
+Extracted Intent: {intent}
+Enhanced Question: {enhanced_question}
+
+Sub-questions to address:
+{sub_questions}
+
+AVAILABLE CONTEXT SOURCES:
+{content_sources}
+
+{language_instruction}"""
+
+
+# Markdown replies end with a confidence tag instead of wrapping the answer in escaped JSON
+_DOMAIN_REPLY_FORMAT = """
+Reply format:
+Write the answer itself as Markdown, with no JSON wrapper. On the final line, on its own, rate your confidence in the answer's quality from 0.0 to 1.0 as: [confidence: 0.85]
+"""
+
+_CONFIDENCE_TAG_RE = re.compile(r"\s*\[confidence:\s*([01](?:\.\d+)?)\]\s*$", re.IGNORECASE)
+# A tag that has only partly streamed in, stripped from progress updates
+_PARTIAL_CONFIDENCE_TAG_RE = re.compile(r"\s*\[(?:c(?:o(?:n(?:f(?:i(?:d(?:e(?:n(?:c(?:e(?::[^\]]*)?)?)?)?)?)?)?)?)?)?)?\]?\s*$", re.IGNORECASE)
+_DEFAULT_RESPONSE_CONFIDENCE = 0.7
+
+
+def _allocate_token_budget(lengths: List[int], weights: List[float], budget: int) -> List[int]:
+    """Split budget across passages in proportion to weight, passing the unused share of short passages to the rest"""
+    allowances = [0] * len(lengths)
+    remaining = set(range(len(lengths)))
+    left = budget
+    while remaining and left > 0:
+        total = sum(max(weights[i], 0.01) for i in remaining)
+        satisfied = [i for i in remaining if lengths[i] <= left * max(weights[i], 0.01) / total]
+        if not satisfied:
+            for i in remaining:
+                allowances[i] = int(left * max(weights[i], 0.01) / total)
+            break
+        for i in satisfied:
+            allowances[i] = lengths[i]
+            left -= lengths[i]
+            remaining.discard(i)
+    return allowances
+
+
+def _split_confidence_tag(text: str) -> tuple:
+    """Separate the trailing confidence tag from a domain reply, defaulting when the model omitted it"""
+    match = _CONFIDENCE_TAG_RE.search(text)
+    if match is None:
+        return text.strip(), _DEFAULT_RESPONSE_CONFIDENCE
+    return text[:match.start()].strip(), float(match.group(1))
+
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_DEGRADED_PREFACE = {
+    "ENG": "I couldn't generate a full answer right now, but these are the most relevant points from the sources I found:",
+    "SIN": "මට දැන් සම්පූර්ණ පිළිතුරක් ලබා දිය නොහැක, නමුත් සොයාගත් මූලාශ්‍රවල වඩාත්ම අදාළ කරුණු මෙන්න:"
+}
+
+
+def _extractive_answer(question: str, passages: List[tuple], thread_language: str = "ENG", max_sentences: int = 6) -> str:
+    """Fallback answer built from the source sentences that best match the question, weighted by term rarity"""
+    sentences = []
+    for source, text in passages:
+        for sentence in _SENTENCE_SPLIT_RE.split(text):
+            sentence = sentence.strip()
+            if 30 <= len(sentence) <= 500:
+                sentences.append((source, sentence, set(_QUERY_WORD_RE.findall(sentence.lower()))))
+    
+    query_terms = set(_QUERY_WORD_RE.findall(question.lower()))
+    if not sentences or not query_terms:
+        return "I couldn't generate an answer from the available sources right now. Please try again shortly."
+    
+    document_frequency = {term: sum(1 for _, _, words in sentences if term in words) for term in query_terms}
+    idf = {term: math.log((1 + len(sentences)) / (1 + count)) for term, count in document_frequency.items() if count}
+    scored = [(sum(idf.get(term, 0.0) for term in words & query_terms), index) for index, (_, _, words) in enumerate(sentences)]
+    top = sorted(index for score, index in sorted(scored, reverse=True)[:max_sentences] if score > 0)
+    if not top:
+        return "I couldn't generate an answer from the available sources right now. Please try again shortly."
+    
+    lines = [_DEGRADED_PREFACE.get(thread_language, _DEGRADED_PREFACE["ENG"]), ""]
+    lines += [f"- {sentences[index][1]} ({sentences[index][0]})" for index in top]
+    return "\n".join(lines)
+
+
+def _preview(text: str, limit: int) -> str:
+    """First limit characters of text, marked with an ellipsis when truncated"""
+    return text if len(text) <= limit else f"{text[:limit]}..."
+
+# Minimum growth of the streamed answer before another progress update is published
+_STREAM_EMIT_CHARS = 200
+
+
+def _retrieval_fingerprint(kb_answers: List[Dict[str, Any]], scraped_content: Dict[str, str],
+                           web_search_results: List[Dict[str, Any]]) -> str:
+    """Hash of the KB questions and web sources a domain response was grounded on"""
+    kb_questions = sorted(r["question"] for r in kb_answers)
+    urls = sorted(scraped_content or [r.get("url", "") for r in web_search_results[:3]])
+    return make_cache_key(*kb_questions, "", *urls)
+
+
 class ResponseGenerator:
     """Generates final responses using all processed data and web search results"""
     
     def __init__(self):
-        print("[ResponseGenerator] Initializing response generation agent")
+        logger.info("[ResponseGenerator] Initializing response generation agent")
         if settings.openai_api_key:
-            self.llm = ChatOpenAI(
-                model=settings.openai_model, 
-                temperature=0.3,  # Slightly more creative for response generation
-                api_key=settings.openai_api_key
-            )
-            self.parser = PydanticOutputParser(pydantic_object=ResponseGeneration)
+            self.llm = openai_chat.bind(temperature=0.3)  # Slightly more creative for response generation
+            # Static instructions lead so the provider's automatic prefix cache covers them on every call
+            self.domain_prompt = ChatPromptTemplate.from_messages([
+                ("system", _DOMAIN_RESPONSE_INSTRUCTIONS + _DOMAIN_REPLY_FORMAT),
+                ("human", _DOMAIN_RESPONSE_CONTEXT)
+            ])
+            self.domain_chain = self.domain_prompt | self.llm
+            self.general_chain = _GENERAL_PROMPT | self.llm
         else:
-            print("[ResponseGenerator] Warning: No OpenAI API key available")
+            logger.warning("[ResponseGenerator] No OpenAI API key available")
             self.llm = None
-            self.parser = None
+        
+        try:
+            self.tokenizer = tiktoken.encoding_for_model(settings.openai_model)
+        except Exception:
+            try:
+                self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                logger.warning("[ResponseGenerator] Could not load a tokenizer, estimating tokens from length")
+                self.tokenizer = None
     
     async def __call__(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Generate final response based on all workflow data"""
-        print("[ResponseGenerator] Generating final response...")
+        logger.info("[ResponseGenerator] Generating final response...")
         
         # Extract thread language from state
         thread_language = state.get("thread_language", "ENG")
-        print(f"[ResponseGenerator] Thread language: {thread_language}")
+        logger.info("[ResponseGenerator] Thread language: %s", thread_language)
         
         # Handle different paths
         if state.get("needs_clarification"):
@@ -673,7 +1243,7 @@ class ResponseGenerator:
     
     def _generate_clarification_response(self, state: Dict[str, Any], thread_language: str = "ENG") -> Dict[str, Any]:
         """Generate clarification response with language awareness"""
-        print(f"[ResponseGenerator] Generating clarification response for language: {thread_language}")
+        logger.info("[ResponseGenerator] Generating clarification response for language: %s", thread_language)
         
         clarification_question = state.get("clarification_question", 
             "Could you please provide more details about what you're trying to accomplish with your Question?")
@@ -692,63 +1262,36 @@ class ResponseGenerator:
     
     async def _generate_general_domain_response(self, state: Dict[str, Any], thread_language: str = "ENG") -> Dict[str, Any]:
         """Generate intelligent response for general questions using prompt template and trigger educational agent"""
-        print(f"[ResponseGenerator] Generating general domain response for language: {thread_language}")
-        
-        # Trigger educational agent asynchronously (non-blocking)
-        asyncio.create_task(self._trigger_educational_agent(state))
-        
-        # Get user context and memory
-        user_query = state.get("user_query", "")
-        memory_context = state.get("memory_context", {})
-        ltm_summary = memory_context.get("ltm_summary", "No previous interaction history")
-        
-        # Use English prompt template (simplified)
-        if thread_language == "SIN" or "ENG":
-
-            prompt = ChatPromptTemplate.from_template("""
-            You are Cloud ERA, a specialized AI assistant for cloud services and network infrastructure. Analyze the user's query and provide an intelligent response using ONLY the prompt template approach.
-
-            User Query: "{user_query}"
-            Thread Language: {thread_language}
-
-            CRITICAL INSTRUCTIONS - Handle ALL logic through this prompt (no custom code logic):
-
-            1. GREETING DETECTION & RESPONSE: 
-               - If user query is a greeting (hello, hi, good morning,thank you etc.), respond with a polite greeting
-               - For greetings, avoid other tasks and focus on welcoming the user
-
-            2. DOMAIN EXPLANATION FOR NON-GREETINGS:
-               - Explain that you specialize in cloud services and networking
-               - List your expertise areas with examples
-               - Describe how the chat threads work with specific examples
-
-            3. CHAT THREAD DESCRIPTIONS (very important):
-               - AWS Thread: Use this for Amazon Web Services questions 
-               - Azure Thread: Use this for Microsoft Azure questions 
-               - Smart Learner Thread: This thread provides personalized learning content and educational insights in Domain related topics
-
-            RESPONSE FORMAT:
-            - Start with appropriate greeting response OR domain explanation
-            - Include thread usage examples with specific services
-            - End with encouragement to ask domain-related questions
-            - Keep response friendly, informative, and actionable
-            - If User Question is in Sinhala Response must be in Sinhala
-            - If user Question is in English Response must be in English
-
-            Generate the response now:
-            """)
+        logger.info("[ResponseGenerator] Generating general domain response for language: %s", thread_language)
+        
+        # Trigger educational agent asynchronously (non-blocking) on a snapshot of the fields it reads
+        submit_background(self._trigger_educational_agent({
+            "user_id": state.get("user_id"),
+            "user_query": state.get("user_query", ""),
+            "history": list(state.get("history", [])),
+            "memory_context": dict(state.get("memory_context", {}))
+        }))
+        
+        # Bare greetings and thanks get a canned reply without an LLM round-trip
+        greeting = _GREETING_RE.match(state.get("user_query", ""))
+        if greeting:
+            logger.info("[ResponseGenerator] Greeting detected, using canned response")
+            canned = _CANNED_THANKS if greeting.group(1).lower().startswith(("th", "ස්තූ")) else _CANNED_GREETING
+            state["final_response"] = canned.get(thread_language, canned["ENG"])
+            state["response_type"] = "general_encouragement"
+            state["response_confidence"] = 1.0
+            state["sources_used"] = []
+            return state
         
         try:
-            chain = prompt | self.llm
-            result = await chain.ainvoke({
-                "user_query": user_query,
-                "ltm_summary": ltm_summary,
+            result = await self.general_chain.ainvoke({
+                "user_query": state.get("user_query", ""),
                 "thread_language": thread_language
             })
             
             response = result.content.strip()
             
-            print(f"[ResponseGenerator] Generated prompt-based general response: {len(response)} characters")
+            logger.info("[ResponseGenerator] Generated prompt-based general response: %s characters", len(response))
             
             state["final_response"] = response
             state["response_type"] = "general_encouragement"
@@ -758,7 +1301,7 @@ class ResponseGenerator:
             return state
             
         except Exception as e:
-            print(f"[ResponseGenerator] Error generating prompt-based general response: {e}")
+            logger.error("[ResponseGenerator] Error generating prompt-based general response: %s", e)
             # Simple fallback
             if thread_language == "SIN":
                 response = "මම cloud services සහ network infrastructure සඳහා විශේෂඥයෙක්. ඔබේ ප්‍රශ්නය අසන්න!"
@@ -771,77 +1314,75 @@ class ResponseGenerator:
             state["sources_used"] = []
             return state
     
-    def _print_response_context(self, state: Dict[str, Any]) -> None:
+    def _print_response_context(self, state: Dict[str, Any], successful_kb: int) -> None:
         """Print comprehensive context before final response generation"""
-        print(f"[ResponseGenerator] ENHANCED QUESTION:")
-        print(f"[ResponseGenerator]    {state.get('enhanced_question', 'None')}")
-        print(f"[ResponseGenerator] ")
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
+        logger.debug("[ResponseGenerator] ENHANCED QUESTION:")
+        logger.debug("[ResponseGenerator]    %s", state.get('enhanced_question', 'None'))
+        logger.debug("[ResponseGenerator] ")
         
-        print(f"[ResponseGenerator] USER MEMORY CONTEXT:")
+        logger.debug("[ResponseGenerator] USER MEMORY CONTEXT:")
         memory_context = state.get("memory_context", {})
         ltm_summary = memory_context.get("ltm_summary", "No user preferences/expertise stored")
-        print(f"[ResponseGenerator]    {ltm_summary}")
-        print(f"[ResponseGenerator] ")
+        logger.debug("[ResponseGenerator]    %s", ltm_summary)
+        logger.debug("[ResponseGenerator] ")
         
-        print(f"[ResponseGenerator] SUB-QUESTIONS (from decomposition):")
+        logger.debug("[ResponseGenerator] SUB-QUESTIONS (from decomposition):")
         sub_questions = state.get("sub_questions", [])
         if sub_questions:
             for i, sq in enumerate(sub_questions, 1):
-                print(f"[ResponseGenerator]    {i}. {sq}")
+                logger.debug("[ResponseGenerator]    %s. %s", i, sq)
         else:
-            print(f"[ResponseGenerator]    No sub-questions generated")
-        print(f"[ResponseGenerator] ")
+            logger.debug("[ResponseGenerator]    No sub-questions generated")
+        logger.debug("[ResponseGenerator] ")
         
-        print(f"[ResponseGenerator] KNOWLEDGE BASE RESULTS:")
+        logger.debug("[ResponseGenerator] KNOWLEDGE BASE RESULTS:")
         kb_results = state.get("kb_results", [])
-        successful_kb = sum(1 for r in kb_results if r.get("success"))
-        print(f"[ResponseGenerator]    KB queries: {len(kb_results)}")
-        print(f"[ResponseGenerator]    Successful KB results: {successful_kb}")
+        logger.debug("[ResponseGenerator]    KB queries: %s", len(kb_results))
+        logger.debug("[ResponseGenerator]    Successful KB results: %s", successful_kb)
         if kb_results:
             for i, kb_result in enumerate(kb_results[:3], 1):  # Show first 3
                 status = "SUCCESS" if kb_result.get("success") else "FAILED"
-                print(f"[ResponseGenerator]    {i}. {status} {kb_result['question'][:60]}...")
-        print(f"[ResponseGenerator] ")
+                logger.debug("[ResponseGenerator]    %s. %s %s...", i, status, kb_result['question'][:60])
+        logger.debug("[ResponseGenerator] ")
         
-        print(f"[ResponseGenerator] WEB SEARCH RESULTS:")
+        logger.debug("[ResponseGenerator] WEB SEARCH RESULTS:")
         web_search_results = state.get("web_search_results", [])
         scraped_content = state.get("scraped_content", {})
         web_results_count = len(state.get("web_search_results", []))
         
-        print(f"[ResponseGenerator]    Web results found: {web_results_count}")
-        print(f"[ResponseGenerator]    Search results found: {len(web_search_results)}")
-        print(f"[ResponseGenerator]    Pages scraped: {len(scraped_content)}")
+        logger.debug("[ResponseGenerator]    Web results found: %s", web_results_count)
+        logger.debug("[ResponseGenerator]    Search results found: %s", len(web_search_results))
+        logger.debug("[ResponseGenerator]    Pages scraped: %s", len(scraped_content))
         
         if web_search_results:
-            print(f"[ResponseGenerator]    Search results:")
+            logger.debug("[ResponseGenerator]    Search results:")
             for i, result in enumerate(web_search_results[:3], 1):
-                print(f"[ResponseGenerator]      {i}. {result.get('title', 'No title')}")
-                print(f"[ResponseGenerator]         URL: {result.get('url', 'No URL')}")
-                print(f"[ResponseGenerator]         Score: {result.get('score', 0.0)}")
+                logger.debug("[ResponseGenerator]      %s. %s", i, result.get('title', 'No title'))
+                logger.debug("[ResponseGenerator]         URL: %s", result.get('url', 'No URL'))
+                logger.debug("[ResponseGenerator]         Score: %s", result.get('score', 0.0))
         
         if scraped_content:
-            print(f"[ResponseGenerator]    Scraped content:")
+            logger.debug("[ResponseGenerator]    Scraped content:")
             for i, (url, content) in enumerate(list(scraped_content.items())[:2], 1):
-                content_preview = content[:150] + "..." if len(content) > 150 else content
-                print(f"[ResponseGenerator]      {i}. URL: {url}")
-                print(f"[ResponseGenerator]         Length: {len(content)} characters")
-                print(f"[ResponseGenerator]         Preview: {content_preview}")
-        
-        print(f"[ResponseGenerator] ")
-        print(f"[ResponseGenerator] WORKFLOW METADATA:")
-        print(f"[ResponseGenerator]    Iterations completed: {state.get('iteration_count', 0)}")
-        print(f"[ResponseGenerator]    Re-evaluator iterations: {state.get('re_evaluator_iterations', 0)}")
-        print(f"[ResponseGenerator]    Confidence score: {state.get('confidence_score', 0.0)}")
-        print(f"[ResponseGenerator] ")
-        print(f"[ResponseGenerator] NOW GENERATING FINAL RESPONSE...")
-        print(f"[ResponseGenerator] ================================================================")
+                logger.debug("[ResponseGenerator]      %s. URL: %s", i, url)
+                logger.debug("[ResponseGenerator]         Length: %s characters", len(content))
+                logger.debug("[ResponseGenerator]         Preview: %s", _preview(content, 150))
+        
+        logger.debug("[ResponseGenerator] ")
+        logger.debug("[ResponseGenerator] WORKFLOW METADATA:")
+        logger.debug("[ResponseGenerator]    Iterations completed: %s", state.get('iteration_count', 0))
+        logger.debug("[ResponseGenerator]    Re-evaluator iterations: %s", state.get('re_evaluator_iterations', 0))
+        logger.debug("[ResponseGenerator]    Confidence score: %s", state.get('confidence_score', 0.0))
+        logger.debug("[ResponseGenerator] ")
+        logger.debug("[ResponseGenerator] NOW GENERATING FINAL RESPONSE...")
+        logger.debug("[ResponseGenerator] ================================================================")
     
     async def _generate_domain_response(self, state: Dict[str, Any], thread_language: str = "ENG") -> Dict[str, Any]:
         """Generate comprehensive domain response using all processed data"""
-        print("[ResponseGenerator] ================ FINAL RESPONSE GENERATION ================")
-        
-        # Print detailed context before generating response
-        self._print_response_context(state)
+        logger.info("[ResponseGenerator] ================ FINAL RESPONSE GENERATION ================")
         
         # Prepare context from workflow
         intent = state.get("current_intent", "")
@@ -850,129 +1391,150 @@ class ResponseGenerator:
         web_search_results = state.get("web_search_results", [])
         scraped_content = state.get("scraped_content", {})
         kb_results = state.get("kb_results", [])
-        all_sources = state.get("all_sources", [])
+        kb_answers = [r for r in kb_results if r.get("success") and r.get("answer")]
+        
+        # Print detailed context before generating response
+        self._print_response_context(state, len(kb_answers))
+        
+        # Reuse the answer to a near-identical question grounded on the same sources
+        cache_namespace = _cache_scope(state, semantic_cache.namespace(f"response_generator_{thread_language}", 0.3))
+        fingerprint = _retrieval_fingerprint(kb_answers, scraped_content, web_search_results)
+        cache_vector = await _query_vector(state)
+        cached = semantic_cache.lookup(cache_namespace, cache_vector, fingerprint)
+        if cached is not None:
+            logger.info("[ResponseGenerator] Semantic cache hit, skipping generation")
+            state["final_response"] = cached["final_response"]
+            state["response_type"] = "domain_response"
+            state["response_confidence"] = cached["response_confidence"]
+            state["sources_used"] = list(cached["sources_used"])
+            return state
         
         # Prepare combined content summary
-        content_summary = ""
+        content_parts = []
         sources_used = []
         
+        # Fit KB answers and scraped pages into the context budget, favouring higher-confidence URLs
+        url_scores = state.get("url_confidence_scores", {})
+        fitted = self._fit_to_token_budget(
+            [r["answer"] for r in kb_answers] + list(scraped_content.values()),
+            [1.0] * len(kb_answers) + [url_scores.get(url, 0.0) for url in scraped_content],
+            settings.response_context_token_budget
+        )
+        
         # Prepare knowledge base content summary
         if kb_results:
-            content_summary += "\n\nKNOWLEDGE BASE RESULTS:\n"
-            for kb_result in kb_results:
-                if kb_result.get("success") and kb_result.get("answer"):
-                    sources_used.append(f"Knowledge Base: {kb_result['question']}")
-                    content_summary += f"Question: {kb_result['question']}\n"
-                    content_summary += f"Answer: {kb_result['answer']}\n\n"
+            content_parts.append("\n\nKNOWLEDGE BASE RESULTS:\n")
+            for kb_result, answer in zip(kb_answers, fitted):
+                sources_used.append(f"Knowledge Base: {kb_result['question']}")
+                content_parts.append(f"Question: {kb_result['question']}\nAnswer: {answer}\n\n")
         
         # Prepare web search content summary
         if scraped_content:
-            content_summary += "\n\nWEB SEARCH RESULTS:\n"
-            for url, content in scraped_content.items():
+            content_parts.append("\n\nWEB SEARCH RESULTS:\n")
+            for url, content in zip(scraped_content, fitted[len(kb_answers):]):
                 sources_used.append(url)
-                # Use full content instead of truncating to provide complete context
-                summary = content
-                content_summary += f"Source: {url}\nContent: {summary}\n\n"
+                content_parts.append(f"Source: {url}\nContent: {content}\n\n")
         
         if web_search_results and not scraped_content:
-            content_summary += "\n\nWEB SEARCH RESULTS:\n"
+            content_parts.append("\n\nWEB SEARCH RESULTS:\n")
             for result in web_search_results[:3]:
                 sources_used.append(result.get("url", ""))
-                content_summary += f"Title: {result.get('title', '')}\n"
-                content_summary += f"URL: {result.get('url', '')}\n"
-                content_summary += f"Description: {result.get('description', '')}\n\n"
+                content_parts.append(
+                    f"Title: {result.get('title', '')}\nURL: {result.get('url', '')}\nDescription: {result.get('description', '')}\n\n"
+                )
+        
+        content_summary = "".join(content_parts)
         
         # Add language instruction for Sinhala threads
         language_instruction = ""
         if thread_language == "SIN":
-            language_instruction = "\n\nIMPORTANT: Provide your response ONLY in Sinhala language."
-        
-        prompt = ChatPromptTemplate.from_template(f"""
-        You are a specialized Cloud Services and Network Infrastructure assistant. Generate a comprehensive response using ONLY the provided sources and context.
-
-        User's Original Question: {{original_query}}
-        Extracted Intent: {{intent}}
-        Enhanced Question: {{enhanced_question}}
-        
-        Sub-questions to address:
-        {{sub_questions}}
+            language_instruction = "IMPORTANT: Provide your response ONLY in Sinhala language."
         
-        AVAILABLE CONTEXT SOURCES:
-        {{content_sources}}
-        
-        CRITICAL CONTEXT-ONLY RESTRICTIONS:
-        1. **ONLY USE PROVIDED CONTEXT**: Base your response EXCLUSIVELY on the knowledge base results and web search results provided above. Do NOT use general knowledge or information not present in the provided sources.
-        
-        2. **INSUFFICIENT CONTEXT HANDLING**: If the provided context does not contain enough information to answer the question comprehensively, explicitly state: "Based on the available information, I can provide the following..." and then note what additional information would be helpful.
-        
-        3. **SOURCE-BASED REASONING**: Every statement in your response must be traceable to the provided knowledge base results or web search content. If you cannot trace a fact to the provided sources, do not include it.
-        
-        4. **NO HALLUCINATION**: Do not add information about cloud platforms, services, or technical details that are not explicitly mentioned in the provided context sources.
-        
-        Response Instructions:
-        1. Analyze the provided knowledge base and web search results carefully
-        2. Use ONLY information found in these sources to construct your response
-        3. Structure the response clearly with headings or bullet points where appropriate
-        4. Cite which sources (knowledge base or specific URLs) provide each piece of information
-        5. If the provided context lacks sufficient detail, acknowledge this limitation
-        6. Address each sub-question area using only the available context
-        7. If no relevant context is provided for a sub-question, state "The provided sources do not contain information about [specific topic]"
-        
-        Response format:
-        - Start with a direct answer based on available context
-        - Address each sub-question using only provided information
-        - Include relevant examples or details ONLY if they appear in the sources
-        - End with acknowledgment of any information gaps if context is insufficient
-        - Always cite sources for major points (e.g., "According to the knowledge base..." or "Based on the web search results...")
-        
-        Remember: Your response quality depends on staying within the provided context boundaries rather than drawing from general knowledge.{language_instruction}
-        
-        {{format_instructions}}
-        """)
         
         try:
             sub_questions_text = "\n".join([f"• {sq}" for sq in sub_questions])
             
-            chain = prompt | self.llm | self.parser
-            result = await chain.ainvoke({
+            result = await self._stream_domain_response(state.get("thread_id", "unknown"), {
                 "original_query": state["user_query"],
                 "intent": intent,
                 "enhanced_question": enhanced_question,
                 "sub_questions": sub_questions_text,
                 "content_sources": content_summary,
-                "format_instructions": self.parser.get_format_instructions()
+                "language_instruction": language_instruction
             })
             
-            # Handle both dict and object responses
-            if isinstance(result, dict):
-                response = result.get("response", "I can help with your cloud and network question, but I need more specific details.")
-                confidence = result.get("confidence", 0.7)
-            else:
-                response = result.response
-                confidence = result.confidence
+            response, confidence = result
             
             # Simple language handling - no translation needed
             
-            print(f"[ResponseGenerator] Generated response: {len(response)} characters")
-            print(f"[ResponseGenerator] Using {len(sources_used)} total sources")
-            print(f"[ResponseGenerator] - KB results: {len(kb_results)}")
-            print(f"[ResponseGenerator] - Web results: {len(web_search_results)}")
-            print(f"[ResponseGenerator] - Scraped pages: {len(scraped_content)}")
+            logger.info("[ResponseGenerator] Generated response: %s characters", len(response))
+            logger.info("[ResponseGenerator] Using %s total sources", len(sources_used))
+            logger.info("[ResponseGenerator] - KB results: %s (%s answered)", len(kb_results), len(kb_answers))
+            logger.info("[ResponseGenerator] - Web results: %s", len(web_search_results))
+            logger.info("[ResponseGenerator] - Scraped pages: %s", len(scraped_content))
             
             state["final_response"] = response
             state["response_type"] = "domain_response"
             state["response_confidence"] = confidence
             state["sources_used"] = sources_used
+            semantic_cache.store(cache_namespace, cache_vector, {
+                "final_response": response,
+                "response_confidence": confidence,
+                "sources_used": list(sources_used)
+            }, fingerprint)
             
             return state
             
         except Exception as e:
-            print(f"[ResponseGenerator] Error generating response: {e}")
-            print(f"[ResponseGenerator] Error type: {type(e).__name__}")
-            print(f"[ResponseGenerator] Error details: {str(e)}")
-            import traceback
-            print(f"[ResponseGenerator] Traceback: {traceback.format_exc()}")
-            raise
+            logger.exception("[ResponseGenerator] Error generating response (%s): %s", type(e).__name__, e)
+            
+            # Answer from the retrieved sources rather than discarding the retrieval work
+            passages = [(f"Knowledge Base: {r['question']}", r["answer"]) for r in kb_answers]
+            passages += list(scraped_content.items()) or [
+                (r.get("url", ""), r.get("description", "")) for r in web_search_results[:3]
+            ]
+            state["final_response"] = _extractive_answer(enhanced_question or state["user_query"], passages, thread_language)
+            state["response_type"] = "degraded"
+            state["response_confidence"] = 0.4
+            state["sources_used"] = sources_used
+            return state
+    
+    def _fit_to_token_budget(self, texts: List[str], weights: List[float], budget: int) -> List[str]:
+        """Trim texts to share a token budget in proportion to their weights"""
+        if self.tokenizer is not None:
+            tokens = [self.tokenizer.encode(text) for text in texts]
+            lengths = [len(t) for t in tokens]
+        else:
+            # Rough estimate: 1 token per 4 characters
+            lengths = [len(text) // 4 for text in texts]
+        if sum(lengths) <= budget:
+            return texts
+        
+        allowances = _allocate_token_budget(lengths, weights, budget)
+        fitted = []
+        for index, (text, allowance) in enumerate(zip(texts, allowances)):
+            if allowance >= lengths[index]:
+                fitted.append(text)
+            elif self.tokenizer is not None:
+                fitted.append(self.tokenizer.decode(tokens[index][:allowance]) + "\n[TRUNCATED]")
+            else:
+                fitted.append(text[:allowance * 4] + "\n[TRUNCATED]")
+        logger.info("[ResponseGenerator] Trimmed source context from %s to %s tokens", sum(lengths), budget)
+        return fitted
+    
+    async def _stream_domain_response(self, thread_id: str, inputs: Dict[str, Any]) -> tuple:
+        """Stream the domain answer, publishing it to the thread's state stream as it arrives; returns (response, confidence)"""
+        chunks = []
+        unpublished = 0
+        async for chunk in self.domain_chain.astream(inputs):
+            if not chunk.content:
+                continue
+            chunks.append(chunk.content)
+            unpublished += len(chunk.content)
+            if unpublished >= _STREAM_EMIT_CHARS:
+                unpublished = 0
+                await emit_response_progress(thread_id, _PARTIAL_CONFIDENCE_TAG_RE.sub("", "".join(chunks)))
+        return _split_confidence_tag("".join(chunks))
     
     async def _trigger_educational_agent(self, state: Dict[str, Any]):
         """Trigger educational agent for general questions (non-blocking)"""
@@ -996,163 +1558,4 @@ class ResponseGenerator:
             )
             
         except Exception as e:
-            print(f"[ResponseGenerator] Error triggering educational agent: {e}")
-    
-    def _generate_debug_response(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate debug response showing all system data instead of LLM response"""
-        print("[ResponseGenerator] Generating DEBUG response with all system data")
-        
-        # Extract all data from state
-        user_query = state.get("user_query", "")
-        enhanced_question = state.get("enhanced_question", "")
-        current_intent = state.get("current_intent", "")
-        sub_questions = state.get("sub_questions", [])
-        web_queries = state.get("web_queries", [])
-        
-        # Knowledge base results
-        kb_results = state.get("kb_results", [])
-        
-        # Web search results
-        web_search_results = state.get("web_search_results", [])
-        scraped_content = state.get("scraped_content", {})
-        url_confidence_scores = state.get("url_confidence_scores", {})
-        
-        # Memory context
-        memory_context = state.get("memory_context", {})
-        conversation_history = state.get("history", [])
-        
-        # Build debug response
-        debug_sections = []
-        
-        # 1. User Questions Section
-        debug_sections.append("=== USER QUESTIONS ===")
-        debug_sections.append(f"Original Question: {user_query}")
-        debug_sections.append(f"Enhanced Question: {enhanced_question}")
-        debug_sections.append(f"Extracted Intent: {current_intent}")
-        debug_sections.append("")
-        
-        # 2. Sub-questions and Web Queries
-        debug_sections.append("=== SUB-QUESTIONS & WEB QUERIES ===")
-        debug_sections.append("Sub-questions from Decomposer:")
-        if sub_questions:
-            for i, sq in enumerate(sub_questions, 1):
-                debug_sections.append(f"  {i}. {sq}")
-        else:
-            debug_sections.append("  (No sub-questions generated)")
-        
-        debug_sections.append("")
-        debug_sections.append("Web Search Queries:")
-        if web_queries:
-            for i, wq in enumerate(web_queries, 1):
-                debug_sections.append(f"  {i}. {wq}")
-        else:
-            debug_sections.append("  (No web queries generated)")
-        debug_sections.append("")
-        
-        # 3. Knowledge Base Results
-        debug_sections.append("=== KNOWLEDGE BASE RESULTS ===")
-        if kb_results:
-            for i, kb_result in enumerate(kb_results, 1):
-                status = "SUCCESS" if kb_result.get("success") else "FAILED"
-                debug_sections.append(f"KB Query {i}: {status}")
-                debug_sections.append(f"  Question: {kb_result.get('question', 'N/A')}")
-                if kb_result.get("success") and kb_result.get("answer"):
-                    answer = kb_result["answer"][:200] + "..." if len(kb_result["answer"]) > 200 else kb_result["answer"]
-                    debug_sections.append(f"  Answer: {answer}")
-                else:
-                    debug_sections.append(f"  Error: {kb_result.get('error', 'Unknown error')}")
-                debug_sections.append("")
-        else:
-            debug_sections.append("(No knowledge base results)")
-            debug_sections.append("")
-        
-        # 4. Enhanced Web Search Results
-        debug_sections.append("=== ENHANCED WEB SEARCH RESULTS ===")
-        debug_sections.append(f"Search Results Found: {len(web_search_results)}")
-        debug_sections.append(f"Pages Scraped: {len(scraped_content)}")
-        debug_sections.append(f"URLs with Confidence Scores: {len(url_confidence_scores)}")
-        debug_sections.append("")
-        
-        if web_search_results:
-            debug_sections.append("Search Results with Confidence Scores:")
-            for i, result in enumerate(web_search_results, 1):  # Show ALL results
-                url = result.get('url', 'No URL')
-                confidence = url_confidence_scores.get(url, 0.0)
-                debug_sections.append(f"  {i}. {result.get('title', 'No title')}")
-                debug_sections.append(f"     URL: {url}")
-                debug_sections.append(f"     Search Score: {result.get('score', 0.0):.3f}")
-                debug_sections.append(f"     Confidence Score: {confidence:.3f}")
-                description = result.get('description', '')[:150] + "..." if len(result.get('description', '')) > 150 else result.get('description', '')
-                debug_sections.append(f"     Description: {description}")
-                debug_sections.append("")
-        
-        # Show URL confidence ranking
-        if url_confidence_scores:
-            debug_sections.append("URL Confidence Ranking:")
-            sorted_urls = sorted(url_confidence_scores.items(), key=lambda x: x[1], reverse=True)
-            for i, (url, confidence) in enumerate(sorted_urls, 1):
-                debug_sections.append(f"  {i}. Confidence {confidence:.3f}: {url}")
-            debug_sections.append("")
-        
-        # 5. Scraped Web Content with Confidence
-        if scraped_content:
-            debug_sections.append("=== SCRAPED WEB CONTENT ===")
-            for i, (url, content) in enumerate(scraped_content.items(), 1):
-                confidence = url_confidence_scores.get(url, 0.0)
-                debug_sections.append(f"Scraped Content {i} (Confidence: {confidence:.3f}):")
-                debug_sections.append(f"  URL: {url}")
-                content_preview = content[:300] + "..." if len(content) > 300 else content
-                debug_sections.append(f"  Content: {content_preview}")
-                debug_sections.append(f"  Total Length: {len(content)} characters")
-                debug_sections.append("")
-        
-        # 6. Memory Context
-        debug_sections.append("=== MEMORY CONTEXT ===")
-        debug_sections.append("Short-term Memory (STM):")
-        stm_summary = memory_context.get("stm_summary", "No STM summary available")
-        debug_sections.append(f"  {stm_summary}")
-        debug_sections.append("")
-        
-        debug_sections.append("Long-term Memory (LTM):")
-        ltm_summary = memory_context.get("ltm_summary", "No LTM summary available")
-        debug_sections.append(f"  {ltm_summary}")
-        debug_sections.append("")
-        
-        # 7. Conversation History
-        debug_sections.append("=== CONVERSATION HISTORY ===")
-        if conversation_history:
-            debug_sections.append(f"Recent messages ({len(conversation_history)} total):")
-            for i, msg in enumerate(conversation_history[-3:], 1):  # Show last 3 messages
-                role = msg.get('role', 'unknown')
-                content = msg.get('content', '')[:100] + "..." if len(msg.get('content', '')) > 100 else msg.get('content', '')
-                debug_sections.append(f"  {i}. [{role.upper()}]: {content}")
-        else:
-            debug_sections.append("(No conversation history)")
-        debug_sections.append("")
-        
-        # 8. Enhanced System Status
-        debug_sections.append("=== ENHANCED SYSTEM STATUS ===")
-        retrieval_status = state.get("retrieval_status", {})
-        debug_sections.append(f"Knowledge Base Status: {retrieval_status.get('knowledge_base', 'unknown')}")
-        debug_sections.append(f"Enhanced Web Search Status: {retrieval_status.get('web_search', 'unknown')}")
-        debug_sections.append(f"Total Sources Combined: {len(state.get('all_sources', []))}")
-        debug_sections.append(f"Tavily-JINA Fallback: Active")
-        debug_sections.append(f"URL Confidence Evaluation: {'Active' if url_confidence_scores else 'No URLs evaluated'}")
-        debug_sections.append(f"High Confidence URLs (>0.7): {sum(1 for score in url_confidence_scores.values() if score > 0.7)}")
-        debug_sections.append("")
-        
-        # Combine all sections
-        debug_response = "\n".join(debug_sections)
-        
-        # Set response in state
-        state["final_response"] = debug_response
-        state["response_type"] = "debug_response"
-        state["response_confidence"] = 1.0
-        # Include confidence scores in sources
-        confidence_sources = [f"{url} (confidence: {url_confidence_scores.get(url, 0.0):.2f})" for url in scraped_content.keys()]
-        kb_sources = [f"KB: {r.get('question', 'N/A')}" for r in kb_results if r.get("success")]
-        state["sources_used"] = confidence_sources + kb_sources
-        
-        print(f"[ResponseGenerator] Debug response generated: {len(debug_response)} characters")
-        
-        return state
\ No newline at end of file
+            logger.error("[ResponseGenerator] Error triggering educational agent: %s", e)
@@ -0,0 +1,50 @@
+"""
+Background Job Pool
+
+Bounded pool for fire-and-forget agent work (educational agent triggers,
+memory updates). Jobs are queued and run by a fixed set of worker tasks, so
+a burst of requests cannot spawn an unbounded number of concurrent tasks.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Coroutine, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_BACKGROUND_WORKER_COUNT = min(32, (os.cpu_count() or 1) * 2)
+_BACKGROUND_QUEUE_SIZE = 1000
+_background_queue: Optional[asyncio.Queue] = None
+# Strong references to the workers so they are not garbage collected
+_background_workers: List[asyncio.Task] = []
+
+
+async def _background_worker():
+    """Run queued background jobs one at a time"""
+    while True:
+        job = await _background_queue.get()
+        try:
+            await job
+        except Exception:
+            logger.exception("[Background] Background job failed")
+        finally:
+            _background_queue.task_done()
+
+
+def submit_background(job: Coroutine) -> bool:
+    """Queue a fire-and-forget coroutine on the bounded worker pool (drops it when the queue is full)"""
+    global _background_queue
+    if _background_queue is None:
+        # Workers are started lazily on first use, inside the running event loop
+        _background_queue = asyncio.Queue(maxsize=_BACKGROUND_QUEUE_SIZE)
+        for _ in range(_BACKGROUND_WORKER_COUNT):
+            _background_workers.append(asyncio.create_task(_background_worker()))
+
+    try:
+        _background_queue.put_nowait(job)
+        return True
+    except asyncio.QueueFull:
+        job.close()
+        logger.warning("[Background] Queue full, job dropped")
+        return False
@@ -5,19 +5,58 @@ Provides circuit breaker functionality for external services to prevent
 cascading failures and improve system resilience under high load.
 """
 
+import asyncio
+import logging
 import time
 import threading
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Awaitable, List, Optional, Callable
 from enum import Enum
 from collections import defaultdict
 
+logger = logging.getLogger(__name__)
+
 class CircuitState(Enum):
     CLOSED = "closed"       # Normal operation
     OPEN = "open"           # Circuit is open, rejecting calls
     HALF_OPEN = "half_open" # Testing if service is back
 
+class StripedCounter:
+    """Counter that threads bump without a shared lock; each thread owns a cell and reads sum them
+    
+    Cells are separate objects allocated by their own thread, so concurrent
+    writers (of one breaker or of different breakers) never update the same object.
+    """
+    
+    __slots__ = ("_local", "_cells", "_cells_lock")
+    
+    def __init__(self):
+        self._local = threading.local()
+        self._cells: List[List[int]] = []
+        self._cells_lock = threading.Lock()
+    
+    def increment(self, amount: int = 1):
+        """Add amount to the calling thread's cell"""
+        cell = getattr(self._local, "cell", None)
+        if cell is None:
+            cell = [0]
+            self._local.cell = cell
+            with self._cells_lock:
+                self._cells.append(cell)
+        cell[0] += amount
+    
+    @property
+    def value(self) -> int:
+        """Sum of all cells (may miss increments racing with the read)"""
+        with self._cells_lock:
+            cells = list(self._cells)
+        return sum(cell[0] for cell in cells)
+
 class CircuitBreaker:
-    """Circuit breaker for external service calls"""
+    """Circuit breaker for external service calls
+    
+    Only state transitions are serialized, under a short lock; the wrapped
+    function runs outside it so concurrent calls through one breaker overlap.
+    """
     
     def __init__(self, 
                  name: str,
@@ -30,86 +69,154 @@ class CircuitBreaker:
         self.timeout = timeout
         
         self.failure_count = 0
-        self.last_failure_time = None
+        self.last_failure_time = None  # Wall-clock, for stats only
+        self._last_failure_monotonic: Optional[float] = None  # Drives the recovery timeout
         self.state = CircuitState.CLOSED
-        self.lock = threading.Lock()
+        # Set while the single HALF_OPEN probe call is running
+        self._half_open_in_flight = False
+        # Guards state, failure_count, last_failure_time and the probe slot; never held while the wrapped function runs
+        self._state_lock = threading.Lock()
         
         # Statistics
-        self.total_calls = 0
-        self.successful_calls = 0
-        self.failed_calls = 0
-        self.rejected_calls = 0
+        self.total_calls = StripedCounter()
+        self.successful_calls = StripedCounter()
+        self.failed_calls = StripedCounter()
+        self.rejected_calls = StripedCounter()
         
     def call(self, func: Callable, *args, **kwargs) -> Any:
         """Execute function through circuit breaker"""
-        with self.lock:
-            self.total_calls += 1
+        probe = self._admit()
+        
+        # Execute the function
+        try:
+            start_time = time.perf_counter()
+            result = func(*args, **kwargs)
+            execution_time = time.perf_counter() - start_time
+            
+            # Check for timeout
+            if execution_time > self.timeout:
+                raise TimeoutError(f"Function execution exceeded {self.timeout}s")
             
-            # Check if circuit should be half-open
+        except Exception as e:
+            self._on_failure(probe)
+            raise e
+        except BaseException:
+            # KeyboardInterrupt/SystemExit are not service failures; just free the probe slot
+            self._release_probe(probe)
+            raise
+        
+        # Success - reset failure count
+        self._on_success(probe)
+        return result
+    
+    async def acall(self, func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Await a coroutine function through the circuit breaker, cancelling it after the timeout"""
+        # The state lock only covers bookkeeping and is never held across an await
+        probe = self._admit()
+        
+        try:
+            result = await asyncio.wait_for(func(*args, **kwargs), timeout=self.timeout)
+        except Exception as e:
+            self._on_failure(probe)
+            raise e
+        except BaseException:
+            # Cancellation (the caller gave up) or interpreter exit says nothing about the service; just free the probe slot
+            self._release_probe(probe)
+            raise
+        
+        self._on_success(probe)
+        return result
+    
+    def _admit(self) -> bool:
+        """Count the call and decide whether it may run; returns True if it is the HALF_OPEN probe"""
+        self.total_calls.increment()
+        
+        # Check if circuit should be half-open
+        probe = False
+        with self._state_lock:
             if self.state == CircuitState.OPEN:
                 if self._should_attempt_reset():
                     self.state = CircuitState.HALF_OPEN
-                    print(f"[CircuitBreaker:{self.name}] Entering HALF_OPEN state")
                 else:
-                    self.rejected_calls += 1
+                    self.rejected_calls.increment()
                     raise CircuitBreakerOpenError(f"Circuit breaker {self.name} is OPEN")
             
-            # Execute the function
-            try:
-                start_time = time.time()
-                result = func(*args, **kwargs)
-                execution_time = time.time() - start_time
-                
-                # Check for timeout
-                if execution_time > self.timeout:
-                    raise TimeoutError(f"Function execution exceeded {self.timeout}s")
-                
-                # Success - reset failure count
-                self._on_success()
-                return result
-                
-            except Exception as e:
-                self._on_failure()
-                raise e
+            # Only one probe at a time while HALF_OPEN; everyone else is rejected until it resolves
+            if self.state == CircuitState.HALF_OPEN:
+                if self._half_open_in_flight:
+                    self.rejected_calls.increment()
+                    raise CircuitBreakerOpenError(f"Circuit breaker {self.name} is HALF_OPEN with a probe in flight")
+                self._half_open_in_flight = probe = True
+        
+        # Logged after the lock is released so I/O never lengthens the critical section
+        if probe:
+            logger.info("[CircuitBreaker:%s] HALF_OPEN - admitting probe call", self.name)
+        return probe
+    
+    def _release_probe(self, probe: bool):
+        """Free the HALF_OPEN probe slot without recording an outcome"""
+        if probe:
+            with self._state_lock:
+                self._half_open_in_flight = False
     
     def _should_attempt_reset(self) -> bool:
         """Check if enough time has passed to attempt reset"""
-        if self.last_failure_time is None:
+        if self._last_failure_monotonic is None:
             return True
-        return time.time() - self.last_failure_time >= self.recovery_timeout
+        return time.monotonic() - self._last_failure_monotonic >= self.recovery_timeout
     
-    def _on_success(self):
+    def _on_success(self, probe: bool = False):
         """Handle successful call"""
-        self.successful_calls += 1
-        self.failure_count = 0
+        self.successful_calls.increment()
+        recovered = False
+        with self._state_lock:
+            self.failure_count = 0
+            if probe:
+                self._half_open_in_flight = False
+            
+            if self.state == CircuitState.HALF_OPEN:
+                self.state = CircuitState.CLOSED
+                recovered = True
         
-        if self.state == CircuitState.HALF_OPEN:
-            self.state = CircuitState.CLOSED
-            print(f"[CircuitBreaker:{self.name}] Recovered - returning to CLOSED state")
+        if recovered:
+            logger.info("[CircuitBreaker:%s] Recovered - returning to CLOSED state", self.name)
     
-    def _on_failure(self):
+    def _on_failure(self, probe: bool = False):
         """Handle failed call"""
-        self.failed_calls += 1
-        self.failure_count += 1
-        self.last_failure_time = time.time()
+        self.failed_calls.increment()
+        opened = False
+        with self._state_lock:
+            self.failure_count += 1
+            failure_count = self.failure_count
+            self.last_failure_time = time.time()
+            self._last_failure_monotonic = time.monotonic()
+            if probe:
+                self._half_open_in_flight = False
+            
+            if failure_count >= self.failure_threshold:
+                opened = self.state != CircuitState.OPEN
+                self.state = CircuitState.OPEN
         
-        if self.failure_count >= self.failure_threshold:
-            self.state = CircuitState.OPEN
-            print(f"[CircuitBreaker:{self.name}] OPENED - {self.failure_count} failures exceeded threshold")
+        if opened:
+            logger.warning("[CircuitBreaker:%s] OPENED - %s failures exceeded threshold", self.name, failure_count)
+        else:
+            logger.debug("[CircuitBreaker:%s] Call failed (%s/%s)", self.name, failure_count, self.failure_threshold)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get circuit breaker statistics"""
-        with self.lock:
-            success_rate = (self.successful_calls / max(self.total_calls, 1)) * 100
+        total_calls = self.total_calls.value
+        successful_calls = self.successful_calls.value
+        success_rate = (successful_calls / max(total_calls, 1)) * 100
+        with self._state_lock:
             return {
                 "name": self.name,
                 "state": self.state.value,
                 "failure_count": self.failure_count,
                 "failure_threshold": self.failure_threshold,
-                "total_calls": self.total_calls,
-                "successful_calls": self.successful_calls,
-                "failed_calls": self.failed_calls,
-                "rejected_calls": self.rejected_calls,
+                "total_calls": total_calls,
+                "successful_calls": successful_calls,
+                "failed_calls": self.failed_calls.value,
+                "rejected_calls": self.rejected_calls.value,
                 "success_rate": round(success_rate, 2),
                 "last_failure_time": self.last_failure_time,
                 "recovery_timeout": self.recovery_timeout
@@ -117,11 +224,13 @@ class CircuitBreaker:
     
     def reset(self):
         """Manually reset the circuit breaker"""
-        with self.lock:
+        with self._state_lock:
             self.failure_count = 0
             self.state = CircuitState.CLOSED
             self.last_failure_time = None
-            print(f"[CircuitBreaker:{self.name}] Manually reset to CLOSED state")
+            self._last_failure_monotonic = None
+            self._half_open_in_flight = False
+        logger.info("[CircuitBreaker:%s] Manually reset to CLOSED state", self.name)
 
 class CircuitBreakerOpenError(Exception):
     """Raised when circuit breaker is open"""
@@ -136,16 +245,27 @@ class CircuitBreakerManager:
     
     def get_breaker(self, name: str, **kwargs) -> CircuitBreaker:
         """Get or create a circuit breaker"""
+        # Breakers are created once and then only read, so the lock is only needed on a miss
+        breaker = self.breakers.get(name)
+        if breaker is not None:
+            return breaker
+        
         with self.lock:
-            if name not in self.breakers:
-                self.breakers[name] = CircuitBreaker(name, **kwargs)
-                print(f"[CircuitBreakerManager] Created circuit breaker: {name}")
-            return self.breakers[name]
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, **kwargs)
+                self.breakers[name] = breaker
+                created = True
+            else:
+                created = False
+        
+        if created:
+            logger.info("[CircuitBreakerManager] Created circuit breaker: %s", name)
+        return breaker
     
     def get_all_stats(self) -> Dict[str, Dict[str, Any]]:
         """Get statistics for all circuit breakers"""
-        with self.lock:
-            return {name: breaker.get_stats() for name, breaker in self.breakers.items()}
+        return {name: breaker.get_stats() for name, breaker in list(self.breakers.items())}
     
     def reset_all(self):
         """Reset all circuit breakers"""
@@ -160,8 +280,21 @@ circuit_manager = CircuitBreakerManager()
 def circuit_breaker(name: str, **breaker_kwargs):
     """Decorator to apply circuit breaker to a function"""
     def decorator(func):
+        breaker = None
+        
+        def resolve() -> CircuitBreaker:
+            # Resolve the shared breaker on first use, then reuse it for every call
+            nonlocal breaker
+            if breaker is None:
+                breaker = circuit_manager.get_breaker(name, **breaker_kwargs)
+            return breaker
+        
+        if asyncio.iscoroutinefunction(func):
+            async def async_wrapper(*args, **kwargs):
+                return await resolve().acall(func, *args, **kwargs)
+            return async_wrapper
+        
         def wrapper(*args, **kwargs):
-            breaker = circuit_manager.get_breaker(name, **breaker_kwargs)
-            return breaker.call(func, *args, **kwargs)
+            return resolve().call(func, *args, **kwargs)
         return wrapper
     return decorator
\ No newline at end of file
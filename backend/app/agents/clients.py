@@ -0,0 +1,52 @@
+"""
+Shared LLM Clients
+
+Process-wide DeepSeek and OpenAI clients. Agents bind their own per-call
+options (temperature, response format) onto these instead of constructing
+new clients, so every call reuses the same keep-alive connection pools.
+"""
+
+import logging
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI, DEFAULT_TIMEOUT
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+
+def _pooled_http_client() -> httpx.AsyncClient:
+    """Async HTTP client with a connection pool sized for concurrent agent calls"""
+    return httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=DEFAULT_TIMEOUT)
+
+
+if settings.deepseek_api_key:
+    deepseek_client = AsyncOpenAI(
+        api_key=settings.deepseek_api_key,
+        base_url="https://api.deepseek.com",
+        http_client=_pooled_http_client()
+    )
+else:
+    logger.warning("[Clients] No DeepSeek API key available")
+    deepseek_client = None
+
+if settings.openai_api_key:
+    openai_client = AsyncOpenAI(
+        api_key=settings.openai_api_key,
+        http_client=_pooled_http_client()
+    )
+    # LangChain chat model sharing the OpenAI client's pool for async calls
+    openai_chat = ChatOpenAI(
+        model=settings.openai_model,
+        temperature=0,
+        api_key=settings.openai_api_key,
+        async_client=openai_client.chat.completions
+    )
+else:
+    logger.warning("[Clients] No OpenAI API key available")
+    openai_client = None
+    openai_chat = None
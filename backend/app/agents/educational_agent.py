@@ -6,19 +6,59 @@ when users ask non-domain questions or need clarification. Posts content to SMAR
 """
 
 import asyncio
+import threading
 from typing import List, Dict, Any, Optional
-from openai import AsyncOpenAI
 from datetime import datetime, timezone
 import uuid
 import random
 
 from app.core.config import settings
 from .circuit_breaker import circuit_manager
+from .clients import openai_client
 from app.models.chat_thread import ChatThread, ThreadType
 from app.models.message import Message, MessageAuthor
 from app.database.database import get_db
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
+# Response types that trigger an educational post
+_EDUCATIONAL_RESPONSE_TYPES = frozenset({"general", "followup"})
+
+# Characters of each earlier Smart Learner post fed back into the prompt
+_HISTORY_EXCERPT_CHARS = 400
+
+# Rendered with format_map per post; only topic, ltm_summary and thread_context vary
+_CREATIVE_POST_PROMPT = """
+Create a brief, engaging educational post in "Did you know?" Q&A format for a Smart Learner thread.
+
+Topic Focus: {topic}
+User's Learning History (LTM): {ltm_summary}
+Smart Thread Context: {thread_context}
+
+Requirements:
+1. Start with "Did you know?" followed by an interesting question
+2. Provide a clear, concise answer (2-3 sentences max)
+3. Focus on practical cloud services, DevOps, security, and data protection insights
+4. Make it relevant to user's learning context
+5. Keep it brief but resourceful - users should be attracted, not overwhelmed
+6. Include a credible source link if possible (optional)
+
+Format:
+**Did you know?** [Engaging question about the topic]
+
+[Brief, practical answer with real-world relevance]
+
+💡 **Key Takeaway:** [One actionable insight]
+
+[Optional: 📚 **Source:** [Credible link or reference]]
+
+Focus Areas:
+- Build on their previous learning context
+- Avoid repeating recent Smart Thread topics
+- Provide immediately applicable knowledge
+- Connect to practical cloud/security scenarios
+"""
+
 
 class EducationalContentAgent:
     """
@@ -28,7 +68,7 @@ class EducationalContentAgent:
 
     def __init__(self):
         print("[EducationalAgent] Initializing Educational Content Agent")
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+        self.client = openai_client
         self.circuit_breaker = circuit_manager.get_breaker("educational_agent")
         
         # Simplified content categories for creative ideas
@@ -67,50 +107,25 @@ class EducationalContentAgent:
             ltm_summary = memory_context.get("ltm_summary", "New user exploring cloud technologies")
             
             # Build context from smart thread history
-            thread_context = ""
             if smart_thread_history:
-                recent_topics = []
-                for msg in smart_thread_history[-3:]:  # Last 3 messages
-                    if msg.get("content"):
-                        # Extract key topics from previous educational content
-                        content = msg.get("content", "")[:400]
-                        recent_topics.append(content)
-                thread_context = " | ".join(recent_topics) if recent_topics else "Starting educational journey"
+                # Key topics from the last 3 educational posts
+                thread_context = " | ".join(
+                    msg["content"][:_HISTORY_EXCERPT_CHARS]
+                    for msg in smart_thread_history[-3:]
+                    if msg.get("content")
+                ) or "Starting educational journey"
             else:
                 thread_context = "Fresh start in learning journey"
             
-            prompt = f"""
-            Create a brief, engaging educational post in "Did you know?" Q&A format for a Smart Learner thread.
-            
-            Topic Focus: {topic}
-            User's Learning History (LTM): {ltm_summary}
-            Smart Thread Context: {thread_context}
-            
-            Requirements:
-            1. Start with "Did you know?" followed by an interesting question
-            2. Provide a clear, concise answer (2-3 sentences max)
-            3. Focus on practical cloud services, DevOps, security, and data protection insights
-            4. Make it relevant to user's learning context
-            5. Keep it brief but resourceful - users should be attracted, not overwhelmed
-            6. Include a credible source link if possible (optional)
-            
-            Format:
-            **Did you know?** [Engaging question about the topic]
-            
-            [Brief, practical answer with real-world relevance]
+            prompt = _CREATIVE_POST_PROMPT.format_map({
+                "topic": topic,
+                "ltm_summary": ltm_summary,
+                "thread_context": thread_context
+            })
             
-            💡 **Key Takeaway:** [One actionable insight]
-            
-            [Optional: 📚 **Source:** [Credible link or reference]]
-            
-            Focus Areas:
-            - Build on their previous learning context
-            - Avoid repeating recent Smart Thread topics  
-            - Provide immediately applicable knowledge
-            - Connect to practical cloud/security scenarios
-            """
-            
-            response = await self.client.chat.completions.create(
+            # Through the agent's breaker, so a failing OpenAI endpoint is skipped instead of retried on every trigger
+            response = await self.circuit_breaker.acall(
+                self.client.chat.completions.create,
                 model=settings.openai_model,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=400,
@@ -144,31 +159,43 @@ class EducationalContentAgent:
         Returns:
             True if posting successful, False otherwise
         """
+        # SQLAlchemy sessions are synchronous, so run the round-trips off the event loop
+        return await asyncio.to_thread(self._post_to_smart_learner_thread_sync, user_id, content, db)
+
+    def _post_to_smart_learner_thread_sync(self, user_id: str, content: str, db: Session) -> bool:
+        """Blocking body of post_to_smart_learner_thread"""
         try:
-            # Find or create SMART_LEARNER thread for user
-            smart_learner_thread = db.query(ChatThread).filter(
-                ChatThread.user_id == user_id,
-                ChatThread.thread_type == ThreadType.SMART_LEARNER
-            ).first()
+            now = datetime.now(timezone.utc)
+            
+            # Touch the user's SMART_LEARNER thread and get its id in one statement
+            thread_id = db.execute(
+                update(ChatThread)
+                .where(
+                    ChatThread.user_id == user_id,
+                    ChatThread.thread_type == ThreadType.SMART_LEARNER
+                )
+                .values(last_modified=now)
+                .returning(ChatThread.id)
+            ).scalars().first()
             
-            if not smart_learner_thread:
-                # Create SMART_LEARNER thread
-                smart_learner_thread = ChatThread(
-                    id=uuid.uuid4(),
+            if thread_id is None:
+                # Create SMART_LEARNER thread; ids are generated here so it is inserted with the message on commit
+                thread_id = uuid.uuid4()
+                db.add(ChatThread(
+                    id=thread_id,
                     user_id=user_id,
                     name="Smart Learner - Educational Content",
                     thread_type=ThreadType.SMART_LEARNER,
                     language="ENG",
-                    is_permanent=True
-                )
-                db.add(smart_learner_thread)
-                db.flush()  # Ensure thread ID is available
+                    is_permanent=True,
+                    last_modified=now
+                ))
                 print(f"[EducationalAgent] Created SMART_LEARNER thread for user: {user_id}")
             
             # Create educational message
             educational_message = Message(
                 id=uuid.uuid4(),
-                thread_id=smart_learner_thread.id,
+                thread_id=thread_id,
                 user_id=user_id,
                 author=MessageAuthor.ASSISTANT,
                 content=f"{content}\n\n---\n*🎓 Generated based on your learning journey to expand your cloud and security knowledge.*"
@@ -176,11 +203,8 @@ class EducationalContentAgent:
             
             db.add(educational_message)
             
-            # Update thread's last_modified
-            smart_learner_thread.last_modified = datetime.now(timezone.utc)
-            
             db.commit()
-            print(f"[EducationalAgent] Posted educational content to SMART_LEARNER thread: {smart_learner_thread.id}")
+            print(f"[EducationalAgent] Posted educational content to SMART_LEARNER thread: {thread_id}")
             return True
             
         except Exception as e:
@@ -190,31 +214,33 @@ class EducationalContentAgent:
 
     async def get_smart_thread_history(self, user_id: str, db) -> List[Dict[str, Any]]:
         """Get recent messages from Smart Learner thread for context"""
+        return await asyncio.to_thread(self._get_smart_thread_history_sync, user_id, db)
+
+    def _get_smart_thread_history_sync(self, user_id: str, db: Session) -> List[Dict[str, Any]]:
+        """Blocking body of get_smart_thread_history"""
         try:
-            # Find Smart Learner thread
-            smart_thread = db.query(ChatThread).filter(
-                ChatThread.user_id == user_id,
-                ChatThread.thread_type == ThreadType.SMART_LEARNER
-            ).first()
-            
-            if not smart_thread:
-                return []
-            
-            # Get recent messages
-            messages = db.query(Message).filter(
-                Message.thread_id == smart_thread.id
-            ).order_by(Message.created_at.desc()).limit(5).all()
-            
-            # Convert to dict format
-            history = []
-            for msg in reversed(messages):  # Reverse to get chronological order
-                history.append({
-                    "role": msg.author.value,
-                    "content": msg.content,
-                    "created_at": msg.created_at
-                })
+            # Latest messages of the Smart Learner thread, only the columns the prompt uses;
+            # content is cut to the prompt's 400-character excerpt in the database
+            rows = db.execute(
+                select(
+                    Message.author,
+                    func.substr(Message.content, 1, _HISTORY_EXCERPT_CHARS).label("content"),
+                    Message.timestamp
+                )
+                .join(ChatThread, Message.thread_id == ChatThread.id)
+                .where(
+                    ChatThread.user_id == user_id,
+                    ChatThread.thread_type == ThreadType.SMART_LEARNER
+                )
+                .order_by(Message.timestamp.desc())
+                .limit(5)
+            ).all()
             
-            return history
+            # Convert to dict format, reversed to get chronological order
+            return [
+                {"role": row.author.value, "content": row.content, "created_at": row.timestamp}
+                for row in reversed(rows)
+            ]
             
         except Exception as e:
             print(f"[EducationalAgent] Error getting smart thread history: {e}")
@@ -243,7 +269,7 @@ class EducationalContentAgent:
             print(f"[EducationalAgent] Processing educational trigger for user: {user_id}")
             
             # Create educational content only for general or followup questions
-            if response_type not in ["general", "followup"]:
+            if response_type not in _EDUCATIONAL_RESPONSE_TYPES:
                 print(f"[EducationalAgent] Response type '{response_type}' not eligible for educational post, skipping")
                 return
             
@@ -255,31 +281,30 @@ class EducationalContentAgent:
                 "memory_context": memory_context or {}
             }
             
-            # Get smart thread history and generate content using a database session
+            # Separate short-lived sessions around the OpenAI call so no pooled
+            # connection is held while the post is being generated
             from app.database.database import SessionLocal
-            db = SessionLocal()
-            try:
-                # Get Smart Thread history for context
+            
+            # Get Smart Thread history for context
+            with SessionLocal() as db:
                 smart_thread_history = await self.get_smart_thread_history(user_id, db)
-                
-                # Generate creative educational content
-                content = await self.generate_creative_educational_post(
-                    user_context, smart_thread_history
-                )
-                
-                if not content:
-                    print("[EducationalAgent] Failed to generate creative educational content")
-                    return
-                
-                # Post to Smart Learner thread
+            
+            # Generate creative educational content
+            content = await self.generate_creative_educational_post(
+                user_context, smart_thread_history
+            )
+            
+            if not content:
+                print("[EducationalAgent] Failed to generate creative educational content")
+                return
+            
+            # Post to Smart Learner thread
+            with SessionLocal() as db:
                 success = await self.post_to_smart_learner_thread(user_id, content, db)
-                if success:
-                    print(f"[EducationalAgent] Successfully posted creative content for user: {user_id}")
-                else:
-                    print(f"[EducationalAgent] Failed to post creative content for user: {user_id}")
-                    
-            finally:
-                db.close()
+            if success:
+                print(f"[EducationalAgent] Successfully posted creative content for user: {user_id}")
+            else:
+                print(f"[EducationalAgent] Failed to post creative content for user: {user_id}")
                 
         except Exception as e:
             print(f"[EducationalAgent] Error in educational trigger processing: {e}")
@@ -287,10 +312,14 @@ class EducationalContentAgent:
 
 # Global instance for singleton pattern
 _educational_agent_instance = None
+_educational_agent_lock = threading.Lock()
 
 def get_educational_agent() -> EducationalContentAgent:
     """Get or create the global educational agent instance"""
     global _educational_agent_instance
-    if _educational_agent_instance is None:
-        _educational_agent_instance = EducationalContentAgent()
+    if _educational_agent_instance is not None:
+        return _educational_agent_instance
+    with _educational_agent_lock:
+        if _educational_agent_instance is None:
+            _educational_agent_instance = EducationalContentAgent()
     return _educational_agent_instance
\ No newline at end of file
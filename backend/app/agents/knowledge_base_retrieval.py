@@ -6,18 +6,118 @@ Integrates the provided LIGHTRAG retrieval functionality into the multi-agent sy
 import os
 import asyncio
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
 
+import numpy as np
 from lightrag import LightRAG, QueryParam
 from lightrag.llm.openai import gpt_4o_mini_complete, openai_embed
-from lightrag.utils import setup_logger
+from lightrag.utils import EmbeddingFunc, setup_logger
 
 from app.core.config import settings
+from .clients import openai_client
+from .response_cache import TTLCache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Shared by every request so concurrent users cannot multiply the fan-out past the provider's limits
+_query_semaphore = asyncio.Semaphore(settings.kb_concurrency)
+
+
+def _export_credentials():
+    """Expose the centralized credentials through the environment variables LightRAG's storages read"""
+    for name, value in (
+        ("NEO4J_URI", settings.neo4j_uri),
+        ("NEO4J_USERNAME", settings.neo4j_username),
+        ("NEO4J_PASSWORD", settings.neo4j_password),
+        ("OPENAI_API_KEY", settings.openai_api_key),
+    ):
+        if value:
+            os.environ[name] = value
+
+
+# Settings are fixed for the life of the process, so this only needs doing once
+_export_credentials()
+
+# openai_embed's default model, which the stored vector index was built with
+_KB_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+async def _shared_client_embed(texts: List[str], **kwargs) -> np.ndarray:
+    """Embed texts through the process-wide OpenAI client so KB lookups reuse its connection pool"""
+    if kwargs:
+        return await openai_embed(texts, **kwargs)
+    response = await openai_client.embeddings.create(
+        model=_KB_EMBEDDING_MODEL, input=texts, encoding_format="float"
+    )
+    return np.array([item.embedding for item in response.data])
+
+
+def _normalize_question(text: str) -> str:
+    """Case- and whitespace-insensitive key for a knowledge base question"""
+    return " ".join(text.split()).lower()
+
+
+class CoalescingEmbedder:
+    """
+    Merges embedding requests issued within a short window into one API call.
+    Parallel sub-question queries each embed their own keywords, so batching
+    them turns N embedding round-trips into one.
+    """
+
+    def __init__(self, embed, window: float = 0.005):
+        self._embed = embed
+        self._window = window
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        # Vectors embedded ahead of time by prime(), served without another request
+        self._primed = TTLCache(maxsize=256, ttl=300)
+
+    async def prime(self, texts: List[str]):
+        """Embed a batch of texts in one request so later single-text calls for them are free"""
+        missing = [text for text in texts if self._primed.get(text) is None]
+        if not missing:
+            return
+        vectors = await self._embed(missing)
+        for text, vector in zip(missing, vectors):
+            self._primed.set(text, vector)
+
+    async def __call__(self, texts: List[str], **kwargs) -> np.ndarray:
+        if kwargs:
+            return await self._embed(texts, **kwargs)
+
+        primed = [self._primed.get(text) for text in texts]
+        if primed and all(vector is not None for vector in primed):
+            return np.vstack(primed)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((list(texts), future))
+        if self._flush_task is None:
+            self._flush_task = loop.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self._window)
+        pending, self._pending, self._flush_task = self._pending, [], None
+
+        try:
+            vectors = await self._embed([text for texts, _ in pending for text in texts])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Hand each caller back its own rows, in the order it asked
+        offset = 0
+        for texts, future in pending:
+            if not future.done():
+                future.set_result(vectors[offset:offset + len(texts)])
+            offset += len(texts)
+
+
 class KnowledgeBaseRetriever:
     """
     Connects to the LightRAG knowledge base and retrieves answers.
@@ -26,7 +126,12 @@ class KnowledgeBaseRetriever:
 
     def __init__(self):
         self.rag: Optional[LightRAG] = None
+        self.embedder: Optional[CoalescingEmbedder] = None
         self.initialized = False
+        # Queries currently running, keyed by normalized text, shared by concurrent askers
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Recent successful answers, keyed by normalized text
+        self._answers = TTLCache(maxsize=512, ttl=settings.kb_answer_cache_ttl)
         logger.info(f"[KnowledgeBaseRetriever] Initialized with working directory: {settings.lightrag_working_dir}")
 
     async def initialize(self) -> bool:
@@ -34,23 +139,18 @@ class KnowledgeBaseRetriever:
         Initializes the LightRAG instance for retrieval using centralized settings.
         """
         try:
-            # Set environment variables from centralized settings
-            if settings.neo4j_uri:
-                os.environ["NEO4J_URI"] = settings.neo4j_uri
-            if settings.neo4j_username:
-                os.environ["NEO4J_USERNAME"] = settings.neo4j_username
-            if settings.neo4j_password:
-                os.environ["NEO4J_PASSWORD"] = settings.neo4j_password
-            if settings.openai_api_key:
-                os.environ["OPENAI_API_KEY"] = settings.openai_api_key
-
             logger.info(f"[KnowledgeBaseRetriever] Initializing with working directory: {settings.lightrag_working_dir}")
 
             # Initialize LightRAG with centralized configuration
+            self.embedder = CoalescingEmbedder(_shared_client_embed if openai_client is not None else openai_embed)
             self.rag = LightRAG(
                 working_dir=str(settings.lightrag_working_dir),
                 llm_model_func=gpt_4o_mini_complete,
-                embedding_func=openai_embed,
+                embedding_func=EmbeddingFunc(
+                    embedding_dim=openai_embed.embedding_dim,
+                    max_token_size=openai_embed.max_token_size,
+                    func=self.embedder
+                ),
                 graph_storage="Neo4JStorage",
                 vector_storage="FaissVectorDBStorage",
             )
@@ -69,6 +169,8 @@ class KnowledgeBaseRetriever:
     async def query(self, query_text: str) -> Optional[str]:
         """
         Queries the knowledge base with a specific question and returns the final answer.
+        Concurrent requests for the same question (e.g. from different users) share one query,
+        and successful answers are reused for repeats within the answer cache window.
 
         Args:
             query_text: The question to ask.
@@ -76,6 +178,30 @@ class KnowledgeBaseRetriever:
         Returns:
             The generated answer as a string, or None if an error occurs.
         """
+        key = _normalize_question(query_text)
+        answer = self._answers.get(key)
+        if answer is not None:
+            logger.info(f"[KnowledgeBaseRetriever] Answer cache hit: '{query_text}'")
+            return answer
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._query(query_text))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_query(key, done))
+        else:
+            logger.info(f"[KnowledgeBaseRetriever] Joining in-flight query: '{query_text}'")
+        # Shielded so one caller giving up does not cancel the query for the others
+        return await asyncio.shield(task)
+
+    def _finish_query(self, key: str, task: asyncio.Task):
+        """Release the in-flight slot and remember a successful answer"""
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None and task.result():
+            self._answers.set(key, task.result())
+
+    async def _query(self, query_text: str) -> Optional[str]:
+        """Run a single LightRAG query"""
         if not self.initialized or not self.rag:
             logger.error("[KnowledgeBaseRetriever] Not initialized. Call initialize() first.")
             return None
@@ -91,8 +217,9 @@ class KnowledgeBaseRetriever:
                 response_type="Single Paragraph"  # Keep the answer concise
             )
 
-            # Execute the query
-            response = await self.rag.aquery(query_text, param=param)
+            # Execute the query, bounded by the process-wide query limit
+            async with _query_semaphore:
+                response = await self.rag.aquery(query_text, param=param)
 
             if response:
                 logger.info("[KnowledgeBaseRetriever] Query successful.")
@@ -125,57 +252,20 @@ class KnowledgeBaseRetriever:
 
         logger.info(f"[KnowledgeBaseRetriever] Processing {len(questions)} questions in parallel")
 
-        async def query_single(question: str) -> Dict[str, Any]:
-            """Process a single question and return structured result"""
-            try:
-                answer = await self.query(question)
-                return {
-                    "question": question,
-                    "answer": answer,
-                    "success": answer is not None,
-                    "source": "knowledge_base",
-                    "metadata": {
-                        "query_mode": "mix",
-                        "top_k": 10
-                    }
-                }
-            except Exception as e:
-                logger.error(f"[KnowledgeBaseRetriever] Error processing question '{question}': {e}")
-                return {
-                    "question": question,
-                    "answer": None,
-                    "success": False,
-                    "source": "knowledge_base",
-                    "error": str(e)
-                }
-
-        # Process all questions in parallel with reasonable concurrency limit
-        semaphore = asyncio.Semaphore(3)  # Limit to 3 concurrent queries
-        
-        async def query_with_semaphore(question: str) -> Dict[str, Any]:
-            async with semaphore:
-                return await query_single(question)
+        # Overlapping sub-questions are asked once; every duplicate gets a copy of that result
+        keys = [_normalize_question(q) for q in questions]
+        unique = await self._prepare_batch(keys, questions)
 
+        # Process all questions in parallel; the LightRAG calls themselves share the process-wide query limit
         try:
-            results = await asyncio.gather(
-                *[query_with_semaphore(q) for q in questions],
-                return_exceptions=True
-            )
+            # _query_result turns every error into a failed result, so only cancellation escapes
+            results = await asyncio.gather(*[self._query_result(q) for q in unique.values()])
             
-            # Process results and handle exceptions
-            processed_results = []
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"[KnowledgeBaseRetriever] Exception for question {i}: {result}")
-                    processed_results.append({
-                        "question": questions[i],
-                        "answer": None,
-                        "success": False,
-                        "source": "knowledge_base",
-                        "error": str(result)
-                    })
-                else:
-                    processed_results.append(result)
+            by_key = dict(zip(unique, results))
+            processed_results = [
+                by_key[key] if by_key[key]["question"] == question else {**by_key[key], "question": question}
+                for key, question in zip(keys, questions)
+            ]
             
             successful_queries = sum(1 for r in processed_results if r["success"])
             logger.info(f"[KnowledgeBaseRetriever] Completed {successful_queries}/{len(questions)} queries successfully")
@@ -186,6 +276,45 @@ class KnowledgeBaseRetriever:
             logger.error(f"[KnowledgeBaseRetriever] Error in parallel query processing: {e}")
             return []
     
+    async def _prepare_batch(self, keys: List[str], questions: List[str]) -> Dict[str, str]:
+        """Fold duplicate questions and pre-embed the distinct ones; returns normalized key -> first wording"""
+        unique: Dict[str, str] = {}
+        for key, question in zip(keys, questions):
+            unique.setdefault(key, question)
+        if len(unique) < len(questions):
+            logger.info(f"[KnowledgeBaseRetriever] {len(questions) - len(unique)} duplicate questions folded")
+
+        # Embed every question in one request up front; each query's own vector search then reuses it
+        try:
+            await self.embedder.prime(list(unique.values()))
+        except Exception as e:
+            logger.warning(f"[KnowledgeBaseRetriever] Batch question embedding failed, embedding per query: {e}")
+        return unique
+
+    async def _query_result(self, question: str) -> Dict[str, Any]:
+        """Process a single question and return structured result"""
+        try:
+            answer = await self.query(question)
+            return {
+                "question": question,
+                "answer": answer,
+                "success": answer is not None,
+                "source": "knowledge_base",
+                "metadata": {
+                    "query_mode": "mix",
+                    "top_k": 10
+                }
+            }
+        except Exception as e:
+            logger.error(f"[KnowledgeBaseRetriever] Error processing question '{question}': {e}")
+            return {
+                "question": question,
+                "answer": None,
+                "success": False,
+                "source": "knowledge_base",
+                "error": str(e)
+            }
+    
     async def finalize(self):
         """Properly close the retriever and storage connections"""
         if self.rag and self.initialized:
@@ -202,14 +331,22 @@ class KnowledgeBaseRetriever:
 
 # Global instance for the agents to use
 _retriever_instance: Optional[KnowledgeBaseRetriever] = None
+# Serializes first-time creation so concurrent callers never open the storages twice
+_retriever_init_lock = asyncio.Lock()
 
 async def get_knowledge_base_retriever() -> KnowledgeBaseRetriever:
     """Get or create the global knowledge base retriever instance"""
     global _retriever_instance
     
-    if _retriever_instance is None:
-        _retriever_instance = KnowledgeBaseRetriever()
-        await _retriever_instance.initialize()
+    if _retriever_instance is not None:
+        return _retriever_instance
+    
+    async with _retriever_init_lock:
+        if _retriever_instance is None:
+            retriever = KnowledgeBaseRetriever()
+            await retriever.initialize()
+            # Published only once initialized, so the lock-free fast path never sees a half-built instance
+            _retriever_instance = retriever
     
     return _retriever_instance
 
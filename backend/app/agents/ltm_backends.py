@@ -0,0 +1,127 @@
+"""
+Long-Term Memory Vector Backends
+
+Storage backends behind LongTermMemory. Both take precomputed embeddings, so
+the OpenAI embedding calls stay in LongTermMemory and are shared by either
+backend:
+- ChromaBackend: the existing persistent Chroma collection
+- FaissFlatBackend: exact inner-product search over an in-process FAISS flat
+  index, faster than HNSW traversal at the size of a per-user entity store
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Protocol, Tuple
+
+import faiss
+import numpy as np
+
+
+class VectorBackend(Protocol):
+    """Blocking vector store interface; LongTermMemory calls it from worker threads"""
+
+    def count(self) -> int:
+        ...
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]):
+        ...
+
+    def search(self, embedding: List[float], k: int, user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        ...
+
+
+class ChromaBackend:
+    """Chroma collection accessed with precomputed embeddings"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def count(self) -> int:
+        return self.db._collection.count()
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]):
+        self.db._collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def search(self, embedding: List[float], k: int, user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        results = self.db.similarity_search_by_vector(embedding, k=k, filter={"user_id": user_id})
+        return [(doc.page_content, doc.metadata) for doc in results]
+
+
+class FaissFlatBackend:
+    """
+    Exact cosine search over a FAISS IndexFlatIP, with documents and metadata
+    kept in arrays parallel to the index rows. Persisted next to the index as
+    JSON after every write, since LTM writes are infrequent.
+    """
+
+    # Extra candidates fetched per requested result before filtering by user
+    _OVERFETCH = 4
+
+    def __init__(self, persist_directory: str):
+        self._index_path = os.path.join(persist_directory, "ltm.faiss")
+        self._meta_path = os.path.join(persist_directory, "ltm_meta.json")
+        self._lock = threading.Lock()
+        self.index: Optional[faiss.IndexFlatIP] = None
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.user_ids = np.empty(0, dtype=object)
+
+        os.makedirs(persist_directory, exist_ok=True)
+        if os.path.exists(self._index_path) and os.path.exists(self._meta_path):
+            self.index = faiss.read_index(self._index_path)
+            with open(self._meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.ids, self.documents, self.metadatas = meta["ids"], meta["documents"], meta["metadatas"]
+            self.user_ids = np.array([m.get("user_id") for m in self.metadatas], dtype=object)
+
+    @staticmethod
+    def _normalized(vectors: List[List[float]]) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def count(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]):
+        # LTM ids are unique per write, so an upsert is always an append here
+        vectors = self._normalized(embeddings)
+        with self._lock:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(vectors.shape[1])
+            self.index.add(vectors)
+            self.ids.extend(ids)
+            self.documents.extend(documents)
+            self.metadatas.extend(metadatas)
+            self.user_ids = np.concatenate([self.user_ids, np.array([m.get("user_id") for m in metadatas], dtype=object)])
+            self._persist()
+
+    def search(self, embedding: List[float], k: int, user_id: str) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            total = self.count()
+            if not total:
+                return []
+            query = self._normalized([embedding])
+            fetch = min(total, k * self._OVERFETCH)
+            while True:
+                _, rows = self.index.search(query, fetch)
+                rows = rows[0][rows[0] >= 0]
+                mine = rows[self.user_ids[rows] == user_id][:k]
+                # Widen to the whole index when other users' entries crowded this user out
+                if len(mine) == k or fetch == total:
+                    break
+                fetch = total
+            return [(self.documents[row], self.metadatas[row]) for row in mine]
+
+    def _persist(self):
+        faiss.write_index(self.index, self._index_path)
+        tmp_path = self._meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path)
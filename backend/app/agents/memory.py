@@ -10,15 +10,173 @@ Implements dual-layer memory:
 import os
 import asyncio
 import logging
+import logging.handlers
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Tuple, Any
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+import tiktoken
 from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
 from app.core.config import settings
 from .models import LTMEntity, LTMEntityList
+from .clients import openai_chat
+from .ltm_backends import ChromaBackend, FaissFlatBackend
+from .response_cache import TTLCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+def _load_tokenizer():
+    """Tokenizer of the configured OpenAI model, cl100k_base if unknown, None if tiktoken has no encodings"""
+    try:
+        return tiktoken.encoding_for_model(settings.openai_model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            logger.warning("[STM] Warning: Could not load a tokenizer, estimating tokens from length")
+            return None
+
+
+_TOKENIZER = _load_tokenizer()
+
+_SUMMARY_PROMPT = ChatPromptTemplate.from_template("""
+You are summarizing conversation history for a cloud and security AI assistant. 
+Create a concise summary that preserves the most important technical information.
+
+CONVERSATION TO SUMMARIZE:
+{messages}
+
+INSTRUCTIONS:
+- Focus on technical details, configurations, and specific solutions
+- Preserve cloud service names, error messages, and troubleshooting steps
+- Include important user preferences and decisions
+- Maintain security-related discussions and concerns
+- Keep code snippets and command examples if mentioned
+- Ignore pleasantries and non-technical conversation
+- Maximum length: 1500 tokens
+- Format as a coherent paragraph summary
+
+SUMMARY:""")
+
+# Stable instructions and the prior summary lead, so consecutive folds of a thread share a prompt prefix
+_FOLD_SUMMARY_PROMPT = ChatPromptTemplate.from_template("""
+You are maintaining a running summary of a conversation for a cloud and security AI assistant.
+Keep technical details, cloud service names, error messages, troubleshooting steps, user
+decisions and security concerns; drop pleasantries. Maximum length: 1500 tokens.
+
+Previous summary: {prev}
+
+New messages to fold in:
+{new}
+
+Return updated concise summary:""")
+
+_SUMMARY_UNAVAILABLE = "Failed to summarize messages - OpenAI API error"
+
+_summary_chain = None
+_fold_summary_chain = None
+_ltm_embeddings = None
+_client_lock = threading.Lock()
+
+
+def _get_summary_chain():
+    """Summarization chain over the shared chat model, built once on first use"""
+    global _summary_chain
+    if _summary_chain is None:
+        with _client_lock:
+            if _summary_chain is None:
+                _summary_chain = _SUMMARY_PROMPT | openai_chat.bind(
+                    temperature=0.3,  # Lower temperature for consistent summaries
+                    max_tokens=1500  # Enforce 1500 token limit
+                )
+    return _summary_chain
+
+
+def _get_fold_summary_chain():
+    """Chain folding new messages into an existing summary, built once on first use"""
+    global _fold_summary_chain
+    if _fold_summary_chain is None:
+        with _client_lock:
+            if _fold_summary_chain is None:
+                _fold_summary_chain = _FOLD_SUMMARY_PROMPT | openai_chat.bind(
+                    temperature=0.3,
+                    max_tokens=1500
+                )
+    return _fold_summary_chain
+
+
+def _get_ltm_embeddings() -> OpenAIEmbeddings:
+    """Process-wide LTM embedding client, built once on first use"""
+    global _ltm_embeddings
+    if _ltm_embeddings is None:
+        with _client_lock:
+            if _ltm_embeddings is None:
+                _ltm_embeddings = OpenAIEmbeddings(
+                    model="text-embedding-3-large",
+                    api_key=settings.openai_api_key
+                )
+    return _ltm_embeddings
+
+
+# Recent LTM searches keyed by user, memory version and normalized query text, so a repeat skips the embedding call too
+_ltm_query_cache = TTLCache(maxsize=1024, ttl=600)
+
+# Seconds a successful LTM database health check is trusted
+_DB_HEALTH_TTL = 30.0
+
+# Summaries of message prefixes; history messages never change, so the same prefix always summarizes the same
+_summary_cache = TTLCache(maxsize=512, ttl=24 * 3600)
+
+
+@lru_cache(maxsize=4096)
+def _count_tokens(text: str) -> int:
+    """BPE token count of text; history messages repeat every turn, so counts are memoized"""
+    if _TOKENIZER is None:
+        return len(text) // 4
+    return len(_TOKENIZER.encode(text, disallowed_special=()))
+
+
+def _setup_stm_logger():
+    """Shared STM context logger writing to a rotating file; threads are told apart by record fields"""
+    try:
+        log_dir = "logs"
+        os.makedirs(log_dir, exist_ok=True)
+        
+        stm_logger = logging.getLogger("stm_context")
+        if not stm_logger.handlers:  # Avoid duplicate handlers on reload
+            stm_logger.setLevel(logging.INFO)
+            
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, "stm_context.log"),
+                maxBytes=50_000_000,
+                backupCount=5,
+                encoding="utf-8"
+            )
+            formatter = logging.Formatter(
+                "%(asctime)s | USER:%(user)s | THREAD:%(thread_id)s | LANG:%(lang)s | STM_CONTEXT: %(message)s",
+                datefmt="%Y-%m-%d %H:%M:%S"
+            )
+            handler.setFormatter(formatter)
+            stm_logger.addHandler(handler)
+            stm_logger.propagate = False
+        return stm_logger
+    except Exception as e:
+        logger.warning("[STM] Warning: Could not setup STM logger: %s", e)
+        return None
+
+
+_STM_LOGGER = _setup_stm_logger()
+
+# Flattens a context onto one log line in a single pass
+_NEWLINE_TRANS = str.maketrans({"\n": " ", "\r": " "})
 
 
 class ShortTermMemory:
@@ -28,130 +186,124 @@ class ShortTermMemory:
         self.user_id = user_id
         self.thread_id = thread_id
         self.thread_language = thread_language
-        print(f"[STM] Initializing language-aware STM for user {user_id}, thread {thread_id}, language: {thread_language}")
+        # Summary of the first _summarized_upto messages of the thread, extended as messages leave the window
+        self._running_summary: Optional[str] = None
+        self._summarized_upto = 0
+        # The pooled instance is shared by worker threads of concurrent turns; folds for a thread run one at a time
+        self._summary_lock = threading.Lock()
+        logger.debug("[STM] Initializing language-aware STM for user %s, thread %s, language: %s", user_id, thread_id, thread_language)
         
-        # Setup STM context logger
-        self._setup_stm_logger()
-    
-    def _setup_stm_logger(self):
-        """Setup STM context logger for debugging and monitoring"""
-        try:
-            # Create logs directory if it doesn't exist
-            log_dir = "logs"
-            if not os.path.exists(log_dir):
-                os.makedirs(log_dir)
-            
-            # Setup logger
-            self.stm_logger = logging.getLogger(f"stm_context_{self.user_id}_{self.thread_id}")
-            if not self.stm_logger.handlers:  # Avoid duplicate handlers
-                self.stm_logger.setLevel(logging.INFO)
-                
-                # File handler with rotation
-                handler = logging.FileHandler(os.path.join(log_dir, "stm_context.log"), encoding='utf-8')
-                formatter = logging.Formatter('%(asctime)s | %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
-                handler.setFormatter(formatter)
-                self.stm_logger.addHandler(handler)
-                self.stm_logger.propagate = False
-        except Exception as e:
-            print(f"[STM] Warning: Could not setup STM logger: {e}")
-            self.stm_logger = None
+        self.stm_logger = _STM_LOGGER
     
     def _log_stm_context(self, context: str):
         """Log STM context for debugging and monitoring"""
-        if not self.stm_logger:
+        # Skip building the preview when nothing would be written
+        if not self.stm_logger or not self.stm_logger.isEnabledFor(logging.INFO):
             return
         
         try:
-            # Create context preview (first 200 characters)
-            context_preview = context.replace('\n', ' ').replace('\r', ' ')
-            if len(context_preview) > 1000:
-                context_preview = context_preview[:1000] + "..."
+            # Create context preview (first 1000 characters)
+            # The translation keeps lengths, so only the part that is logged gets translated
+            context_preview = context[:1000].translate(_NEWLINE_TRANS)
+            if len(context) > 1000:
+                context_preview = f"{context_preview}..."
             
-            log_message = f"USER:{self.user_id} | THREAD:{self.thread_id} | LANG:{self.thread_language} | STM_CONTEXT: {context_preview}"
-            self.stm_logger.info(log_message)
+            self.stm_logger.info("%s", context_preview,
+                                 extra={"user": self.user_id, "thread_id": self.thread_id, "lang": self.thread_language})
         except Exception as e:
-            print(f"[STM] Warning: Could not log STM context: {e}")
+            logger.warning("[STM] Warning: Could not log STM context: %s", e)
     
     def count_tokens(self, text: str) -> int:
-        """Count tokens in text (rough estimate: 4 chars per token)"""
-        return len(text) // 4
+        """Count tokens in text with the model's tokenizer (4 chars per token if unavailable)"""
+        return _count_tokens(text)
     
-    def _create_openai_summary(self, messages: List[str]) -> str:
+    def _create_openai_summary(self, messages: List[str], previous_summary: Optional[str] = None, position: int = 0) -> Optional[str]:
         """
         Create intelligent summary of messages using OpenAI API
         Focuses on technical details and important information
+        With previous_summary, only the new messages are sent and folded into it
         Token limit: 1500 tokens
+        Returns None when no summary could be produced
         """
         if not messages:
-            return "No messages to summarize"
+            return None
+        
+        # Folds also key on how many messages the previous summary covers, so retries of a turn dedupe
+        if previous_summary is None:
+            cache_key = make_cache_key(*messages)
+        else:
+            cache_key = make_cache_key(previous_summary, position, *messages)
+        cached = _summary_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("[STM] Reusing cached summary")
+            return cached
         
         try:
-            # Initialize OpenAI client for summarization
             if not settings.openai_api_key:
-                print("[STM] No OpenAI API key available")
-                return "No messages to summarize - OpenAI API key not configured"
-            
-            llm = ChatOpenAI(
-                model=settings.openai_model,
-                temperature=0.3,  # Lower temperature for consistent summaries
-                api_key=settings.openai_api_key,
-                max_tokens=1500  # Enforce 1500 token limit
-            )
-            
-            # Create technical summarization prompt
-            prompt = ChatPromptTemplate.from_template("""
-You are summarizing conversation history for a cloud and security AI assistant. 
-Create a concise summary that preserves the most important technical information.
-
-CONVERSATION TO SUMMARIZE:
-{messages}
-
-INSTRUCTIONS:
-- Focus on technical details, configurations, and specific solutions
-- Preserve cloud service names, error messages, and troubleshooting steps
-- Include important user preferences and decisions
-- Maintain security-related discussions and concerns
-- Keep code snippets and command examples if mentioned
-- Ignore pleasantries and non-technical conversation
-- Maximum length: 1500 tokens
-- Format as a coherent paragraph summary
-
-SUMMARY:""")
+                logger.warning("[STM] No OpenAI API key available")
+                return None
             
             # Combine messages into single text
             messages_text = "\n".join(messages)
             
-            # Create the chain and invoke
-            chain = prompt | llm
-            response = chain.invoke({
-                "messages": messages_text
-            })
+            if previous_summary is None:
+                response = _get_summary_chain().invoke({
+                    "messages": messages_text
+                })
+            else:
+                response = _get_fold_summary_chain().invoke({
+                    "prev": previous_summary,
+                    "new": messages_text
+                })
             
             summary = response.content.strip()
+            _summary_cache.set(cache_key, summary)
             return summary
             
         except Exception as e:
-            print(f"[STM] OpenAI summarization failed: {e}")
-            return "Failed to summarize messages - OpenAI API error"
+            logger.error("[STM] OpenAI summarization failed: %s", e)
+            return None
     
+    def _update_running_summary(self, evicted: List[str], first_index: int) -> str:
+        """
+        Fold messages that left the recent window into the thread's running summary
+        evicted are formatted messages starting at position first_index of the thread;
+        only the ones not already covered are sent to the LLM
+        """
+        end = first_index + len(evicted)
+        with self._summary_lock:
+            if self._summarized_upto > end:
+                # History got shorter than what was summarized (messages deleted); start over
+                self._running_summary, self._summarized_upto = None, 0
+            
+            new_messages = evicted[max(self._summarized_upto - first_index, 0):]
+            if new_messages:
+                summary = self._create_openai_summary(new_messages, self._running_summary, self._summarized_upto)
+                if summary is not None:
+                    self._running_summary, self._summarized_upto = summary, end
+            
+            return self._running_summary or _SUMMARY_UNAVAILABLE
     
-    def get_context_from_messages(self, messages: List[Any], translated_history: str = None) -> str:
+    
+    def get_context_from_messages(self, messages: List[Any], translated_history: str = None, total_messages: Optional[int] = None) -> str:
         """
         Get STM context from database messages with language awareness
         For Sinhala threads, uses translated_history if provided
         For English threads, processes messages normally
+        messages may be only the tail of the thread; total_messages is the thread's full length
+        (defaults to len(messages)) so summary folds are tracked by absolute position
         """
         if not messages:
             return "No conversation history available"
         
         # For Sinhala threads, use translated history if available
         if self.thread_language == "SIN" and translated_history:
-            print(f"[STM] Using translated history for Sinhala thread: {len(translated_history)} characters")
+            logger.debug("[STM] Using translated history for Sinhala thread: %s characters", len(translated_history))
             self._log_stm_context(translated_history)
             return translated_history
         
         # For English threads or fallback, process messages normally
-        print(f"[STM] Processing {len(messages)} messages for {self.thread_language} thread")
+        logger.debug("[STM] Processing %s messages for %s thread", len(messages), self.thread_language)
         
         # Get last 6 messages
         last_6_messages = messages[-6:] if len(messages) >= 6 else messages
@@ -178,22 +330,25 @@ SUMMARY:""")
         
         # Check if we exceed 6000 token limit
         if total_tokens > 6000:
-            print(f"[STM] Token limit exceeded ({total_tokens} > 6000), summarizing first 3 messages with OpenAI")
+            logger.debug("[STM] Token limit exceeded (%s > 6000), folding first 3 messages into the running summary", total_tokens)
             
-            # Keep first 3 messages as is, summarize last 3
+            # Keep last 3 messages as is, summarize first 3
             first_3 = formatted_messages[:3]
             last_3 = formatted_messages[3:]
             
-            # Create OpenAI-powered summary of first 3 messages
-            first_3_summary = self._create_openai_summary(first_3)
+            # Extend the thread's summary with whichever of the first 3 it does not cover yet
+            if total_messages is None:
+                total_messages = len(messages)
+            summary = self._update_running_summary(first_3, total_messages - len(formatted_messages))
             
             # Combine summarized history + last 3 messages for short-term memory
-            context_parts = [f"SUMMARY: {first_3_summary}"] + last_3
+            context_parts = [f"SUMMARY: {summary}"] + last_3
             context = "\n".join(context_parts)
             
-            print(f"[STM] Context after summarization: {self.count_tokens(context)} tokens")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("[STM] Context after summarization: %s tokens", self.count_tokens(context))
         else:
-            print(f"[STM] Context within token limit: {total_tokens} tokens")
+            logger.debug("[STM] Context within token limit: %s tokens", total_tokens)
         
         # Log the STM context
         self._log_stm_context(context)
@@ -205,41 +360,42 @@ class LongTermMemory:
     """Manages persistent user knowledge using vector database"""
     
     def __init__(self, persist_directory=None):
-        self.persist_directory = persist_directory or settings.vector_db_path
-        print(f"[LTM] Initializing LongTermMemory with path: {self.persist_directory}")
+        default_directory = settings.ltm_faiss_path if settings.ltm_backend == "faiss" else settings.vector_db_path
+        self.persist_directory = persist_directory or default_directory
+        self._last_healthy_at = float("-inf")
+        # Bumped whenever a user's memories are written; keys the query cache and downstream response caches
+        self._versions: Dict[str, int] = {}
+        logger.debug("[LTM] Initializing LongTermMemory with path: %s", self.persist_directory)
         
         # Initialize components
         if settings.openai_api_key:
-            self.embedding_model = OpenAIEmbeddings(
-                model="text-embedding-3-large",
-                api_key=settings.openai_api_key
-            )
-            self.llm = ChatOpenAI(
-                model=settings.openai_model, 
-                temperature=0.5,
-                api_key=settings.openai_api_key
-            )
+            self.embedding_model = _get_ltm_embeddings()
+            self.llm = openai_chat.bind(temperature=0.5)
             
-            # Initialize Chroma vector store
+            # Initialize the configured vector store
             try:
-                self.db = Chroma(
-                    collection_name="ltm_store",
-                    embedding_function=self.embedding_model,
-                    persist_directory=self.persist_directory
-                )
-                print("[LTM] ChromaDB initialized successfully")
+                if settings.ltm_backend == "faiss":
+                    self.db = FaissFlatBackend(self.persist_directory)
+                    logger.debug("[LTM] FAISS flat index initialized successfully (%s entries)", self.db.count())
+                else:
+                    self.db = ChromaBackend(Chroma(
+                        collection_name="ltm_store",
+                        embedding_function=self.embedding_model,
+                        persist_directory=self.persist_directory
+                    ))
+                    logger.debug("[LTM] ChromaDB initialized successfully")
             except Exception as e:
-                print(f"[LTM] Error initializing ChromaDB: {e}")
+                logger.error("[LTM] Error initializing %s vector store: %s", settings.ltm_backend, e)
                 self.db = None
         else:
-            print("[LTM] Warning: No OpenAI API key, LTM disabled")
+            logger.warning("[LTM] Warning: No OpenAI API key, LTM disabled")
             self.embedding_model = None
             self.llm = None
             self.db = None
     
     async def extract_entities(self, context: str) -> List[Dict]:
         """Use LLM to extract memory entities"""
-        print(f"[LTM] Extracting entities from context: {len(context)} characters")
+        logger.debug("[LTM] Extracting entities from context: %s characters", len(context))
         parser = PydanticOutputParser(pydantic_object=LTMEntityList)
         
         prompt = ChatPromptTemplate.from_template("""
@@ -277,7 +433,7 @@ class LongTermMemory:
                 # Result is dict with entities key
                 entity_objects = result['entities']
             else:
-                print(f"[LTM] Unexpected result structure: {type(result)}")
+                logger.warning("[LTM] Unexpected result structure: %s", type(result))
                 return []
             
             # Convert entities to dictionaries
@@ -289,10 +445,10 @@ class LongTermMemory:
                     # Convert Pydantic object to dict
                     entities.append(entity.dict() if hasattr(entity, 'dict') else entity.__dict__)
             
-            print(f"[LTM] Extracted {len(entities)} entities")
+            logger.debug("[LTM] Extracted %s entities", len(entities))
             return entities
         except Exception as e:
-            print(f"[LTM] Entity extraction error: {e}")
+            logger.error("[LTM] Entity extraction error: %s", e)
             return []
     
     async def _test_db_connection(self) -> bool:
@@ -300,56 +456,67 @@ class LongTermMemory:
         if not self.db:
             return False
         try:
-            # Try a simple operation to test connection
-            await asyncio.to_thread(
-                self.db.similarity_search,
-                query="test",
-                k=1
-            )
+            # Counting is a metadata lookup, unlike a similarity search which embeds and runs an ANN query
+            await asyncio.to_thread(self.db.count)
             return True
         except Exception as e:
-            print(f"[LTM] Database connection test failed: {e}")
+            logger.error("[LTM] Database connection test failed: %s", e)
             return False
     
     async def _ensure_db_health(self) -> bool:
         """Ensure database is healthy before operations"""
         if not self.db:
-            print("[LTM] No database available")
+            logger.warning("[LTM] No database available")
             return False
         
+        # A recent successful check covers this operation; failures are always rechecked
+        if time.monotonic() - self._last_healthy_at < _DB_HEALTH_TTL:
+            return True
+        
         try:
             # Quick health check with timeout
             is_healthy = await asyncio.wait_for(
                 self._test_db_connection(),
-                timeout=5.0
+                timeout=2.0
             )
-            if not is_healthy:
-                print("[LTM] Database health check failed")
+            if is_healthy:
+                self._last_healthy_at = time.monotonic()
+            else:
+                logger.error("[LTM] Database health check failed")
             return is_healthy
         except asyncio.TimeoutError:
-            print("[LTM] Database health check timed out")
+            logger.warning("[LTM] Database health check timed out")
             return False
         except Exception as e:
-            print(f"[LTM] Database health check error: {e}")
+            logger.error("[LTM] Database health check error: %s", e)
             return False
     
+    def memory_version(self, user_id: str) -> str:
+        """Opaque token that changes whenever the user's memories change"""
+        return str(self._versions.get(user_id, 0))
+    
     async def update_memory(self, user_id: str, thread_id: str, entities: List[Dict]):
         """Store entities in vector DB with metadata"""
         if not entities:
-            print("[LTM] No entities to update")
+            logger.debug("[LTM] No entities to update")
             return
         
         # Check database health before attempting update
         if not await self._ensure_db_health():
-            print("[LTM] Skipping memory update - database not healthy")
+            logger.warning("[LTM] Skipping memory update - database not healthy")
             return
             
-        print(f"[LTM] Updating memory with {len(entities)} entities for user {user_id}")
+        logger.debug("[LTM] Updating memory with %s entities for user %s", len(entities), user_id)
         
         documents = []
         metadatas = []
         ids = []
         
+        # One clock read per batch; the random suffix keeps ids unique across concurrent writes
+        now = datetime.now()
+        now_iso = now.isoformat()
+        base_id = f"{user_id}-{thread_id}-{now.timestamp()}-{uuid.uuid4().hex[:8]}"
+        
         for i, entity in enumerate(entities):
             documents.append(entity["content"])
             metadatas.append({
@@ -357,71 +524,106 @@ class LongTermMemory:
                 "thread_id": thread_id,
                 "type": entity["entity_type"],
                 "confidence": entity["confidence"],
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso,
                 "source": entity["source_context"][:100]
             })
-            ids.append(f"{user_id}-{thread_id}-{datetime.now().timestamp()}-{i}")
+            ids.append(f"{base_id}-{i}")
         
         try:
-            # Run blocking operation in thread pool
-            await asyncio.to_thread(
-                self.db.add_texts,
-                texts=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
-            print(f"[LTM] Successfully stored {len(documents)} entities")
+            # Embed every entity in one async request, then write the precomputed vectors
+            # straight to the store (the blocking write runs in the thread pool)
+            embeddings = await self.embedding_model.aembed_documents(documents)
+            try:
+                await asyncio.to_thread(
+                    self.db.upsert,
+                    ids=ids,
+                    embeddings=embeddings,
+                    documents=documents,
+                    metadatas=metadatas
+                )
+            finally:
+                # Even a cancelled or failed write may have landed, so treat the memory as changed
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            logger.debug("[LTM] Successfully stored %s entities", len(documents))
         except Exception as e:
-            print(f"[LTM] Memory update error: {e}")
+            logger.error("[LTM] Memory update error: %s", e)
     
     async def retrieve_memory(self, user_id: str, thread_id: str, query: str, k=5) -> List[Tuple]:
         """Retrieve relevant memories with similarity search"""
         # Check database health before attempting retrieval
         if not await self._ensure_db_health():
-            print("[LTM] Skipping memory retrieval - database not healthy")
+            logger.warning("[LTM] Skipping memory retrieval - database not healthy")
             return []
             
-        print(f"[LTM] Retrieving memories for user {user_id}, query: {query[:50]}...")
+        logger.debug("[LTM] Retrieving memories for user %s, query: %s...", user_id, query[:50])
+        
+        # The same query against unchanged memories returns the same results without embedding or searching
+        cache_key = make_cache_key(user_id, self.memory_version(user_id), " ".join(query.split()).lower())
+        cached = _ltm_query_cache.get(cache_key)
+        if cached is not None and cached[0] >= k:
+            logger.debug("[LTM] Reusing memories of a recent identical query")
+            return cached[1][:k]
         
         try:
-            # Run blocking operation in thread pool
-            results = await asyncio.to_thread(
-                self.db.similarity_search,
-                query=query,
-                k=k,
-                filter={"user_id": user_id}
-            )
-            memories = [(doc.page_content, doc.metadata) for doc in results]
-            print(f"[LTM] Retrieved {len(memories)} relevant memories")
+            # Embed asynchronously, then run the blocking search in the thread pool
+            embedding = await self.embedding_model.aembed_query(query)
+            memories = await asyncio.to_thread(self.db.search, embedding, k, user_id)
+            _ltm_query_cache.set(cache_key, (k, memories))
+            logger.debug("[LTM] Retrieved %s relevant memories", len(memories))
             return memories
         except Exception as e:
-            print(f"[LTM] Memory retrieval error: {e}")
+            logger.error("[LTM] Memory retrieval error: %s", e)
             return []
 
 
+# Threads whose ShortTermMemory instances are kept between turns
+_STM_POOL_SIZE = 1024
+
+
 class MemoryManager:
     """Simplified memory management system"""
     
     def __init__(self):
-        print("[MemoryManager] Initializing simplified memory management system")
+        logger.debug("[MemoryManager] Initializing simplified memory management system")
         self.ltm = LongTermMemory()
         self.message_counters: Dict[str, int] = {}  # Track message count per user
         self.ltm_update_interval = 20  # Update LTM every 20 messages
-        print(f"[MemoryManager] LTM update interval: {self.ltm_update_interval} messages")
+        # STM instances reused across turns, least recently used first
+        self._stm_pool: "OrderedDict[Tuple[str, str], ShortTermMemory]" = OrderedDict()
+        self._stm_pool_lock = threading.Lock()
+        logger.debug("[MemoryManager] LTM update interval: %s messages", self.ltm_update_interval)
     
-    def get_stm_context(self, user_id: str, thread_id: str, messages: List[Any], thread_language: str = "ENG", translated_history: str = None) -> str:
+    def memory_version(self, user_id: str) -> str:
+        """Opaque token that changes whenever the user's long-term memory changes"""
+        return self.ltm.memory_version(user_id)
+    
+    def get_stm_context(self, user_id: str, thread_id: str, messages: List[Any], thread_language: str = "ENG", translated_history: str = None, total_messages: Optional[int] = None) -> str:
         """Get STM context with language awareness and translated history support"""
-        stm = ShortTermMemory(user_id, thread_id, thread_language)
-        return stm.get_context_from_messages(messages, translated_history)
+        return self._get_stm(user_id, thread_id, thread_language).get_context_from_messages(messages, translated_history, total_messages)
+    
+    def _get_stm(self, user_id: str, thread_id: str, thread_language: str) -> ShortTermMemory:
+        """Pooled STM for a thread, created on first use; callers run in worker threads, hence the lock"""
+        key = (user_id, thread_id)
+        with self._stm_pool_lock:
+            stm = self._stm_pool.get(key)
+            if stm is None:
+                stm = ShortTermMemory(user_id, thread_id, thread_language)
+                self._stm_pool[key] = stm
+                if len(self._stm_pool) > _STM_POOL_SIZE:
+                    self._stm_pool.popitem(last=False)
+            else:
+                self._stm_pool.move_to_end(key)
+                stm.thread_language = thread_language
+            return stm
     
     async def process_message(self, user_id: str, thread_id: str, role: str, content: str, all_messages: List[Any], for_educational_agent: bool = False):
         """Process new message and handle LTM updates only for educational agent"""
         try:
-            print(f"[MemoryManager] Processing message from {role} for {user_id}-{thread_id}, educational: {for_educational_agent}")
+            logger.debug("[MemoryManager] Processing message from %s for %s-%s, educational: %s", role, user_id, thread_id, for_educational_agent)
             
             # Only process LTM for educational agent
             if not for_educational_agent:
-                print(f"[MemoryManager] Skipping LTM processing - not for educational agent")
+                logger.debug("[MemoryManager] Skipping LTM processing - not for educational agent")
                 return
             
             # Track message count per user for educational agent only
@@ -430,21 +632,22 @@ class MemoryManager:
             
             # Check if we need to update LTM (every 20 messages)
             if self.message_counters[user_key] % self.ltm_update_interval == 0:
-                print(f"[MemoryManager] Triggering LTM update for educational agent at {self.message_counters[user_key]} messages")
+                logger.debug("[MemoryManager] Triggering LTM update for educational agent at %s messages", self.message_counters[user_key])
                 # Run LTM update in parallel (non-blocking)
                 import asyncio
                 asyncio.create_task(self._update_ltm_async(user_id, thread_id, all_messages))
         except Exception as e:
-            print(f"[MemoryManager] Error processing message: {e}")
+            logger.error("[MemoryManager] Error processing message: %s", e)
             # Don't propagate errors to avoid blocking main workflow
     
     async def _update_ltm_async(self, user_id: str, thread_id: str, messages: List[Any]):
         """Extract and store entities from recent messages (runs in parallel with timeout)"""
         try:
-            print(f"[MemoryManager] Async LTM update for {user_id}-{thread_id}")
+            logger.debug("[MemoryManager] Async LTM update for %s-%s", user_id, thread_id)
             
-            # Get context from recent messages
-            stm_context = self.get_stm_context(user_id, thread_id, messages)
+            # Get context from recent messages, off the event loop since it may summarize;
+            # messages is the whole thread, so its length is the absolute position used by get_context too
+            stm_context = await asyncio.to_thread(self.get_stm_context, user_id, thread_id, messages, total_messages=len(messages))
             
             # Extract entities with timeout (30 seconds max)
             try:
@@ -458,35 +661,46 @@ class MemoryManager:
                         self.ltm.update_memory(user_id, thread_id, entities),
                         timeout=15.0
                     )
-                    print(f"[MemoryManager] LTM updated with {len(entities)} new entities")
+                    logger.debug("[MemoryManager] LTM updated with %s new entities", len(entities))
                 else:
-                    print("[MemoryManager] No entities extracted for LTM")
+                    logger.debug("[MemoryManager] No entities extracted for LTM")
             except asyncio.TimeoutError:
-                print(f"[MemoryManager] LTM update timed out for {user_id}-{thread_id}")
+                logger.warning("[MemoryManager] LTM update timed out for %s-%s", user_id, thread_id)
             except Exception as ltm_error:
-                print(f"[MemoryManager] LTM operation error: {ltm_error}")
+                logger.error("[MemoryManager] LTM operation error: %s", ltm_error)
                 
         except Exception as e:
-            print(f"[MemoryManager] Async LTM update error: {e}")
+            logger.error("[MemoryManager] Async LTM update error: %s", e)
     
-    async def get_context(self, user_id: str, thread_id: str, query: str, messages: List[Any], thread_language: str = "ENG", translated_history: str = None) -> Dict:
+    async def get_context(self, user_id: str, thread_id: str, query: str, messages: List[Any], thread_language: str = "ENG", translated_history: str = None, total_messages: Optional[int] = None) -> Dict:
         """Get full memory context for agent with language awareness and fallback handling"""
-        print(f"[MemoryManager] Getting full context for {user_id}-{thread_id}, language: {thread_language}")
-        
-        # Get STM context with language awareness
-        stm_context = self.get_stm_context(user_id, thread_id, messages, thread_language, translated_history)
+        logger.debug("[MemoryManager] Getting full context for %s-%s, language: %s", user_id, thread_id, thread_language)
         
-        # Get LTM context with timeout and fallback - only for educational agent
-        ltm_results = []
-        try:
-            ltm_results = await asyncio.wait_for(
+        # STM (which may block on a summarization call, so it runs in a worker thread) and
+        # LTM retrieval are independent; overlap them and let each fail on its own
+        stm_result, ltm_result = await asyncio.gather(
+            asyncio.to_thread(self.get_stm_context, user_id, thread_id, messages, thread_language, translated_history, total_messages),
+            asyncio.wait_for(
                 self.ltm.retrieve_memory(user_id, thread_id, query),
                 timeout=10.0  # 10 second timeout for LTM retrieval
-            )
-        except asyncio.TimeoutError:
-            print(f"[MemoryManager] LTM retrieval timed out for {user_id}-{thread_id}")
-        except Exception as e:
-            print(f"[MemoryManager] LTM retrieval error: {e}")
+            ),
+            return_exceptions=True
+        )
+        
+        if isinstance(stm_result, Exception):
+            logger.error("[MemoryManager] STM context error: %s", stm_result)
+            stm_context = "No conversation history available"
+        else:
+            stm_context = stm_result
+        
+        # LTM context with fallback - only for educational agent
+        ltm_results = []
+        if isinstance(ltm_result, asyncio.TimeoutError):
+            logger.warning("[MemoryManager] LTM retrieval timed out for %s-%s", user_id, thread_id)
+        elif isinstance(ltm_result, Exception):
+            logger.error("[MemoryManager] LTM retrieval error: %s", ltm_result)
+        else:
+            ltm_results = ltm_result
         
         context = {
             "short_term": stm_context,
@@ -494,7 +708,7 @@ class MemoryManager:
             "ltm_summary": self._summarize_ltm(ltm_results)
         }
         
-        print(f"[MemoryManager] Context prepared - STM: {len(context['short_term'])} chars, LTM: {len(ltm_results)} items, Language: {thread_language}")
+        logger.debug("[MemoryManager] Context prepared - STM: %s chars, LTM: %s items, Language: %s", len(context['short_term']), len(ltm_results), thread_language)
         return context
     
     def _summarize_ltm(self, ltm_results: List[Tuple]) -> str:
@@ -502,10 +716,5 @@ class MemoryManager:
         if not ltm_results:
             return "No relevant long-term context available."
         
-        summary_parts = []
-        for content, meta in ltm_results[:3]:  # Top 3 most relevant
-            summary_parts.append(f"[{meta['type']}] {content}")
-        
-        summary = " | ".join(summary_parts)
-        print(f"[MemoryManager] LTM summary created: {len(summary)} characters")
-        return summary
\ No newline at end of file
+        # Top 3 most relevant
+        return " | ".join(f"[{meta.get('type', 'unknown')}] {content}" for content, meta in ltm_results[:3])
\ No newline at end of file
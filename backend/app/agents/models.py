@@ -2,7 +2,7 @@
 Pydantic models for the multi-agent intent system
 """
 
-from typing import List, Optional, Dict
+from typing import Any, List, NamedTuple, Optional, Dict
 from enum import Enum
 from pydantic import BaseModel, Field
 
@@ -22,6 +22,10 @@ class IntentExtractionResult(BaseModel):
     reasoning: str = Field(..., description="Explanation of decision")
 
 
+class CombinedIntentEnhancement(IntentExtractionResult):
+    enhanced_question: Optional[str] = Field(None, description="Simplified, unambiguous question; null when the query is general or needs clarification")
+
+
 class QuestionEnhancement(BaseModel):
     enhanced_question: str = Field(..., description="Simplified, unambiguous question")
     reasoning: str = Field(..., description="Enhancement reasoning")
@@ -34,6 +38,16 @@ class QuestionDecomposition(BaseModel):
     reasoning: str = Field(..., description="Overall decomposition strategy and approach")
 
 
+class SubQuestionRefinement(BaseModel):
+    sub_questions: List[str] = Field(..., description="2-4 enhanced sub-questions for knowledge base retrieval")
+    reasoning: str = Field(..., description="Sub-question enhancement reasoning")
+
+
+class WebQueryRefinement(BaseModel):
+    web_queries: List[str] = Field(..., description="2-3 enhanced web search queries")
+    reasoning: str = Field(..., description="Web query enhancement reasoning")
+
+
 class ValidationResult(BaseModel):
     approved: bool = Field(..., description="Whether output is approved")
     feedback: str = Field(..., description="General feedback for improvement")
@@ -73,4 +87,14 @@ class ResponseGeneration(BaseModel):
     response_type: str = Field(..., description="Type: 'domain_response', 'not_allowed', or 'clarification'")
     sources_used: List[str] = Field(default_factory=list, description="Web sources referenced in response")
     confidence: float = Field(..., description="Confidence in response quality (0.0-1.0)")
-    reasoning: str = Field(..., description="Explanation of response generation approach")
\ No newline at end of file
+    reasoning: str = Field(..., description="Explanation of response generation approach")
+
+
+class Source(NamedTuple):
+    """One retrieved source combined for response generation"""
+    source_type: str
+    content: str
+    question: str = ""
+    title: str = ""
+    url: str = ""
+    metadata: Optional[Dict[str, Any]] = None
@@ -0,0 +1,212 @@
+"""
+Semantic Cache Module
+
+Caches agent outputs keyed by query embeddings so near-duplicate questions
+reuse earlier LLM results instead of issuing a new call. Entries are grouped
+into namespaces per agent, temperature and prompt template version, scoped to
+one user's thread, and only match when the exact-hashed context (history,
+memory, sources) they were produced from is the same.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+from app.core.config import settings
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever agent prompt templates change so outputs from old prompts are not served
+PROMPT_TEMPLATE_VERSION = "1"
+
+
+if njit is not None:
+    @njit(fastmath=True, cache=True)
+    def _best_match_kernel(matrix, vector):
+        best_index = 0
+        best_score = -2.0
+        for i in range(matrix.shape[0]):
+            score = 0.0
+            for j in range(matrix.shape[1]):
+                score += matrix[i, j] * vector[j]
+            if score > best_score:
+                best_index = i
+                best_score = score
+        return best_index, best_score
+
+
+def best_match(matrix: np.ndarray, vector: np.ndarray) -> Tuple[int, float]:
+    """Index and cosine similarity of the row of matrix closest to vector (rows and vector L2-normalized)"""
+    if njit is not None:
+        index, score = _best_match_kernel(matrix, vector)
+        return int(index), float(score)
+    scores = matrix @ vector
+    index = int(np.argmax(scores))
+    return index, float(scores[index])
+
+
+class _Namespace:
+    """Entries for one agent, with a lazily rebuilt matrix of normalized embeddings"""
+
+    def __init__(self):
+        self.vectors: List[np.ndarray] = []
+        self.values: List[Any] = []
+        self.context_keys: List[str] = []
+        self.expires_at: List[float] = []
+        self.matrix: Optional[np.ndarray] = None
+
+
+class SemanticCache:
+    """In-process embedding cache with cosine-similarity lookup"""
+
+    def __init__(self,
+                 threshold: float = 0.92,
+                 ttl: float = 3600.0,
+                 max_entries: int = 1000,
+                 max_namespaces: int = 4096,
+                 embedding_model: str = "text-embedding-3-small"):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_namespaces = max_namespaces
+        # Least recently used namespace first, so idle threads are dropped once max_namespaces is reached
+        self._namespaces: "OrderedDict[str, _Namespace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        if settings.semantic_cache_enabled and settings.openai_api_key:
+            self.embeddings = OpenAIEmbeddings(model=embedding_model, api_key=settings.openai_api_key)
+        else:
+            logger.info("[SemanticCache] Disabled - caching turned off or no OpenAI API key available")
+            self.embeddings = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def namespace(agent_name: str, temperature: float) -> str:
+        """Build the namespace key for an agent configuration"""
+        return f"{agent_name}:{round(temperature, 2)}:v{PROMPT_TEMPLATE_VERSION}"
+
+    @staticmethod
+    def scoped(namespace: str, user_id: str, thread_id: str) -> str:
+        """Restrict a namespace to one user's thread so cached outputs never cross conversations"""
+        return f"{namespace}:{user_id}:{thread_id}"
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed and L2-normalize text so cosine similarity is a dot product (None when disabled or on error)"""
+        if self.embeddings is None or not text:
+            return None
+        try:
+            vector = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            return vector / norm if norm else None
+        except Exception as e:
+            logger.warning("[SemanticCache] Embedding failed, treating as miss: %s", e)
+            return None
+
+    async def embed_many(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Embed and L2-normalize a batch of texts in one request, one row per text (None when disabled or on error)"""
+        if self.embeddings is None or not texts:
+            return None
+        try:
+            matrix = np.asarray(await self.embeddings.aembed_documents(texts), dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return matrix / norms
+        except Exception as e:
+            logger.warning("[SemanticCache] Batch embedding failed: %s", e)
+            return None
+
+    def lookup(self, namespace: str, vector: Optional[np.ndarray], context_key: str = "") -> Optional[Any]:
+        """Return the most similar live value stored with the same context_key, if it clears the threshold"""
+        if vector is None:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if entries is None or not entries.vectors:
+                self.misses += 1
+                return None
+            self._namespaces.move_to_end(namespace)
+
+            if entries.matrix is None:
+                entries.matrix = np.vstack(entries.vectors)
+            scores = entries.matrix @ vector
+
+            # Best first among the entries above the threshold, so an expired or other-context
+            # best match does not hide a valid runner-up
+            candidates = np.flatnonzero(scores >= self.threshold)
+            for index in candidates[np.argsort(scores[candidates])[::-1]]:
+                if entries.expires_at[index] > now and entries.context_keys[index] == context_key:
+                    self.hits += 1
+                    return entries.values[index]
+            self.misses += 1
+            return None
+
+    def store(self, namespace: str, vector: Optional[np.ndarray], value: Any, context_key: str = ""):
+        """Cache value under vector and context_key, evicting expired and then oldest entries"""
+        if vector is None:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            entries = self._namespaces.get(namespace)
+            if entries is None:
+                entries = self._namespaces[namespace] = _Namespace()
+                if len(self._namespaces) > self.max_namespaces:
+                    self._namespaces.popitem(last=False)
+            else:
+                self._namespaces.move_to_end(namespace)
+
+            # Entries are appended in insertion order, so expired ones sit at the front
+            expired = 0
+            while expired < len(entries.expires_at) and entries.expires_at[expired] <= now:
+                expired += 1
+            overflow = max(0, len(entries.vectors) - expired + 1 - self.max_entries)
+            drop = expired + overflow
+            if drop:
+                del entries.vectors[:drop], entries.values[:drop], entries.context_keys[:drop], entries.expires_at[:drop]
+
+            entries.vectors.append(vector)
+            entries.values.append(value)
+            entries.context_keys.append(context_key)
+            entries.expires_at.append(now + self.ttl)
+            entries.matrix = None
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._namespaces.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.embeddings is not None,
+            "threshold": self.threshold,
+            "namespaces": len(self._namespaces),
+            "entries": sum(len(entries.vectors) for entries in list(self._namespaces.values())),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups * 100, 2) if lookups else 0.0
+        }
+
+
+# Global semantic cache shared by all agents
+semantic_cache = SemanticCache(
+    threshold=settings.semantic_cache_threshold,
+    ttl=settings.semantic_cache_ttl,
+    max_entries=settings.semantic_cache_max_entries
+)
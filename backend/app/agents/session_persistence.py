@@ -28,7 +28,7 @@ def save_sessions_to_disk(active_sessions: Dict[str, Any], session_metrics: Dict
                 "version": "1.0"
             }
             
-            # Convert defaultdict to regular dict for JSON serialization
+            # Convert Counter to regular dict for JSON serialization
             if "error_counts" in backup_data["session_metrics"]:
                 backup_data["session_metrics"]["error_counts"] = dict(backup_data["session_metrics"]["error_counts"])
             
@@ -9,17 +9,27 @@ Provides:
 """
 
 import asyncio
+import httpx
 import requests
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import tiktoken
-import time
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 
 from app.core.config import settings
 from .models import URLRelevanceEvaluation
+from .clients import openai_chat
+
+# Shared by every request so concurrent users cannot multiply the fan-out past the provider's limits
+_search_semaphore = asyncio.Semaphore(settings.web_concurrency)
+_scrape_semaphore = asyncio.Semaphore(settings.scrape_concurrency)
+
+# Keep-alive pool reused for every scrape instead of a new connection per URL
+_scrape_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+    timeout=httpx.Timeout(settings.jina_read_timeout, connect=settings.jina_connect_timeout)
+)
 
 
 class WebSearchResult:
@@ -54,6 +64,45 @@ class WebSearchService:
         self.token_limit = settings.web_scraping_token_limit
         self.timeout = settings.web_search_timeout
         
+        # URL relevance prompt, parser and chain are built once and reused for every evaluation
+        if openai_chat is not None:
+            self.url_relevance_parser = PydanticOutputParser(pydantic_object=URLRelevanceEvaluation)
+            self.url_relevance_format_instructions = self.url_relevance_parser.get_format_instructions()
+            self.url_relevance_prompt = ChatPromptTemplate.from_template("""
+            You are an expert URL relevance evaluator for cloud/network/security/technical topics. Evaluate search results SOLELY using the provided title, description, and URL
+            
+            Enhanced Question: {enhanced_question}{sub_questions_context}
+            
+            Search Results to Evaluate:
+            {results}
+            
+            URL PRIORITY RULES
+            1. High-Priority Sources (Score boost for relevance):
+            - `learn.microsoft.com, docs.aws.amazon.com, aws.amazon.com/blogs/, .edu, .org`
+            - Technical blogs (.lk , blog)
+            - Reputable forums (Stack Overflow, GitHub, technical subreddits)
+
+            2. Avoided Sources (Max score 0.2 regardless of content):
+            - `aws.amazon.com` (except `/blogs/`), `azure.microsoft.com`
+            - Marketing/product pages, generic overviews
+                        
+            Scoring Guidelines (0.0-1.0):
+            - 0.9-1.0: Perfect match - title/description directly addresses enhanced question or Sub questions
+            - 0.7-0.8: Good match - strong relevance to enhanced question or Sub questions, reputable tech sites, clear content alignment
+            - 0.5-0.6: Moderate match - some relevance to enhanced question or Sub questions, decent source
+            - 0.3-0.4: Weak match - tangential relevance, unclear value 
+            - 0.0-0.2: Poor match - no clear relevance to the enhanced question or Sub questions
+            
+            INSTRUCTIONS:
+            1. Evaluate each URL's title, description, and provided details
+            2. Score how well each result answers the enhanced question and sub-questions
+            3. Select top 5 URLs above threshold {threshold} for primary scraping
+            4. NEVER score AVOIDED URLs above 0.2 regardless of content
+            
+            {format_instructions}
+            """)
+            self.url_relevance_chain = self.url_relevance_prompt | openai_chat.bind(temperature=0.1) | self.url_relevance_parser
+        
         # Initialize tokenizer for token counting
         try:
             self.tokenizer = tiktoken.get_encoding("cl100k_base")
@@ -87,8 +136,9 @@ class WebSearchService:
             if max_results is None:
                 max_results = settings.tavily_results_per_query
                 
-            # Search with Tavily
-            response = client.search(
+            # Search with Tavily (the client is blocking, so keep it off the event loop)
+            response = await asyncio.to_thread(
+                client.search,
                 query=query,
                 search_depth="advanced",
                 max_results=max_results,
@@ -144,7 +194,8 @@ class WebSearchService:
             print(f"[WebSearch] JINA request URL: {url}")
             print(f"[WebSearch] JINA headers: {headers}")
             
-            response = requests.get(
+            response = await asyncio.to_thread(
+                requests.get,
                 url, 
                 headers=headers, 
                 timeout=(settings.jina_connect_timeout, settings.jina_read_timeout)
@@ -241,12 +292,8 @@ class WebSearchService:
             
             print(f"[WebSearch] JINA scraping URL: {scrape_url}")
             
-            # Use improved timeout settings
-            response = requests.get(
-                scrape_url, 
-                headers=headers, 
-                timeout=(settings.jina_connect_timeout, settings.jina_read_timeout)
-            )
+            async with _scrape_semaphore:
+                response = await _scrape_client.get(scrape_url, headers=headers)
             
             # Debug response details
             print(f"[WebSearch] JINA scrape response status: {response.status_code}")
@@ -280,7 +327,7 @@ class WebSearchService:
             print(f"[WebSearch] SUCCESS: Scraped {self.count_tokens(content)} tokens from: {url}")
             return content
             
-        except requests.exceptions.RequestException as req_error:
+        except httpx.HTTPError as req_error:
             print(f"[WebSearch] ERROR: JINA scraping request error for {url}: {req_error}")
             return None
         except Exception as e:
@@ -296,9 +343,26 @@ class WebSearchService:
         all_results = []
         seen_urls = set()
         
-        for query in queries[:3]:  # Limit to 3 queries
-            print(f"[WebSearch] Processing query: {query}")
-            
+        # Queries are independent, so search them concurrently and merge in query order
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(self._search_query_with_fallback(query)) for query in queries[:3]]  # Limit to 3 queries
+        
+        for task in tasks:
+            results = task.result()
+            # Add unique results
+            for result in results:
+                if result.url not in seen_urls:
+                    all_results.append(result)
+                    seen_urls.add(result.url)
+                    
+        print(f"[WebSearch] Collected {len(all_results)} unique results with fallback")
+        return all_results
+    
+    async def _search_query_with_fallback(self, query: str) -> List[WebSearchResult]:
+        """Search one query with Tavily, falling back to JINA"""
+        print(f"[WebSearch] Processing query: {query}")
+        
+        async with _search_semaphore:
             # Try Tavily first
             results = []
             if self.tavily_api_key:
@@ -309,15 +373,8 @@ class WebSearchService:
             if not results and self.jina_api_key:
                 print(f"[WebSearch] Tavily failed, trying JINA fallback for: {query}")
                 results = await self.search_jina(query)
-                
-            # Add unique results
-            for result in results:
-                if result.url not in seen_urls:
-                    all_results.append(result)
-                    seen_urls.add(result.url)
-                    
-        print(f"[WebSearch] Collected {len(all_results)} unique results with fallback")
-        return all_results
+        
+        return results
     
     async def evaluate_url_relevance(self, results: List[WebSearchResult], original_query: str, 
                                    enhanced_question: str = None, sub_questions: List[str] = None) -> URLRelevanceEvaluation:
@@ -347,13 +404,6 @@ class WebSearchService:
                     print("[WebSearch] No OpenAI key available, using basic ranking")
                     raise Exception("No OpenAI API key configured")
                 
-                llm = ChatOpenAI(
-                    model=settings.openai_model,
-                    temperature=0.1,
-                    api_key=settings.openai_api_key
-                )
-                parser = PydanticOutputParser(pydantic_object=URLRelevanceEvaluation)
-                
                 # Format results for evaluation with enhanced context
                 results_text = ""
                 for i, result in enumerate(results, 1):
@@ -369,48 +419,13 @@ class WebSearchService:
                     for i, sq in enumerate(sub_questions, 1):
                         sub_questions_text += f"{i}. {sq}\n"
                 
-                prompt = ChatPromptTemplate.from_template("""
-                You are an expert URL relevance evaluator for cloud/network/security/technical topics. Evaluate search results SOLELY using the provided title, description, and URL
-                
-                Enhanced Question: {enhanced_question}{sub_questions_context}
-                
-                Search Results to Evaluate:
-                {results}
-                
-                URL PRIORITY RULES
-                1. High-Priority Sources (Score boost for relevance):
-                - `learn.microsoft.com, docs.aws.amazon.com, aws.amazon.com/blogs/, .edu, .org`
-                - Technical blogs (.lk , blog)
-                - Reputable forums (Stack Overflow, GitHub, technical subreddits)
-
-                2. Avoided Sources (Max score 0.2 regardless of content):
-                - `aws.amazon.com` (except `/blogs/`), `azure.microsoft.com`
-                - Marketing/product pages, generic overviews
-                            
-                Scoring Guidelines (0.0-1.0):
-                - 0.9-1.0: Perfect match - title/description directly addresses enhanced question or Sub questions
-                - 0.7-0.8: Good match - strong relevance to enhanced question or Sub questions, reputable tech sites, clear content alignment
-                - 0.5-0.6: Moderate match - some relevance to enhanced question or Sub questions, decent source
-                - 0.3-0.4: Weak match - tangential relevance, unclear value 
-                - 0.0-0.2: Poor match - no clear relevance to the enhanced question or Sub questions
-                
-                INSTRUCTIONS:
-                1. Evaluate each URL's title, description, and provided details
-                2. Score how well each result answers the enhanced question and sub-questions
-                3. Select top 5 URLs above threshold {threshold} for primary scraping
-                4. NEVER score AVOIDED URLs above 0.2 regardless of content
-                
-                {format_instructions}
-                """)
-                
-                chain = prompt | llm | parser
-                result = chain.invoke({
+                result = await self.url_relevance_chain.ainvoke({
                     "original_query": original_query,
                     "enhanced_question": enhanced_question,
                     "sub_questions_context": sub_questions_text,
                     "results": results_text,
                     "threshold": settings.url_confidence_threshold,
-                    "format_instructions": parser.get_format_instructions()
+                    "format_instructions": self.url_relevance_format_instructions
                 })
                 
                 print(f"[WebSearch] AI evaluation complete: {len(result.relevant_urls)} URLs selected")
@@ -419,7 +434,7 @@ class WebSearchService:
             except Exception as e:
                 if attempt < max_retries:
                     print(f"[WebSearch] AI evaluation attempt {attempt + 1} failed: {e}, retrying...")
-                    time.sleep(1)  # Brief delay before retry
+                    await asyncio.sleep(1)  # Brief delay before retry
                     continue
                 else:
                     print(f"[WebSearch] All AI evaluation attempts failed: {e}, using basic ranking")
@@ -490,7 +505,7 @@ class WebSearchService:
                     
                 if attempt < max_retries:
                     print(f"[WebSearch] Retrying {len(urls_to_try)} failed URLs...")
-                    time.sleep(1)  # Brief delay before retry
+                    await asyncio.sleep(1)  # Brief delay before retry
             
             final_tokens = sum(self.count_tokens(content) for content in scraped_content.values())
             success_rate = len(scraped_content) / len(confident_urls[:target_urls]) * 100 if confident_urls else 0
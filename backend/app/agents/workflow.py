@@ -8,12 +8,16 @@ Implements the complete multi-agent workflow using LangGraph StateGraph:
 """
 
 import asyncio
+import logging
 from typing import Dict, List, Optional, Any, TypedDict
 from langgraph.graph import StateGraph, END
 
 from app.core.config import settings
 from .memory import MemoryManager
-from .agents import IntentionExtractor, QuestionEnhancer, QuestionDecomposer, ReEvaluator, ParallelRetriever, ResponseGenerator
+from .models import Source
+from .semantic_cache import semantic_cache
+from .background import submit_background
+from .agents import IntentionExtractor, IntentAndEnhance, QuestionEnhancer, QuestionDecomposer, ReEvaluator, ParallelRetriever, ResponseGenerator, start_query_embedding
 from .workflow_state import (
     emit_intention_extraction, emit_intention_extracted,
     emit_question_enhancement, emit_question_enhanced,
@@ -23,6 +27,8 @@ from .workflow_state import (
     emit_response_generation, emit_completed, emit_error
 )
 
+logger = logging.getLogger(__name__)
+
 
 class AgentState(TypedDict):
     """
@@ -34,11 +40,14 @@ class AgentState(TypedDict):
     user_id: str
     thread_id: str
     history: List[dict]
+    formatted_history: Optional[str]  # Compact prompt rendering of recent history, filled on first use
     memory_context: Dict[str, Any]
     thread_language: str  # Thread language (ENG/SIN)
+    query_embedding: Optional[asyncio.Task]  # Semantic cache embedding of the query, computed during memory retrieval
     
     # Processing state  
     current_intent: Optional[str]
+    enhancement_prefetch: Optional[asyncio.Task]  # Enhancement started while the intent was still streaming
     domain_relevance: Optional[str]  # Domain relevance classification
     enhanced_question: Optional[str]
     sub_questions: List[str]
@@ -48,13 +57,14 @@ class AgentState(TypedDict):
     web_search_results: List[Dict[str, Any]]
     scraped_content: Dict[str, str]
     url_confidence_scores: Dict[str, float]
+    high_confidence_url_count: int
     
     # Knowledge base retrieval state
     kb_results: List[Dict[str, Any]]
     kb_processed: bool
     
     # Combined retrieval state
-    all_sources: List[Dict[str, Any]]
+    all_sources: List[Source]
     retrieval_status: Dict[str, str]
     
     # Control state
@@ -63,6 +73,7 @@ class AgentState(TypedDict):
     confidence_score: float
     iteration_count: int
     max_iterations: int
+    reevaluator_skipped: bool  # True when the decomposition passed the ReEvaluator's local quality gate
     
     # Response state
     final_response: Optional[str]
@@ -80,6 +91,7 @@ class IntentExtractionWorkflow:
         # Initialize components
         self.memory_manager = MemoryManager()
         self.intention_extractor = IntentionExtractor()
+        self.intent_and_enhance = IntentAndEnhance(self.intention_extractor)
         self.question_enhancer = QuestionEnhancer()
         self.question_decomposer = QuestionDecomposer()
         self.re_evaluator = ReEvaluator()
@@ -95,8 +107,12 @@ class IntentExtractionWorkflow:
         thread_id = state.get("thread_id", "unknown")
         await emit_intention_extraction(thread_id)
         
-        # Process with the intention extractor
-        result = self.intention_extractor(state)
+        if state["history"]:
+            # Follow-up turns rarely need clarification, so extract and enhance in one call
+            result = await self.intent_and_enhance(state)
+            result["enhancement_prefetch"] = None
+        else:
+            result = await self._extract_intent_with_prefetch(state)
         
         # Emit detailed results
         if result.get("current_intent"):
@@ -109,13 +125,46 @@ class IntentExtractionWorkflow:
         
         return result
     
+    async def _extract_intent_with_prefetch(self, state: AgentState) -> AgentState:
+        """Run the streaming intention extractor, speculatively enhancing the intent as it arrives"""
+        # Start enhancing as soon as the intent streams in, overlapping the rest of the extraction
+        prefetches: Dict[str, asyncio.Task] = {}
+        ltm_summary = state["memory_context"].get("ltm_summary", "")
+        cache_namespace = semantic_cache.scoped(self.question_enhancer.cache_namespace, state["user_id"], state["thread_id"])
+        
+        def start_enhancement(intent: str):
+            prefetches[intent] = asyncio.create_task(self.question_enhancer.enhance(intent, ltm_summary, cache_namespace))
+        
+        # Process with the intention extractor
+        result = await self.intention_extractor(state, on_intent=start_enhancement)
+        
+        # Keep the speculative enhancement only if the router will take the enhancer path with the same intent
+        prefetch = prefetches.pop(result.get("current_intent"), None)
+        for stale in prefetches.values():
+            stale.cancel()
+        if prefetch is not None and (result["needs_clarification"] or result.get("domain_relevance") == "general"):
+            prefetch.cancel()
+            prefetch = None
+        result["enhancement_prefetch"] = prefetch
+        return result
+    
     async def _wrapped_question_enhancer(self, state: AgentState) -> AgentState:
         """Question enhancer with state emission"""
         thread_id = state.get("thread_id", "unknown")
         await emit_question_enhancement(thread_id)
         
-        # Process with the question enhancer
-        result = self.question_enhancer(state)
+        # Process with the question enhancer, reusing the enhancement started during intent extraction
+        prefetch = state.get("enhancement_prefetch")
+        state["enhancement_prefetch"] = None
+        if state.get("enhanced_question"):
+            logger.debug("[Workflow] Using enhancement from the combined intent call")
+            result = state
+        elif prefetch is not None and state.get("current_intent"):
+            logger.debug("[Workflow] Using enhancement started during intent extraction")
+            state["enhanced_question"] = await prefetch
+            result = state
+        else:
+            result = await self.question_enhancer(state)
         
         # Emit enhanced question if available
         if result.get("enhanced_question"):
@@ -132,7 +181,7 @@ class IntentExtractionWorkflow:
         await emit_question_decomposition(thread_id)
         
         # Process with the question decomposer
-        result = self.question_decomposer(state)
+        result = await self.question_decomposer(state)
         
         # Emit decomposition results if available
         if result.get("sub_questions") is not None or result.get("web_queries") is not None:
@@ -147,7 +196,7 @@ class IntentExtractionWorkflow:
     async def _wrapped_re_evaluator(self, state: AgentState) -> AgentState:
         """Re-evaluator with state emission"""
         await emit_re_evaluation(state.get("thread_id", "unknown"))
-        return self.re_evaluator(state)
+        return await self.re_evaluator(state)
     
     async def _wrapped_parallel_retriever(self, state: AgentState) -> AgentState:
         """Parallel retriever with state emission"""
@@ -248,8 +297,9 @@ class IntentExtractionWorkflow:
         return builder.compile()
     
     async def process_query(self, user_query: str, user_id: str, thread_id: str, 
-                     history: List[dict] = None, language: str = "ENG", translated_history: str = None) -> Dict[str, Any]:
-        """Process a user query through the complete workflow"""
+                     history: List[dict] = None, language: str = "ENG", translated_history: str = None,
+                     total_messages: Optional[int] = None) -> Dict[str, Any]:
+        """Process a user query through the complete workflow (total_messages: full thread length when history is its tail)"""
         
         print(f"[Workflow] Processing query from user {user_id}, thread {thread_id}")
         print(f"[Workflow] Query: {user_query[:100]}...")
@@ -257,9 +307,12 @@ class IntentExtractionWorkflow:
         try:
             print(f"[Workflow] Language: {language}, Translated history available: {bool(translated_history)}")
             
+            # Embed the query for the agents' semantic cache lookups while memory is retrieved
+            query_embedding = start_query_embedding(user_query)
+            
             # Get memory context with language awareness and translated history
             memory_context = await self.memory_manager.get_context(
-                user_id, thread_id, user_query, history, language, translated_history
+                user_id, thread_id, user_query, history, language, translated_history, total_messages
             )
             
             # Initialize state
@@ -268,9 +321,12 @@ class IntentExtractionWorkflow:
                 "user_id": user_id,
                 "thread_id": thread_id,
                 "history": history or [],
+                "formatted_history": None,
                 "memory_context": memory_context,
                 "thread_language": language,  # Add thread language to state
+                "query_embedding": query_embedding,
                 "current_intent": None,
+                "enhancement_prefetch": None,
                 "domain_relevance": None,
                 "enhanced_question": None,
                 "sub_questions": [],
@@ -279,6 +335,7 @@ class IntentExtractionWorkflow:
                 "web_search_results": [],
                 "scraped_content": {},
                 "url_confidence_scores": {},
+                "high_confidence_url_count": 0,
                 # Knowledge base initialization
                 "kb_results": [],
                 "kb_processed": False,
@@ -291,6 +348,7 @@ class IntentExtractionWorkflow:
                 "confidence_score": 0.0,
                 "iteration_count": 0,
                 "max_iterations": settings.max_iterations,
+                "reevaluator_skipped": False,
                 # Response state
                 "final_response": None,
                 "response_type": None,
@@ -306,7 +364,7 @@ class IntentExtractionWorkflow:
             print(f"[Workflow] Workflow completed - iterations: {final_state.get('iteration_count', 0)}")
             
             # Trigger educational agent for general questions (non-blocking)
-            asyncio.create_task(self._trigger_educational_agent_if_needed(final_state))
+            submit_background(self._trigger_educational_agent_if_needed(final_state))
             
             # Process result - now all paths go through response_generator
             print("[Workflow] Workflow result: RESPONSE_GENERATED")
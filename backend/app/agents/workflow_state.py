@@ -223,6 +223,13 @@ async def emit_data_preparation(thread_id: str = "Preparing Data") -> None:
 async def emit_response_generation(thread_id: str, message: str = "Generate The Response") -> None:
     await emit_workflow_state(thread_id, WorkflowStage.RESPONSE_GENERATION, message)
 
+async def emit_response_progress(thread_id: str, partial_response: str) -> None:
+    """Emit the response text generated so far while the final answer streams in"""
+    details = {
+        "partial_response": partial_response
+    }
+    await emit_workflow_state(thread_id, WorkflowStage.RESPONSE_GENERATION, "Generate The Response", None, details)
+
 
 # Clear the workflow state when completed
 async def emit_completed(thread_id: str, message: str = "") -> None:
@@ -40,15 +40,26 @@ class Settings(BaseSettings):
     
     # Multi-Agent System Settings
     vector_db_path: str = "./data/chroma_db"
+    ltm_backend: str = "chroma"  # "chroma" or "faiss" (exact in-process search)
+    ltm_faiss_path: str = "./data/ltm_faiss"
     stm_token_limit: int = 4000
     ltm_update_interval: int = 20
     max_iterations: int = 3
     max_concurrent_users: int = Field(default=10, alias="BACKEND_MAX_CONCURRENT_USERS")
     
+    # Semantic Cache Settings
+    semantic_cache_enabled: bool = Field(default=True, alias="BACKEND_SEMANTIC_CACHE_ENABLED")
+    semantic_cache_threshold: float = 0.92
+    semantic_cache_ttl: int = 3600
+    semantic_cache_max_entries: int = 1000
+    
     # Web Search Settings
     web_search_max_results: int = Field(default=5, alias="SHARED_WEB_SEARCH_MAX_RESULTS")
     web_scraping_token_limit: int = Field(default=20000, alias="SHARED_WEB_SCRAPING_TOKEN_LIMIT")
+    response_context_token_budget: int = 24000  # Cap on KB + web source tokens sent to the response model
     web_search_timeout: int = Field(default=30, alias="SHARED_WEB_SEARCH_TIMEOUT")
+    web_concurrency: int = 16  # Process-wide cap on in-flight web search queries
+    scrape_concurrency: int = 15  # Process-wide cap on in-flight page scrapes
     
     # URL Confidence & Selection Settings
     url_confidence_threshold: float = 0.6
@@ -69,6 +80,8 @@ class Settings(BaseSettings):
     lightrag_documents_dir: str = "./documents"
     lightrag_llm_model: str = "gpt-4o-mini"
     lightrag_embedding_model: str = "text-embedding-3-large"
+    kb_concurrency: int = 8  # Process-wide cap on in-flight knowledge base queries
+    kb_answer_cache_ttl: int = 900  # Seconds a knowledge base answer is reused for the same question
     
     # Translation Service (DeepSeek API - Optional)
     deepseek_api_key: Optional[str] = Field(default=None, alias="SHARED_DEEPSEEK_API_KEY")
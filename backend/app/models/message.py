@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
@@ -27,4 +27,8 @@ class Message(Base):
     
     # Relationships
     thread = relationship("ChatThread", back_populates="messages")
-    user = relationship("User", back_populates="messages")
\ No newline at end of file
+    user = relationship("User", back_populates="messages")
+
+
+# Serves "latest N messages of a thread" queries straight from the index
+Index("idx_messages_thread_id_timestamp", Message.thread_id, Message.timestamp.desc())
@@ -15,6 +15,13 @@ import logging
 import sys
 from typing import Callable
 
+# Agents log through the logging module; verbose per-item output only shows in debug mode
+logging.basicConfig(
+    level=logging.DEBUG if settings.debug else logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    force=True
+)
+
 
 def initialize_sample_data():
     """Initialize sample data on first run"""
@@ -93,6 +93,7 @@ CREATE TABLE messages (
 CREATE INDEX idx_messages_thread_id ON messages(thread_id);
 CREATE INDEX idx_messages_user_id ON messages(user_id);
 CREATE INDEX idx_messages_timestamp ON messages(timestamp);
+CREATE INDEX idx_messages_thread_id_timestamp ON messages(thread_id, timestamp DESC);
 CREATE INDEX idx_messages_author ON messages(author);
 
 -- Create user_reaction_logs table